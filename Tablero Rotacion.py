@@ -1,12 +1,21 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import dropbox
-import io
 from datetime import datetime
 import time
+from inventario.arranque import cargar_en_paralelo, resumir_tiempos
+from inventario.demanda import METODO_DEMANDA_DEFECTO, METODOS_DEMANDA
+from inventario.ingesta import cargar_inventario, describir_metricas
+from inventario.maestro import cargar_maestro_articulos
+from inventario.motor import calcular_objetivos, clasificar_inventario, preparar_demanda
+from inventario.ordenes import HOJA_REGISTRO_ORDENES, TTL_ORDENES, leer_hoja_ordenes, version_ordenes
+from inventario.proveedores import cargar_proveedores, preparar_indice_proveedores
+from inventario.indice import IndiceFilas
+from inventario.vistas import CLAVE_ORDENES, CLAVE_RECARGAR_DATOS, activar_copia_al_escribir, filtrar_sesion, guardar_analisis_sesion, guardar_ordenes_sesion
+from utils import connect_to_gsheets, obtener_fuente_datos, ruta_archivo
 
 # --- 0. CONFIGURACIÓN INICIAL ---
+# Las páginas filtran y modifican vistas del análisis sin copiar ni alterar el cuadro maestro
+activar_copia_al_escribir()
 FERREINOX_LOGO_URL = "https://www.ferreinox.co/cdn-cgi/image/w=200/upload/logo/logo_header_ferreinox_1723217791.webp"
 FERREINOX_FAVICON = "https://www.ferreinox.co/favicon.ico"
 
@@ -166,203 +175,121 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- LÓGICA DE CARGA DE DATOS ---
-@st.cache_data(ttl=600)
-def cargar_datos_desde_dropbox():
-    info_message = st.empty()
-    info_message.info("Conectando a Dropbox para obtener los datos más recientes...", icon="☁️")
-    column_names = ['DEPARTAMENTO','REFERENCIA','DESCRIPCION','MARCA','PESO_ARTICULO','UNIDADES_VENDIDAS','STOCK','COSTO_PROMEDIO_UND','CODALMACEN','LEAD_TIME_PROVEEDOR','HISTORIAL_VENTAS']
+def _cargar_archivos_base():
+    """Inventario, proveedores y maestro de artículos en paralelo desde la fuente configurada (Dropbox o local)."""
+    rutas = {'inventario': ruta_archivo("file_path"), 'proveedores': ruta_archivo("proveedores_file_path")}
+    # El maestro queda precargado en la caché del proceso para la confirmación de traslados
+    ruta_maestro = ruta_archivo("maestro_articulos_file_path", opcional=True)
+    if ruta_maestro:
+        rutas['maestro'] = ruta_maestro
+    return obtener_fuente_datos().descargar_varios(rutas, procesadores={
+        'inventario': cargar_inventario,
+        'proveedores': cargar_proveedores,
+        'maestro': cargar_maestro_articulos,
+    })
+
+def _leer_ordenes(client, spreadsheet_key):
+    """(instante, DataFrame, versión) de 'Registro_Ordenes', leído a través del espejo local."""
+    df_ordenes = leer_hoja_ordenes(client, spreadsheet_key, HOJA_REGISTRO_ORDENES)
+    return time.time(), df_ordenes, version_ordenes(df_ordenes)
+
+def _releer_ordenes_vencidas():
+    """Vuelve a leer 'Registro_Ordenes' cuando las precargadas pasaron de TTL_ORDENES; None si no se puede."""
+    client = connect_to_gsheets()
+    if client is None:
+        return None
     try:
-        dbx_creds = st.secrets["dropbox"]
-        with dropbox.Dropbox(app_key=dbx_creds["app_key"], app_secret=dbx_creds["app_secret"], oauth2_refresh_token=dbx_creds["refresh_token"]) as dbx:
-            metadata, res = dbx.files_download(path=dbx_creds["file_path"])
-            with io.BytesIO(res.content) as stream:
-                df_crudo = pd.read_csv(stream, encoding='latin1', sep='|', header=None, names=column_names)
-        info_message.success("Datos de inventario cargados exitosamente!", icon="✅")
-        return df_crudo
+        return _leer_ordenes(client, st.secrets["gsheets"]["spreadsheet_key"])
     except Exception as e:
-        info_message.error(f"Error al cargar datos de inventario: {e}", icon="🔥")
+        st.warning(f"No se pudo releer '{HOJA_REGISTRO_ORDENES}': {e}. Se cargará al abrir Gestión de Abastecimiento.", icon="⚠️")
         return None
 
 @st.cache_data(ttl=600)
-def cargar_proveedores_desde_dropbox():
-    """Carga el archivo de proveedores 'Provedores.xlsx' desde Dropbox."""
+def cargar_datos_iniciales():
+    """Carga de arranque: archivos base y 'Registro_Ordenes' a la vez; tarda lo que la fuente más lenta.
+
+    Devuelve (df_crudo, df_proveedores, ordenes, versiones): `ordenes` es (instante, DataFrame, versión) o None si
+    falló y `versiones` trae la versión de los archivos de inventario y proveedores (claves de caché del análisis).
+    """
     info_message = st.empty()
-    info_message.info("Cargando archivo de proveedores desde Dropbox...", icon="🤝")
-    try:
-        dbx_creds = st.secrets["dropbox"]
-        proveedores_path = dbx_creds["proveedores_file_path"]
-        with dropbox.Dropbox(app_key=dbx_creds["app_key"], app_secret=dbx_creds["app_secret"], oauth2_refresh_token=dbx_creds["refresh_token"]) as dbx:
-            metadata, res = dbx.files_download(path=proveedores_path)
-            with io.BytesIO(res.content) as stream:
-                df_proveedores = pd.read_excel(stream, dtype={'REFERENCIA': str, 'COD PROVEEDOR': str})
-
-        df_proveedores.rename(columns={
-            'REFERENCIA': 'SKU',
-            'PROVEEDOR': 'Proveedor',
-            'COD PROVEEDOR': 'SKU_Proveedor'
-        }, inplace=True)
-        df_proveedores.dropna(subset=['SKU_Proveedor'], inplace=True)
-        df_proveedores = df_proveedores[['SKU', 'Proveedor', 'SKU_Proveedor']]
-
-        info_message.success("Archivo de proveedores cargado exitosamente!", icon="👍")
-        return df_proveedores
-    except Exception as e:
-        info_message.error(f"No se pudo cargar '{proveedores_path}' desde Dropbox: {e}. La información de proveedores no estará disponible.", icon="🔥")
-        return pd.DataFrame(columns=['SKU', 'Proveedor', 'SKU_Proveedor'])
-
-# ✨ NUEVA FUNCIÓN: Lógica para limpiar duplicados de SKU por almacén
-def limpiar_duplicados_sku_por_almacen(df):
-    if df is None or df.empty:
-        return pd.DataFrame()
-
-    # Agrupar por las columnas clave y sumar o tomar la primera aparición
-    agg_funcs = {
-        'DEPARTAMENTO': 'first',
-        'DESCRIPCION': 'first',
-        'MARCA': 'first',
-        'PESO_ARTICULO': 'first',
-        'UNIDADES_VENDIDAS': 'sum',
-        'STOCK': 'sum',
-        'COSTO_PROMEDIO_UND': 'first', # Asumimos que el costo promedio es el mismo
-        'LEAD_TIME_PROVEEDOR': 'first',
-        'HISTORIAL_VENTAS': lambda x: ','.join(x.dropna().astype(str).unique()) # Combina los historiales de ventas únicos
-    }
+    info_message.info("Conectando a Dropbox y Google Sheets para obtener los datos más recientes...", icon="☁️")
+    # Secrets y cliente de Sheets se resuelven en el hilo principal; los hilos solo hacen red y parseo
+    tareas = {'archivos': _cargar_archivos_base}
+    client = connect_to_gsheets()
+    if client is not None:
+        spreadsheet_key = st.secrets["gsheets"]["spreadsheet_key"]
+        tareas['ordenes'] = lambda: _leer_ordenes(client, spreadsheet_key)
+    resultados = cargar_en_paralelo(tareas)
+
+    df_crudo, df_proveedores, ordenes = None, preparar_indice_proveedores(None), None
+    versiones = {'inventario': None, 'proveedores': None}
+    if resultados['archivos'].error is not None:
+        info_message.error(f"Error al conectar con la fuente de datos: {resultados['archivos'].error}", icon="🔥")
+        return df_crudo, df_proveedores, ordenes, versiones
+    archivos = resultados['archivos'].valor
+    tiempos = resumir_tiempos({**archivos, **{k: v for k, v in resultados.items() if k != 'archivos'}})
+
+    inventario = archivos['inventario']
+    if inventario.error is not None:
+        info_message.error(f"Error al cargar datos de inventario: {inventario.error}", icon="🔥")
+    else:
+        df_crudo, metricas = inventario.valor
+        versiones['inventario'] = metricas['version']
+        if metricas['desde_snapshot']:
+            info_message.success(f"Datos de inventario sin cambios en la fuente: cargados desde el snapshot local ({describir_metricas(metricas)}). Cargas: {tiempos}", icon="⚡")
+        else:
+            info_message.success(f"Datos de inventario cargados exitosamente! ({describir_metricas(metricas)}). Cargas: {tiempos}", icon="✅")
 
-    # Eliminar 'HISTORIAL_VENTAS' si todas sus filas son nulas, para evitar errores en la lambda
-    if df['HISTORIAL_VENTAS'].isnull().all():
-        del agg_funcs['HISTORIAL_VENTAS']
-        
-    df_agrupado = df.groupby(['REFERENCIA', 'CODALMACEN'], as_index=False).agg(agg_funcs)
-    
-    return df_agrupado
+    proveedores = archivos['proveedores']
+    if proveedores.error is not None:
+        st.error(f"No se pudo cargar '{proveedores.ruta}': {proveedores.error}. La información de proveedores no estará disponible.", icon="🔥")
+    else:
+        df_proveedores, info_proveedores = proveedores.valor
+        versiones['proveedores'] = info_proveedores['version']
 
-# --- LÓGICA DE ANÁLISIS DE INVENTARIO ---
-@st.cache_data
-def analizar_inventario_completo(_df_crudo, _df_proveedores, dias_seguridad=7, dias_objetivo=None):
-    if _df_crudo is None or _df_crudo.empty:
-        return pd.DataFrame()
+    maestro = archivos.get('maestro')
+    if maestro is not None and maestro.error is not None:
+        st.warning(f"No se pudo precargar el maestro de artículos: {maestro.error}. Se reintentará al confirmar traslados.", icon="⚠️")
 
-    # Llama a la nueva función de limpieza
-    df = limpiar_duplicados_sku_por_almacen(_df_crudo.copy())
-    
-    if dias_objetivo is None:
-        dias_objetivo = {'A': 30, 'B': 45, 'C': 60}
-
-    # 1. Limpieza y Preparación
-    column_mapping = {
-        'CODALMACEN': 'Almacen', 'DEPARTAMENTO': 'Departamento', 'DESCRIPCION': 'Descripcion',
-        'UNIDADES_VENDIDAS': 'Ventas_60_Dias', 'STOCK': 'Stock', 'COSTO_PROMEDIO_UND': 'Costo_Promedio_UND',
-        'REFERENCIA': 'SKU', 'MARCA': 'Marca', 'PESO_ARTICULO': 'Peso_Articulo', 'HISTORIAL_VENTAS': 'Historial_Ventas',
-        'LEAD_TIME_PROVEEDOR': 'Lead_Time_Proveedor'
-    }
-    df.rename(columns=column_mapping, inplace=True)
-    df['SKU'] = df['SKU'].astype(str)
-    almacen_map = {'158':'Opalo', '155':'Cedi','156':'Armenia','157':'Manizales','189':'Olaya','238':'Laureles','439':'FerreBox','463':'Cerritos'}
-    df['Almacen_Nombre'] = df['Almacen'].astype(str).map(almacen_map).fillna(df['Almacen'])
-    marca_map = {'41':'TERINSA','50':'P8-ASC-MEGA','54':'MPY-International','55':'DPP-AN COLORANTS LATAM','56':'DPP-Pintuco Profesional','57':'ASC-Mega','58':'DPP-Pintuco','59':'DPP-Madetec','60':'POW-Interpon','61':'various','62':'DPP-ICO','63':'DPP-Terinsa','64':'MPY-Pintuco','65':'non-AN Third Party','66':'ICO-AN Packaging','67':'ASC-Automotive OEM','68':'POW-Resicoat'}
-    df['Marca_Nombre'] = pd.to_numeric(df['Marca'], errors='coerce').fillna(0).astype(int).astype(str).map(marca_map).fillna('Complementarios')
-    numeric_cols = ['Ventas_60_Dias', 'Costo_Promedio_UND', 'Stock', 'Peso_Articulo', 'Lead_Time_Proveedor']
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-    df['Stock'] = np.maximum(0, df['Stock'])
-    df.reset_index(inplace=True)
-    df['Historial_Ventas'] = df['Historial_Ventas'].fillna('').astype(str)
-    df_ventas = df[df['Historial_Ventas'].str.contains(':')].copy()
-    df_ventas = df_ventas.assign(Historial_Ventas=df_ventas['Historial_Ventas'].str.split(',')).explode('Historial_Ventas')
-    df_ventas[['Fecha_Venta', 'Unidades']] = df_ventas['Historial_Ventas'].str.split(':', expand=True)
-    df_ventas['Fecha_Venta'] = pd.to_datetime(df_ventas['Fecha_Venta'], errors='coerce')
-    df_ventas['Unidades'] = pd.to_numeric(df_ventas['Unidades'], errors='coerce')
-    df_ventas.dropna(subset=['Fecha_Venta', 'Unidades'], inplace=True)
-    df_ventas = df_ventas[(pd.Timestamp.now() - df_ventas['Fecha_Venta']).dt.days <= 60]
-    demanda_diaria = df_ventas.groupby('index')['Unidades'].sum() / 60
-    df = df.merge(demanda_diaria.rename('Demanda_Diaria_Promedio'), on='index', how='left').fillna({'Demanda_Diaria_Promedio': 0})
-    # FALLBACK: Si Historial_Ventas no parsó pero hay ventas reportadas, usar ese dato
-    mask_fallback = (df['Demanda_Diaria_Promedio'] == 0) & (df['Ventas_60_Dias'] > 0)
-    df.loc[mask_fallback, 'Demanda_Diaria_Promedio'] = df.loc[mask_fallback, 'Ventas_60_Dias'] / 60
-    df['Valor_Inventario'] = df['Stock'] * df['Costo_Promedio_UND']
-    df['Stock_Seguridad'] = df['Demanda_Diaria_Promedio'] * dias_seguridad
-    df['Punto_Reorden'] = (df['Demanda_Diaria_Promedio'] * df['Lead_Time_Proveedor']) + df['Stock_Seguridad']
-    df['Valor_Venta_60_Dias'] = df['Ventas_60_Dias'] * df['Costo_Promedio_UND']
-    total_ventas_valor = df['Valor_Venta_60_Dias'].sum()
-    if total_ventas_valor > 0:
-        ventas_sku_valor = df.groupby('SKU')['Valor_Venta_60_Dias'].sum()
-        sku_to_percent = ventas_sku_valor.sort_values(ascending=False).cumsum() / total_ventas_valor
-        df['Segmento_ABC'] = df['SKU'].map(sku_to_percent).apply(lambda p: 'A' if p <= 0.8 else ('B' if p <= 0.95 else 'C')).fillna('C')
-    else:
-        df['Segmento_ABC'] = 'C'
-    df['dias_objetivo_map'] = df['Segmento_ABC'].map(dias_objetivo)
-    df['Stock_Objetivo'] = df['Demanda_Diaria_Promedio'] * df['dias_objetivo_map']
-    conditions = [
-        (df['Stock'] <= 0) & (df['Demanda_Diaria_Promedio'] > 0),
-        (df['Stock'] > 0) & (df['Demanda_Diaria_Promedio'] <= 0),
-        (df['Stock'] > 0) & (df['Stock'] < df['Punto_Reorden']),
-        (df['Stock'] > df['Stock_Objetivo']),
-    ]
-    choices_estado = ['Quiebre de Stock', 'Baja Rotación / Obsoleto', 'Bajo Stock (Riesgo)', 'Excedente']
-    df['Estado_Inventario'] = np.select(conditions, choices_estado, default='Normal')
-    # --- MÉTRICAS AVANZADAS DE ROTACIÓN ---
-    df['Cobertura_Dias'] = np.where(
-        df['Demanda_Diaria_Promedio'] > 0,
-        df['Stock'] / df['Demanda_Diaria_Promedio'],
-        9999  # Sin demanda = cobertura infinita
-    )
-    df['Rotacion_Inventario'] = np.where(
-        df['Valor_Inventario'] > 0,
-        (df['Valor_Venta_60_Dias'] / df['Valor_Inventario']) * 6,  # Anualizado (60d * 6 = 360d)
-        0
-    )
-    df['Venta_Perdida_Estimada_30d'] = np.where(
-        (df['Stock'] <= 0) & (df['Demanda_Diaria_Promedio'] > 0),
-        df['Demanda_Diaria_Promedio'] * 30 * df['Costo_Promedio_UND'] * 1.30,  # Margen estimado 30%
-        0
-    )
-    # Velocidad de venta: cambio periodo actual vs anterior
-    df['Precio_Venta_Estimado'] = df['Costo_Promedio_UND'] * 1.30
-
-    # Objetivo real: el mayor entre stock_objetivo y punto_reorden (cubre lead times largos)
-    df['Objetivo_Abastecimiento'] = np.maximum(df['Stock_Objetivo'], df['Punto_Reorden'])
-    # Necesidad proactiva: anticipa el consumo durante el lead time del proveedor
-    df['Necesidad_Total'] = np.maximum(0,
-        df['Objetivo_Abastecimiento'] - df['Stock']
-        + (df['Demanda_Diaria_Promedio'] * df['Lead_Time_Proveedor'])
-    )
-    # Excedente_Trasladable: stock que esta tienda puede ceder a otras
-    # - Excedente: todo lo que sobra por encima del Objetivo_Abastecimiento
-    # - Baja Rotación: TODO el stock (si no vende aquí, que venda en otra sede)
-    # - Normal/Bajo Stock/Quiebre: no ceden stock
-    df['Excedente_Trasladable'] = np.select(
-        [
-            df['Estado_Inventario'] == 'Excedente',
-            df['Estado_Inventario'] == 'Baja Rotación / Obsoleto',
-        ],
-        [
-            np.maximum(0, df['Stock'] - df['Objetivo_Abastecimiento']),
-            df['Stock'],  # Todo el stock sin rotación es trasladable
-        ],
-        default=0
-    )
-    sku_summary = df.groupby('SKU').agg(
-        Total_Necesidad_SKU=('Necesidad_Total', 'sum'),
-        Total_Excedente_SKU=('Excedente_Trasladable', 'sum')
-    ).reset_index()
-    sku_summary['Total_Traslados_Posibles_SKU'] = np.minimum(sku_summary['Total_Necesidad_SKU'], sku_summary['Total_Excedente_SKU'])
-    df = df.merge(sku_summary.drop(columns=['Total_Necesidad_SKU']), on='SKU', how='left')
-    df['Unidades_Traslado_Sugeridas'] = 0.0
-    mask_necesidad = (df['Necesidad_Total'] > 0) & (df.groupby('SKU')['Necesidad_Total'].transform('sum') > 0)
-    df.loc[mask_necesidad, 'Unidades_Traslado_Sugeridas'] = (df['Necesidad_Total'] / df.groupby('SKU')['Necesidad_Total'].transform('sum')) * df['Total_Traslados_Posibles_SKU']
-    df['Sugerencia_Compra'] = np.maximum(0, np.ceil(df['Necesidad_Total'] - df['Unidades_Traslado_Sugeridas'].fillna(0)))
-    df['Unidades_Traslado_Sugeridas'] = np.ceil(df['Unidades_Traslado_Sugeridas'].fillna(0))
-
-    if _df_proveedores is not None and not _df_proveedores.empty:
-        _df_proveedores_dedup = _df_proveedores.drop_duplicates(subset=['SKU'], keep='first')
-        df = pd.merge(df, _df_proveedores_dedup, on='SKU', how='left')
-        df['Proveedor'] = df['Proveedor'].fillna('No Asignado')
-        df['SKU_Proveedor'] = df['SKU_Proveedor'].fillna('N/A')
-    else:
-        df['Proveedor'] = 'No Asignado'
-        df['SKU_Proveedor'] = 'N/A'
+    carga_ordenes = resultados.get('ordenes')
+    if carga_ordenes is not None and carga_ordenes.error is not None:
+        st.warning(f"No se pudo precargar '{HOJA_REGISTRO_ORDENES}': {carga_ordenes.error}. Se cargará al abrir Gestión de Abastecimiento.", icon="⚠️")
+    elif carga_ordenes is not None:
+        ordenes = carga_ordenes.valor
+    return df_crudo, df_proveedores, ordenes, versiones
+
+# --- LÓGICA DE ANÁLISIS DE INVENTARIO ---
+ALCANCES_CLASIFICACION = {'global': 'Global (compañía)', 'tienda': 'Por tienda', 'departamento': 'Por departamento'}
+ETIQUETAS_METODOS_DEMANDA = {
+    'ventana_30': 'Promedio 30 días',
+    'ventana_60': 'Promedio 60 días',
+    'ventana_90': 'Promedio 90 días',
+    'exponencial': 'Exponencial (prioriza lo reciente)',
+    'recortada': 'Promedio con picos recortados',
+}
 
-    return df.set_index('index')
+# Etapas del motor (inventario/motor.py) cacheadas por versión de los archivos y día de referencia:
+# mover un slider solo vuelve a ejecutar la etapa de objetivos.
+@st.cache_resource(max_entries=2, show_spinner=False)
+def etapa_demanda(version_inventario, dia, _df_crudo):
+    """Ingesta → demanda (df, cubo de ventas); compartida entre sesiones y de solo lectura."""
+    return preparar_demanda(_df_crudo, hoy=dia)
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def etapa_clasificacion(version_inventario, version_proveedores, dia, alcance_abc, metodos_demanda, _df_crudo, _df_proveedores):
+    """ABC/XYZ, demanda por clase, métricas de rotación y proveedores; de solo lectura."""
+    df_demanda, cubo_ventas = etapa_demanda(version_inventario, dia, _df_crudo)
+    return clasificar_inventario(df_demanda, _df_proveedores, cubo_ventas, alcance_abc, metodos_demanda)
+
+# Un solo cuadro por (versión de datos, parámetros) para todo el proceso: las sesiones con los mismos
+# parámetros comparten el mismo objeto y la memoria crece con los juegos de parámetros, no con los usuarios.
+@st.cache_resource(max_entries=16, show_spinner=False)
+def analizar_inventario_completo(_df_crudo, _df_proveedores, versiones, dia, dias_seguridad=7, dias_objetivo=None, alcance_abc='global', metodos_demanda=None):
+    """(análisis con la columna 'index', índice de filas) para los parámetros del tablero; de solo lectura."""
+    df_clasificado = etapa_clasificacion(versiones['inventario'], versiones['proveedores'], dia, alcance_abc, metodos_demanda, _df_crudo, _df_proveedores)
+    df_analisis = calcular_objetivos(df_clasificado, dias_seguridad=dias_seguridad, dias_objetivo=dias_objetivo).reset_index()
+    # Tienda, marca, estado, SKU... → posiciones de fila, para filtrar sin recorrer columnas en cada rerun
+    return df_analisis, IndiceFilas(df_analisis)
 
 # --- INICIO DE LA INTERFAZ DE USUARIO ---
 st.sidebar.markdown("""
@@ -395,9 +322,21 @@ with col_upd1:
 
 st.markdown("---")
 
-# Cargar ambos dataframes desde Dropbox
-df_crudo = cargar_datos_desde_dropbox()
-df_proveedores = cargar_proveedores_desde_dropbox()
+# Cargar inventario, proveedores y órdenes en paralelo
+if st.session_state.pop(CLAVE_RECARGAR_DATOS, False):
+    # Pedido desde Gestión de Abastecimiento con "Forzar Recarga de Datos"
+    cargar_datos_iniciales.clear()
+df_crudo, df_proveedores, ordenes_precargadas, versiones_datos = cargar_datos_iniciales()
+if (ordenes_precargadas is not None and CLAVE_ORDENES not in st.session_state
+        and time.time() - ordenes_precargadas[0] >= TTL_ORDENES):
+    # La carga de arranque vive 10 minutos en caché: una sesión nueva no planifica con órdenes vencidas
+    ordenes_precargadas = _releer_ordenes_vencidas()
+if ordenes_precargadas is not None:
+    # Gestión de Abastecimiento las reutiliza mientras sigan vigentes en lugar de volver a leer la hoja
+    st.session_state['ordenes_precargadas'] = ordenes_precargadas
+    if CLAVE_ORDENES not in st.session_state:
+        # Estado de abastecimiento compartido: las demás páginas lo calculan con estas órdenes hasta que se relean
+        guardar_ordenes_sesion(st.session_state, ordenes_precargadas[1], ordenes_precargadas[2])
 
 if df_crudo is not None and not df_crudo.empty:
     st.sidebar.header("⚙️ Parámetros del Análisis")
@@ -407,36 +346,76 @@ if df_crudo is not None and not df_crudo.empty:
     dias_obj_a = st.sidebar.slider("Clase A (VIPs)", 15, 45, 30)
     dias_obj_b = st.sidebar.slider("Clase B (Importantes)", 30, 60, 45)
     dias_obj_c = st.sidebar.slider("Clase C (Generales)", 45, 90, 60)
+    alcance_abc_input = st.sidebar.selectbox(
+        "Alcance de la clasificación ABC/XYZ:", list(ALCANCES_CLASIFICACION),
+        format_func=ALCANCES_CLASIFICACION.get,
+        help="Global: un ranking para toda la compañía. Por tienda o departamento: un ranking dentro de cada uno."
+    )
+    with st.sidebar.expander("📈 Cálculo de la demanda por clase"):
+        metodos_demanda_input = {
+            clase: st.selectbox(
+                f"Clase {clase}:", list(METODOS_DEMANDA), key=f"metodo_demanda_{clase}",
+                index=list(METODOS_DEMANDA).index(METODO_DEMANDA_DEFECTO),
+                format_func=ETIQUETAS_METODOS_DEMANDA.get,
+            )
+            for clase in ['A', 'B', 'C']
+        }
 
     with st.spinner("Analizando inventario y asignando proveedores..."):
         dias_objetivo_dict = {'A': dias_obj_a, 'B': dias_obj_b, 'C': dias_obj_c}
-        df_analisis_completo = analizar_inventario_completo(
+        # Día de referencia de las ventanas de ventas: las etapas se recalculan al cambiar de día
+        dia_analisis = pd.Timestamp.now().normalize()
+        df_analisis_completo, indice_analisis = analizar_inventario_completo(
             df_crudo,
             df_proveedores,
+            versiones_datos,
+            dia_analisis,
             dias_seguridad=dias_seguridad_input,
-            dias_objetivo=dias_objetivo_dict
-        ).reset_index()
-
-    st.session_state['df_analisis_maestro'] = df_analisis_completo.copy()
-
+            dias_objetivo=dias_objetivo_dict,
+            alcance_abc=alcance_abc_input,
+            metodos_demanda=metodos_demanda_input
+        )
+        cubo_ventas = etapa_demanda(versiones_datos['inventario'], dia_analisis, df_crudo)[1]
+        # Token del análisis (versiones de los archivos + parámetros): clave de caché de las páginas
+        version_analisis = repr((
+            versiones_datos['inventario'], versiones_datos['proveedores'], dia_analisis.date().isoformat(),
+            dias_seguridad_input, sorted(dias_objetivo_dict.items()), alcance_abc_input, sorted(metodos_demanda_input.items()),
+        ))
+
+    memoria_analisis = df_analisis_completo.attrs.get('memoria_mb')
+    if memoria_analisis:
+        st.sidebar.caption(f"💾 Memoria del análisis: {memoria_analisis[1]:,.1f} MB (antes del esquema compacto: {memoria_analisis[0]:,.1f} MB)")
+
+    # La sesión guarda una referencia al cuadro compartido (sin copia); el rol tienda ve sus filas por posición
+    filas_visibles = None
     if st.session_state.user_role == 'tienda':
-        st.session_state['df_analisis'] = df_analisis_completo[df_analisis_completo['Almacen_Nombre'] == st.session_state.almacen_nombre]
-    else:
-        st.session_state['df_analisis'] = df_analisis_completo.copy()
+        filas_visibles = indice_analisis.filas('Almacen_Nombre', st.session_state.almacen_nombre)
+    st.session_state.pop('df_analisis', None)
+    guardar_analisis_sesion(
+        st.session_state, df_analisis_completo, filas_visibles, indice_analisis,
+        version=version_analisis, clave_filas=f"Almacen_Nombre={st.session_state.almacen_nombre}",
+    )
+    # Cubo de ventas: sus filas corresponden a la columna 'index' del análisis
+    st.session_state['cubo_ventas'] = cubo_ventas
 
+    criterios_vista = {}
     if st.session_state.user_role == 'gerente':
         opcion_consolidado = "-- Consolidado (Todas las Tiendas) --"
         nombres_almacen = [opcion_consolidado] + sorted(df_analisis_completo['Almacen_Nombre'].unique().tolist())
         selected_almacen_nombre = st.sidebar.selectbox("Selecciona la Vista:", nombres_almacen)
-        df_vista = df_analisis_completo if selected_almacen_nombre == opcion_consolidado else df_analisis_completo[df_analisis_completo['Almacen_Nombre'] == selected_almacen_nombre]
+        if selected_almacen_nombre != opcion_consolidado:
+            criterios_vista['Almacen_Nombre'] = selected_almacen_nombre
     else:
         selected_almacen_nombre = st.session_state.almacen_nombre
         st.sidebar.markdown(f"**Vista actual:** `{selected_almacen_nombre}`")
-        df_vista = st.session_state['df_analisis']
+    df_vista = filtrar_sesion(st.session_state, **criterios_vista)
 
     marcas_unicas = sorted(df_vista['Marca_Nombre'].unique().tolist())
     selected_marcas = st.sidebar.multiselect("Filtrar por Marca:", marcas_unicas, default=marcas_unicas)
-    df_filtered = df_vista[df_vista['Marca_Nombre'].isin(selected_marcas)] if selected_marcas else df_vista
+    if selected_marcas and len(selected_marcas) < len(marcas_unicas):
+        df_filtered = filtrar_sesion(st.session_state, Marca_Nombre=selected_marcas, **criterios_vista)
+    else:
+        df_filtered = df_vista
 
     st.markdown(f'<p class="section-header">Métricas Clave: {selected_almacen_nombre}</p>', unsafe_allow_html=True)
     if not df_filtered.empty:
@@ -536,7 +515,7 @@ if df_crudo is not None and not df_crudo.empty:
         else:
             found_skus = df_search_initial['SKU'].unique()
             # Mostrar inventario en todas las tiendas para esos SKUs
-            df_stock_completo = df_analisis_completo[df_analisis_completo['SKU'].isin(found_skus)]
+            df_stock_completo = filtrar_sesion(st.session_state, solo_visibles=False, SKU=list(found_skus))
 
             tab_stock, tab_detalle = st.tabs(["📊 Matriz de Stock por Tienda", "📋 Detalle Completo"])
 
@@ -0,0 +1,106 @@
+# benchmarks/benchmark_carga_local.py
+"""Mide los cargadores de archivos base contra una FuenteLocal, sin latencia de red.
+
+Uso: python benchmarks/benchmark_carga_local.py [--filas 200000] [--directorio RUTA_ESPEJO]
+
+Sin --directorio genera un espejo sintético con la estructura de Dropbox; con --directorio usa uno
+existente (por ejemplo, una copia de la carpeta de Dropbox) y las rutas indicadas en --rutas.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inventario.fuentes import FuenteLocal  # noqa: E402
+from inventario.ingesta import cargar_inventario  # noqa: E402
+from inventario.maestro import cargar_maestro_articulos  # noqa: E402
+from inventario.proveedores import cargar_proveedores  # noqa: E402
+import inventario.snapshot as snapshot  # noqa: E402
+
+RUTAS = {
+    'inventario': '/data/Inventario.txt',
+    'proveedores': '/data/Provedores.xlsx',
+    'maestro': '/data/Maestro_Articulos.csv',
+}
+
+
+def generar_espejo(directorio, n_filas, semilla=0):
+    """Escribe extracto, proveedores y maestro sintéticos bajo `directorio` con las rutas de RUTAS."""
+    rng = np.random.default_rng(semilla)
+    fuente = FuenteLocal(directorio)
+    for ruta in RUTAS.values():
+        os.makedirs(os.path.dirname(fuente.resolver(ruta)), exist_ok=True)
+
+    n_skus = max(1, n_filas // 8)
+    skus = rng.integers(0, n_skus, n_filas).astype(str)
+    hoy = pd.Timestamp.now().normalize()
+    fechas = (hoy - pd.to_timedelta(rng.integers(0, 120, n_filas), unit='D')).strftime('%Y-%m-%d')
+    extracto = pd.DataFrame({
+        'DEPARTAMENTO': rng.choice(['PINTURA', 'HERRAMIENTA', 'ELECTRICO'], n_filas),
+        'REFERENCIA': skus,
+        'DESCRIPCION': 'ARTICULO ' + pd.Series(skus),
+        'MARCA': rng.choice(['PINTUCO', 'ABRACOL', 'YALE'], n_filas),
+        'PESO_ARTICULO': rng.random(n_filas).round(2),
+        'UNIDADES_VENDIDAS': rng.integers(0, 50, n_filas),
+        'STOCK': rng.integers(0, 100, n_filas),
+        'COSTO_PROMEDIO_UND': rng.integers(1_000, 90_000, n_filas),
+        'CODALMACEN': rng.choice(['155', '156', '157', '158', '189', '238', '439', '463'], n_filas),
+        'LEAD_TIME_PROVEEDOR': 7,
+        'HISTORIAL_VENTAS': fechas + ':' + rng.integers(1, 9, n_filas).astype(str),
+    })
+    extracto.to_csv(fuente.resolver(RUTAS['inventario']), sep='|', header=False, index=False, encoding='latin1')
+    pd.DataFrame({
+        'REFERENCIA': np.arange(n_skus).astype(str),
+        'PROVEEDOR': 'PROVEEDOR ' + pd.Series(np.arange(n_skus) % 40).astype(str),
+        'COD PROVEEDOR': np.arange(n_skus).astype(str),
+    }).to_excel(fuente.resolver(RUTAS['proveedores']), index=False)
+    pd.DataFrame({'Referencia': np.arange(n_skus), 'Código': np.arange(n_skus) + 10_000}).to_csv(
+        fuente.resolver(RUTAS['maestro']), sep=';', index=False)
+
+
+def medir(fuente, rutas):
+    inicio = time.perf_counter()
+    resultados = fuente.descargar_varios(rutas, procesadores={
+        'inventario': cargar_inventario,
+        'proveedores': cargar_proveedores,
+        'maestro': cargar_maestro_articulos,
+    })
+    total = time.perf_counter() - inicio
+    for r in resultados.values():
+        if r.error is not None:
+            raise r.error
+    detalle = '  '.join(f"{r.nombre}={r.segundos:6.2f}s" for r in resultados.values())
+    return total, detalle
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', type=int, default=200_000)
+    parser.add_argument('--directorio', default=None)
+    parser.add_argument('--rutas', nargs=3, metavar=('INVENTARIO', 'PROVEEDORES', 'MAESTRO'), default=None)
+    args = parser.parse_args()
+    rutas = dict(zip(RUTAS, args.rutas)) if args.rutas else RUTAS
+
+    with tempfile.TemporaryDirectory() as temporal:
+        # Los snapshots del benchmark no se mezclan con los de la aplicación
+        snapshot.DIRECTORIO_SNAPSHOTS = os.path.join(temporal, 'snapshots')
+        directorio = args.directorio
+        if directorio is None:
+            directorio = os.path.join(temporal, 'espejo')
+            generar_espejo(directorio, args.filas)
+        fuente = FuenteLocal(directorio)
+
+        frio, detalle = medir(fuente, rutas)
+        print(f"{'en frío (parseo)':<24} total={frio:6.2f}s  {detalle}")
+        caliente, detalle = medir(fuente, rutas)
+        print(f"{'con snapshot/caché':<24} total={caliente:6.2f}s  {detalle}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+# benchmarks/benchmark_espejo_ordenes.py
+"""Compara la lectura completa de Registro_Ordenes con la lectura a través del espejo local.
+
+Uso: python benchmarks/benchmark_espejo_ordenes.py [--filas 5000 50000] [--nuevas 10] [--editadas 3]
+
+La hoja es una simulación en memoria con la semántica de la API de Sheets (filas y columnas vacías
+al final recortadas); se cuentan las celdas transferidas y se verifica que el DataFrame resultante
+sea idéntico al de get_all_records con el ID_Grupo calculado como antes.
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inventario.ordenes import leer_hoja_ordenes  # noqa: E402
+
+ENCABEZADOS = [
+    'ID_Grupo', 'ID_Orden', 'Fecha_Emision', 'Proveedor', 'SKU', 'Descripcion', 'Cantidad_Solicitada',
+    'Tienda_Destino', 'Estado', 'Costo_Unitario', 'Costo_Total', 'Peso_Unitario_kg', 'Peso_Total_kg',
+]
+
+
+def _sin_vacios_al_final(fila):
+    fila = list(fila)
+    while fila and fila[-1] == '':
+        fila.pop()
+    return fila
+
+
+def _indice_columna(letras):
+    numero = 0
+    for letra in letras:
+        numero = numero * 26 + ord(letra) - ord('A') + 1
+    return numero
+
+
+class HojaSimulada:
+    """Hoja en memoria con get_all_values, get_all_records y batch_get; cuenta las celdas transferidas."""
+
+    def __init__(self, filas):
+        self.filas = [list(map(str, fila)) for fila in filas]
+        self.celdas = 0
+
+    def get_all_values(self):
+        ancho = max((len(fila) for fila in self.filas), default=0)
+        filas = [fila + [''] * (ancho - len(fila)) for fila in self.filas]
+        while filas and not any(filas[-1]):
+            filas.pop()
+        self.celdas += sum(len(fila) for fila in filas)
+        return filas
+
+    def get_all_records(self):
+        valores = self.get_all_values()
+        return [dict(zip(valores[0], map(_numericise, fila))) for fila in valores[1:]]
+
+    def batch_get(self, rangos):
+        respuesta = []
+        for rango in rangos:
+            if rango == '1:1':
+                respuesta.append([_sin_vacios_al_final(self.filas[0])] if self.filas else [])
+                continue
+            col_a, fila_a, col_b, fila_b = re.fullmatch(r'([A-Z]+)(\d+):([A-Z]+)(\d*)', rango).groups()
+            fin = len(self.filas) if not fila_b else int(fila_b)
+            inicio_col, fin_col = _indice_columna(col_a) - 1, _indice_columna(col_b)
+            filas = [_sin_vacios_al_final(self.filas[k][inicio_col:fin_col]) if k < len(self.filas) else []
+                     for k in range(int(fila_a) - 1, fin)]
+            while filas and not filas[-1]:
+                filas.pop()
+            self.celdas += sum(len(fila) for fila in filas)
+            respuesta.append(filas)
+        return respuesta
+
+
+class ClienteSimulado:
+    def __init__(self, hoja):
+        self.hoja = hoja
+
+    def open_by_key(self, _):
+        return self
+
+    def worksheet(self, _):
+        return self.hoja
+
+
+def _numericise(valor):
+    """Conversión de gspread.utils.numericise que aplica get_all_records."""
+    if '_' in valor:
+        return valor
+    try:
+        return int(valor)
+    except ValueError:
+        try:
+            return float(valor)
+        except ValueError:
+            return valor
+
+
+def lectura_completa(hoja):
+    """Lectura anterior: get_all_records y ID_Grupo con apply fila por fila."""
+    df = pd.DataFrame(hoja.get_all_records())
+    df['SKU'] = df['SKU'].astype(str)
+    df['ID_Grupo'] = df['ID_Orden'].astype(str).apply(lambda x: '-'.join(x.split('-')[:-1]))
+    return df
+
+
+def generar_filas(n_filas, inicio=0, semilla=0):
+    rng = np.random.default_rng(semilla + inicio)
+    filas = []
+    for i in range(inicio, inicio + n_filas):
+        grupo = f"TR-{20240000 + i // 5}"
+        filas.append([
+            grupo, f"{grupo}-{i % 5 + 1}", '2024-01-01 10:00:00', 'TRASLADO INTERNO: Opalo' if i % 2 else 'PROVEEDOR',
+            str(rng.integers(1, 99999)), 'ARTICULO 3.7L', str(rng.integers(1, 30)), 'Armenia', 'Pendiente',
+            f"{rng.random() * 1000:.2f}", '12.5', '1', '0.5',
+        ])
+    return filas
+
+
+def medir(etiqueta, hoja, cliente, directorio):
+    hoja.celdas = 0
+    inicio = time.perf_counter()
+    df = leer_hoja_ordenes(cliente, 'benchmark', 'Registro_Ordenes', directorio)
+    segundos, celdas = time.perf_counter() - inicio, hoja.celdas
+    igual = df.equals(lectura_completa(hoja))
+    print(f"{etiqueta:>14} {len(df):>9,} {celdas:>12,} {df.attrs['lectura']['filas_descargadas']:>10,} "
+          f"{segundos:>10.3f}  {'sí' if igual else 'NO'}")
+    if not igual:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', type=int, nargs='+', default=[5_000, 50_000])
+    parser.add_argument('--nuevas', type=int, default=10)
+    parser.add_argument('--editadas', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'lectura':>14} {'filas':>9} {'celdas red':>12} {'descargas':>10} {'local (s)':>10}  igual")
+    for n_filas in args.filas:
+        hoja = HojaSimulada([ENCABEZADOS] + generar_filas(n_filas))
+        cliente = ClienteSimulado(hoja)
+        with tempfile.TemporaryDirectory() as directorio:
+            hoja.celdas = 0
+            inicio = time.perf_counter()
+            lectura_completa(hoja)
+            print(f"{'completa':>14} {n_filas:>9,} {hoja.celdas:>12,} {n_filas:>10,} {time.perf_counter() - inicio:>10.3f}  -")
+            medir('espejo inicial', hoja, cliente, directorio)
+            medir('sin cambios', hoja, cliente, directorio)
+            hoja.filas += generar_filas(args.nuevas, inicio=n_filas)
+            medir(f"+{args.nuevas} filas", hoja, cliente, directorio)
+            for fila in np.linspace(1, n_filas, args.editadas, dtype=int):
+                hoja.filas[fila][8] = 'Recibido'
+            medir(f"{args.editadas} editadas", hoja, cliente, directorio)
+
+
+if __name__ == '__main__':
+    main()
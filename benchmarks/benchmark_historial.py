@@ -0,0 +1,84 @@
+# benchmarks/benchmark_historial.py
+"""Compara el parser de HISTORIAL_VENTAS de una pasada contra la ruta con explode.
+
+Uso: python benchmarks/benchmark_historial.py [--entradas 10000 100000 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inventario.cubo import CuboVentas  # noqa: E402
+from inventario.historial import dia_desde_epoca, parsear_historial  # noqa: E402
+
+
+def generar_historiales(n_entradas, entradas_por_fila=12, semilla=0):
+    """Historiales sintéticos 'fecha:unidades,...' con ~`n_entradas` entradas en total."""
+    rng = np.random.default_rng(semilla)
+    n_filas = max(1, n_entradas // entradas_por_fila)
+    hoy = pd.Timestamp.now().normalize()
+    fechas = (hoy - pd.to_timedelta(rng.integers(0, 180, n_entradas), unit='D')).strftime('%Y-%m-%d')
+    unidades = rng.integers(1, 20, n_entradas).astype(str)
+    entradas = pd.Series(fechas + ':' + unidades)
+    filas = np.sort(rng.integers(0, n_filas, n_entradas))
+    historiales = entradas.groupby(filas).agg(','.join).reindex(range(n_filas))
+    # Algunas filas sin historial o con basura, como en el extracto real
+    historiales.iloc[::17] = np.nan
+    historiales.iloc[5::23] = 'sin ventas'
+    return historiales
+
+
+def demanda_ruta_explode(historiales):
+    """Ruta anterior de analizar_inventario_completo (split/explode/to_datetime) para 60 días."""
+    df = pd.DataFrame({'Historial_Ventas': historiales}).reset_index()
+    df['Historial_Ventas'] = df['Historial_Ventas'].fillna('').astype(str)
+    df_ventas = df[df['Historial_Ventas'].str.contains(':')].copy()
+    df_ventas = df_ventas.assign(Historial_Ventas=df_ventas['Historial_Ventas'].str.split(',')).explode('Historial_Ventas')
+    df_ventas[['Fecha_Venta', 'Unidades']] = df_ventas['Historial_Ventas'].str.split(':', expand=True)
+    df_ventas['Fecha_Venta'] = pd.to_datetime(df_ventas['Fecha_Venta'], errors='coerce')
+    df_ventas['Unidades'] = pd.to_numeric(df_ventas['Unidades'], errors='coerce')
+    df_ventas.dropna(subset=['Fecha_Venta', 'Unidades'], inplace=True)
+    df_ventas = df_ventas[(pd.Timestamp.now() - df_ventas['Fecha_Venta']).dt.days <= 60]
+    demanda_diaria = df_ventas.groupby('index')['Unidades'].sum() / 60
+    df = df.merge(demanda_diaria.rename('Demanda_Diaria_Promedio'), on='index', how='left').fillna({'Demanda_Diaria_Promedio': 0})
+    return df['Demanda_Diaria_Promedio'].to_numpy()
+
+
+def demanda_parser_una_pasada(historiales):
+    cubo = CuboVentas(parsear_historial(historiales), len(historiales), dia_desde_epoca(pd.Timestamp.now()))
+    return cubo.total_ventana(hasta=60) / 60
+
+
+def cronometrar(funcion, *args, repeticiones=3):
+    mejor, resultado = float('inf'), None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entradas', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'entradas':>10} {'filas':>8} {'explode (s)':>12} {'una pasada (s)':>15} {'aceleración':>12}  demanda igual")
+    for n_entradas in args.entradas:
+        historiales = generar_historiales(n_entradas)
+        t_explode, demanda_explode = cronometrar(demanda_ruta_explode, historiales, repeticiones=args.repeticiones)
+        t_nuevo, demanda_nueva = cronometrar(demanda_parser_una_pasada, historiales, repeticiones=args.repeticiones)
+        iguales = np.allclose(demanda_explode, demanda_nueva)
+        print(f"{n_entradas:>10,} {len(historiales):>8,} {t_explode:>12.3f} {t_nuevo:>15.3f} {t_explode / t_nuevo:>11.1f}x  {'sí' if iguales else 'NO'}")
+        if not iguales:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
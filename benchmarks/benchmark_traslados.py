@@ -0,0 +1,110 @@
+# benchmarks/benchmark_traslados.py
+"""Compara el plan de traslados con arreglos ordenados contra el recorrido anterior con iterrows.
+
+Uso: python benchmarks/benchmark_traslados.py [--skus 1000 20000 60000] [--max-recorrido 10000] [--optimo]
+
+El recorrido anterior solo se mide mientras las filas con necesidad no pasen de --max-recorrido;
+por encima tarda minutos y se muestra únicamente el plan nuevo. Con --optimo también se mide el
+modo de costo mínimo y se compara su flete estimado con el del plan voraz.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inventario.traslados import plan_traslados  # noqa: E402
+
+TIENDAS = ['Armenia', 'Manizales', 'Opalo', 'Olaya', 'Laureles', 'FerreBox', 'Cedi', 'Cerritos']
+
+
+def generar_analisis(n_skus, semilla=0, fraccion_cruzada=0.05):
+    """Cuadro sintético SKU × tienda con necesidades, excedentes y algunas tiendas que tienen ambos."""
+    rng = np.random.default_rng(semilla)
+    n = n_skus * len(TIENDAS)
+    necesidad = np.where(rng.random(n) < 0.4, rng.random(n) * 20, 0.0)
+    excedente = np.where((necesidad == 0) & (rng.random(n) < 0.4), rng.random(n) * 30, 0.0)
+    excedente = np.where(rng.random(n) < fraccion_cruzada, rng.random(n) * 10, excedente)
+    return pd.DataFrame({
+        'SKU': np.repeat(np.arange(n_skus), len(TIENDAS)).astype(str),
+        'Almacen_Nombre': np.tile(TIENDAS, n_skus),
+        'Descripcion': 'ARTICULO', 'Marca_Nombre': 'MARCA', 'Proveedor': 'PROVEEDOR', 'Segmento_ABC': 'A',
+        'Stock': rng.integers(0, 50, n),
+        'Necesidad_Ajustada_Por_Transito': necesidad,
+        'Excedente_Trasladable': excedente,
+        'Cobertura_Dias_Proyectada': rng.random(n) * 30,
+        'Peso_Articulo': rng.random(n),
+        'Costo_Promedio_UND': rng.random(n) * 1000,
+    })
+
+
+def plan_recorrido_iterrows(df):
+    """Recorrido anterior de generar_plan_traslados_inteligente (necesidad por necesidad, origen por origen)."""
+    df_origen = df[df['Excedente_Trasladable'] > 0].sort_values(by='Excedente_Trasladable', ascending=False, kind='stable')
+    df_destino = df[df['Necesidad_Ajustada_Por_Transito'] > 0].sort_values(
+        by=['Cobertura_Dias_Proyectada', 'Necesidad_Ajustada_Por_Transito'], ascending=[True, False])
+    excedentes_mutables = df_origen.set_index(['SKU', 'Almacen_Nombre'])['Excedente_Trasladable'].to_dict()
+    plan = []
+    for _, necesidad_row in df_destino.iterrows():
+        sku, tienda_necesitada, necesidad_actual = necesidad_row['SKU'], necesidad_row['Almacen_Nombre'], necesidad_row['Necesidad_Ajustada_Por_Transito']
+        posibles_origenes = df_origen[(df_origen['SKU'] == sku) & (df_origen['Almacen_Nombre'] != tienda_necesitada)]
+        for _, origen_row in posibles_origenes.iterrows():
+            tienda_origen = origen_row['Almacen_Nombre']
+            excedente_disponible = excedentes_mutables.get((sku, tienda_origen), 0)
+            if excedente_disponible > 0 and necesidad_actual > 0:
+                unidades_a_enviar = np.floor(min(necesidad_actual, excedente_disponible))
+                if unidades_a_enviar < 1: continue
+                plan.append((sku, tienda_origen, tienda_necesitada, unidades_a_enviar))
+                necesidad_actual -= unidades_a_enviar
+                excedentes_mutables[(sku, tienda_origen)] -= unidades_a_enviar
+    return pd.DataFrame(plan, columns=['SKU', 'Tienda Origen', 'Tienda Destino', 'Uds a Enviar'])
+
+
+def normalizar(plan):
+    columnas = ['SKU', 'Tienda Origen', 'Tienda Destino']
+    return plan[columnas + ['Uds a Enviar']].sort_values(columnas).reset_index(drop=True)
+
+
+def cronometrar(funcion, *args, repeticiones=3):
+    mejor, resultado = float('inf'), None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--skus', type=int, nargs='+', default=[1_000, 20_000, 60_000])
+    parser.add_argument('--max-recorrido', type=int, default=10_000)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--optimo', action='store_true')
+    args = parser.parse_args()
+
+    print(f"{'skus':>8} {'necesidades':>12} {'traslados':>10} {'iterrows (s)':>13} {'arreglos (s)':>13} {'aceleración':>12}  plan igual")
+    for n_skus in args.skus:
+        df = generar_analisis(n_skus)
+        n_necesidades = int((df['Necesidad_Ajustada_Por_Transito'] > 0).sum())
+        t_nuevo, plan_nuevo = cronometrar(plan_traslados, df, repeticiones=args.repeticiones)
+        if n_necesidades > args.max_recorrido:
+            print(f"{n_skus:>8,} {n_necesidades:>12,} {len(plan_nuevo):>10,} {'-':>13} {t_nuevo:>13.3f} {'-':>12}  -")
+        else:
+            t_anterior, plan_anterior = cronometrar(plan_recorrido_iterrows, df, repeticiones=1)
+            igual = normalizar(plan_anterior).equals(normalizar(plan_nuevo))
+            print(f"{n_skus:>8,} {n_necesidades:>12,} {len(plan_nuevo):>10,} {t_anterior:>13.3f} {t_nuevo:>13.3f} {t_anterior / t_nuevo:>11.1f}x  {'sí' if igual else 'NO'}")
+            if not igual:
+                sys.exit(1)
+        if args.optimo:
+            t_optimo, plan_optimo = cronometrar(lambda df: plan_traslados(df, modo='optimo'), df, repeticiones=1)
+            print(f"{'':>8} óptimo ({plan_optimo.attrs['modo_plan']}): {t_optimo:.3f} s, "
+                  f"uds {plan_optimo['Uds a Enviar'].sum():,.0f} vs {plan_nuevo['Uds a Enviar'].sum():,.0f}, "
+                  f"flete ${plan_optimo.attrs['costo_flete']:,.0f} vs ${plan_nuevo.attrs['costo_flete']:,.0f}")
+
+
+if __name__ == '__main__':
+    main()
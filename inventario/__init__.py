@@ -0,0 +1,2 @@
+# inventario/__init__.py
+"""Componentes de carga y análisis de inventario compartidos por el tablero y sus páginas."""
@@ -0,0 +1,280 @@
+# inventario/abastecimiento.py
+"""Estado de abastecimiento con órdenes abiertas y plan de traslados único para todas las páginas.
+
+Sin dependencias de Streamlit: la caché compartida por versión de datos vive en utils.estado_abastecimiento.
+"""
+import numpy as np
+import pandas as pd
+
+from inventario.indice import IndiceFilas
+from inventario.ordenes import (
+    construir_mapa_tiendas_canonicas, lineas_cambiadas, normalizar_sku_clave, normalizar_tienda_canonica,
+    preparar_ordenes_abiertas_para_calculo,
+)
+from inventario.traslados import costo_flete, plan_traslados
+
+# Por encima de esta fracción de filas afectadas por las órdenes que cambiaron, se recalcula todo
+FRACCION_MAXIMA_INCREMENTAL = 0.5
+# Columnas que dependen de las órdenes abiertas y del plan: las que se recalculan por SKU
+COLUMNAS_INCREMENTALES = [
+    'Stock_En_Transito', 'Stock_Saliente_Reservado', 'Stock_Disponible_Actual', 'Objetivo_Abastecimiento',
+    'Stock_Disponible_Proyectado', 'Necesidad_Ajustada_Por_Transito', 'Excedente_Trasladable',
+    'Cobertura_Dias_Proyectada', 'Cubierto_Por_Traslado', 'Sugerencia_Compra', 'Prioridad_Abastecimiento',
+    'Tienda_Destino_Sugerida', 'Tienda_Origen_Sugerida',
+]
+
+
+def _entero_seguro(serie):
+    """Serie numérica a entero (redondeo hacia arriba) sin fallar por NaN o infinitos."""
+    serie_numerica = pd.to_numeric(serie, errors='coerce')
+    return np.ceil(serie_numerica.replace([np.inf, -np.inf], np.nan).fillna(0)).astype(int)
+
+
+def _tienda_principal(df_maestro, df_plan, columna_propia, columna_otra):
+    """Por fila del maestro, la tienda con la que el plan intercambia más unidades ('' si ninguna).
+
+    Con columna_propia='Tienda Origen' es el destino principal de su excedente; con 'Tienda Destino',
+    el origen principal de lo que recibe.
+    """
+    if df_plan is None or df_plan.empty:
+        return pd.Series('', index=df_maestro.index)
+    principal = (
+        df_plan.groupby(['SKU', columna_propia, columna_otra])['Uds a Enviar'].sum().reset_index()
+        .sort_values('Uds a Enviar', ascending=False, kind='stable')
+        .drop_duplicates(['SKU', columna_propia])
+        .set_index(['SKU', columna_propia])[columna_otra]
+    )
+    claves = pd.MultiIndex.from_arrays([df_maestro['SKU'], df_maestro['Almacen_Nombre']])
+    return pd.Series(principal.reindex(claves).fillna('').to_numpy(), index=df_maestro.index)
+
+
+def _suma_por_fila(df_maestro, df_fuente, columna_tienda, columna_valor):
+    """Por fila del maestro, la suma de `columna_valor` de `df_fuente` con su SKU y tienda (0 si no hay)."""
+    if df_fuente is None or df_fuente.empty:
+        return np.zeros(len(df_maestro))
+    suma = df_fuente.groupby(['SKU', columna_tienda])[columna_valor].sum()
+    claves = pd.MultiIndex.from_arrays([df_maestro['SKU'], df_maestro['Almacen_Nombre']])
+    return suma.reindex(claves).fillna(0).to_numpy()
+
+
+def _salidas_trasladadas(df_ordenes_abiertas):
+    """Órdenes abiertas que son traslados con tienda de origen conocida (reservan stock en el origen)."""
+    return df_ordenes_abiertas[df_ordenes_abiertas['Es_Traslado'] & (df_ordenes_abiertas['Tienda_Origen'] != '')]
+
+
+def _calcular_necesidades(df_maestro):
+    """Disponible, objetivo, necesidad ajustada por tránsito, excedente y cobertura, fila por fila (en su lugar)."""
+    numeric_cols = ['Stock', 'Costo_Promedio_UND', 'Necesidad_Total', 'Excedente_Trasladable', 'Precio_Venta_Estimado', 'Demanda_Diaria_Promedio', 'Peso_Articulo', 'Stock_Objetivo', 'Punto_Reorden', 'Stock_En_Transito', 'Stock_Saliente_Reservado', 'Lead_Time_Proveedor']
+    for col in numeric_cols:
+        if col in df_maestro.columns:
+            df_maestro[col] = pd.to_numeric(df_maestro[col], errors='coerce').fillna(0)
+        else: 
+            df_maestro[col] = 0
+
+    df_maestro['Stock_Disponible_Actual'] = (df_maestro['Stock'] - df_maestro['Stock_Saliente_Reservado']).clip(lower=0)
+    df_maestro['Objetivo_Abastecimiento'] = np.maximum(
+        df_maestro.get('Stock_Objetivo', 0),
+        df_maestro.get('Punto_Reorden', 0)
+    )
+    # Para productos sin demanda, el objetivo es 0 (no necesitan stock aquí, que se traslade)
+    # Para productos con demanda cuyo objetivo base sea 0, usar fallback conservador
+    objetivo_fallback = np.where(
+        df_maestro['Demanda_Diaria_Promedio'] > 0,
+        (df_maestro['Stock'] + df_maestro['Necesidad_Total']).clip(lower=1),
+        0  # Sin demanda → objetivo 0 → todo su stock es excedente trasladable
+    )
+    df_maestro['Objetivo_Abastecimiento'] = np.where(
+        df_maestro['Objetivo_Abastecimiento'] > 0,
+        df_maestro['Objetivo_Abastecimiento'],
+        objetivo_fallback
+    )
+    df_maestro['Stock_Disponible_Proyectado'] = df_maestro['Stock_Disponible_Actual'] + df_maestro['Stock_En_Transito']
+    df_maestro['Necesidad_Ajustada_Por_Transito'] = (
+        df_maestro['Objetivo_Abastecimiento']
+        - df_maestro['Stock_Disponible_Proyectado']
+        + df_maestro['Demanda_Diaria_Promedio'] * df_maestro['Lead_Time_Proveedor']
+    ).clip(lower=0)
+    # Excedente_Trasladable recalculado con órdenes abiertas:
+    # - Con demanda: solo lo que sobra por encima del objetivo
+    # - Sin demanda (Baja Rotación): todo el stock disponible es trasladable
+    excedente_por_stock = (df_maestro['Stock_Disponible_Actual'] - df_maestro['Objetivo_Abastecimiento']).clip(lower=0)
+    df_maestro['Excedente_Trasladable'] = np.where(
+        df_maestro['Demanda_Diaria_Promedio'] <= 0,
+        df_maestro['Stock_Disponible_Actual'].clip(lower=0),
+        excedente_por_stock
+    )
+    df_maestro['Cobertura_Dias_Proyectada'] = np.where(
+        df_maestro['Demanda_Diaria_Promedio'] > 0,
+        df_maestro['Stock_Disponible_Proyectado'] / df_maestro['Demanda_Diaria_Promedio'],
+        9999
+    )
+
+
+def _aplicar_plan(df_maestro, df_plan):
+    """Cubierto por traslado, sugerencia de compra, prioridad y tiendas sugeridas según el plan (en su lugar)."""
+    df_maestro['Cubierto_Por_Traslado'] = (
+        _suma_por_fila(df_maestro, df_plan, 'Tienda Destino', 'Uds a Enviar')
+        if df_plan is not None and not df_plan.empty else 0
+    )
+    sugerencia_compra = (df_maestro['Necesidad_Ajustada_Por_Transito'] - df_maestro['Cubierto_Por_Traslado']).clip(lower=0)
+    df_maestro['Sugerencia_Compra'] = _entero_seguro(sugerencia_compra)
+    df_maestro['Prioridad_Abastecimiento'] = np.select(
+        [
+            (df_maestro['Necesidad_Ajustada_Por_Transito'] > 0) & (df_maestro['Cobertura_Dias_Proyectada'] <= 7),
+            (df_maestro['Necesidad_Ajustada_Por_Transito'] > 0) & (df_maestro['Cobertura_Dias_Proyectada'] <= 15),
+            df_maestro['Necesidad_Ajustada_Por_Transito'] > 0
+        ],
+        ['Crítica', 'Alta', 'Media'],
+        default='Estable'
+    )
+    df_maestro['Tienda_Destino_Sugerida'] = _tienda_principal(df_maestro, df_plan, 'Tienda Origen', 'Tienda Destino')
+    df_maestro['Tienda_Origen_Sugerida'] = _tienda_principal(df_maestro, df_plan, 'Tienda Destino', 'Tienda Origen')
+
+
+def _reemplazar_filas(df, filas, df_filas, columnas):
+    """Sustituye en `df`, columna por columna, los valores de las `filas` (posiciones) por los de `df_filas`."""
+    for columna in columnas:
+        actual, nuevo = df[columna], df_filas[columna]
+        if pd.api.types.is_numeric_dtype(actual) and pd.api.types.is_numeric_dtype(nuevo):
+            valores = actual.to_numpy(dtype=np.result_type(actual.dtype, nuevo.dtype), copy=True)
+            valores[filas] = nuevo.to_numpy()
+            df[columna] = valores
+        else:
+            serie = actual.copy()
+            serie.iloc[filas] = nuevo.to_numpy()
+            df[columna] = serie
+
+
+def calcular_estado_abastecimiento(df_base, df_ordenes, modo_traslados='voraz', distancias=None):
+    """Maestro con tránsito, reservas, necesidades y sugerencias, y el plan de traslados que las cubre.
+
+    `df_base` es el maestro del análisis (no se modifica) y `df_ordenes` el registro de órdenes; SKU y
+    tiendas se normalizan para cruzarlos. El plan (inventario.traslados.plan_traslados, en
+    `modo_traslados`) es el único que usan las páginas: Cubierto_Por_Traslado y Sugerencia_Compra
+    salen de él, y Tienda_Destino_Sugerida / Tienda_Origen_Sugerida dicen a qué tienda envía más una
+    fila con excedente y de cuál recibe más una fila con necesidad. El maestro devuelto conserva el
+    índice de `df_base`. Devuelve (maestro, plan).
+    """
+    df_maestro = df_base.copy(deep=False)
+    mapa_tiendas = construir_mapa_tiendas_canonicas(df_maestro)
+
+    if 'SKU' in df_maestro.columns:
+        df_maestro['SKU'] = df_maestro['SKU'].apply(normalizar_sku_clave)
+    if 'Almacen_Nombre' in df_maestro.columns:
+        df_maestro['Almacen_Nombre'] = df_maestro['Almacen_Nombre'].apply(lambda valor: normalizar_tienda_canonica(valor, mapa_tiendas))
+
+    df_ordenes_abiertas = preparar_ordenes_abiertas_para_calculo(df_ordenes, mapa_tiendas)
+    df_maestro['Stock_En_Transito'] = 0
+    df_maestro['Stock_Saliente_Reservado'] = 0
+
+    if not df_ordenes_abiertas.empty:
+        df_maestro['Stock_En_Transito'] = df_maestro['Stock_En_Transito'] + _suma_por_fila(
+            df_maestro, df_ordenes_abiertas, 'Tienda_Destino', 'Cantidad_Solicitada')
+        salidas_abiertas = _salidas_trasladadas(df_ordenes_abiertas)
+        if not salidas_abiertas.empty:
+            df_maestro['Stock_Saliente_Reservado'] = df_maestro['Stock_Saliente_Reservado'] + _suma_por_fila(
+                df_maestro, salidas_abiertas, 'Tienda_Origen', 'Cantidad_Solicitada')
+
+    _calcular_necesidades(df_maestro)
+    df_plan_maestro = plan_traslados(df_maestro, modo=modo_traslados, distancias=distancias)
+    _aplicar_plan(df_maestro, df_plan_maestro)
+
+    if 'Precio_Venta_Estimado' not in df_maestro.columns or df_maestro['Precio_Venta_Estimado'].sum() == 0:
+        df_maestro['Precio_Venta_Estimado'] = df_maestro['Costo_Promedio_UND'] * 1.30
+
+    return df_maestro, df_plan_maestro
+
+
+def actualizar_estado_abastecimiento(df_maestro, df_plan, indice, lineas_agregadas, lineas_quitadas,
+                                     modo_traslados='voraz', distancias=None):
+    """Aplica a un estado ya calculado las líneas de órdenes que cambiaron, replanificando solo sus SKU.
+
+    `lineas_agregadas` y `lineas_quitadas` son filas del registro (ordenes.lineas_cambiadas). Solo
+    cuentan las abiertas: sus cantidades se suman o restan al tránsito y a lo reservado de su
+    SKU-tienda, y todas las tiendas de esos SKU se recalculan con un plan propio (el plan reparte
+    cada SKU por separado; en modo 'optimo' la prioridad de los destinos se escala sobre ese
+    subconjunto). `df_maestro` se modifica en su lugar (COLUMNAS_INCREMENTALES) con `indice`, su
+    IndiceFilas. Devuelve (plan nuevo, SKU replanificados), o None sin tocar nada si las filas
+    afectadas pasan de FRACCION_MAXIMA_INCREMENTAL.
+    """
+    mapa_tiendas = construir_mapa_tiendas_canonicas(df_maestro)
+    agregadas = preparar_ordenes_abiertas_para_calculo(lineas_agregadas, mapa_tiendas)
+    quitadas = preparar_ordenes_abiertas_para_calculo(lineas_quitadas, mapa_tiendas)
+    skus = set(agregadas['SKU']) | set(quitadas['SKU'])
+    filas = indice.filas('SKU', sorted(skus)) if skus else np.array([], dtype=np.intp)
+    if not len(filas):
+        return df_plan, set()
+    if len(filas) > FRACCION_MAXIMA_INCREMENTAL * len(df_maestro):
+        return None
+
+    df_filas = df_maestro.iloc[filas].copy()
+    df_filas['Stock_En_Transito'] = (
+        df_filas['Stock_En_Transito']
+        + _suma_por_fila(df_filas, agregadas, 'Tienda_Destino', 'Cantidad_Solicitada')
+        - _suma_por_fila(df_filas, quitadas, 'Tienda_Destino', 'Cantidad_Solicitada')
+    )
+    df_filas['Stock_Saliente_Reservado'] = (
+        df_filas['Stock_Saliente_Reservado']
+        + _suma_por_fila(df_filas, _salidas_trasladadas(agregadas), 'Tienda_Origen', 'Cantidad_Solicitada')
+        - _suma_por_fila(df_filas, _salidas_trasladadas(quitadas), 'Tienda_Origen', 'Cantidad_Solicitada')
+    )
+    _calcular_necesidades(df_filas)
+    plan_filas = plan_traslados(df_filas, modo=modo_traslados, distancias=distancias)
+    _aplicar_plan(df_filas, plan_filas)
+    _reemplazar_filas(df_maestro, filas, df_filas, COLUMNAS_INCREMENTALES)
+
+    skus_replanificados = set(df_filas['SKU'])
+    partes = [plan for plan in (
+        df_plan[~df_plan['SKU'].isin(skus_replanificados)] if not df_plan.empty else df_plan, plan_filas,
+    ) if not plan.empty]
+    if not partes:
+        return pd.DataFrame(), skus_replanificados
+    plan_nuevo = pd.concat(partes).sort_values(by=['Valor del Traslado'], ascending=False, kind='stable')
+    respaldo = 'voraz (respaldo)' in (df_plan.attrs.get('modo_plan'), plan_filas.attrs.get('modo_plan'))
+    plan_nuevo.attrs['modo_plan'] = 'voraz (respaldo)' if respaldo else modo_traslados
+    plan_nuevo.attrs['costo_flete'] = costo_flete(plan_nuevo, distancias)
+    return plan_nuevo, skus_replanificados
+
+
+class EstadoAbastecimiento:
+    """Maestro, plan de traslados e índice calculados para una lectura del registro de órdenes.
+
+    `actualizar` lo pone al día con otra lectura: compara ambas (ordenes.lineas_cambiadas) y
+    replanifica solo los SKU de las líneas que cambiaron sobre una copia superficial del maestro; si
+    no se pueden comparar o el cambio es grande, lo recalcula todo. Los objetos ya entregados no se
+    modifican nunca: maestro, plan, índice y versión se sustituyen juntos al final.
+    """
+
+    def __init__(self, df_base, df_ordenes, version_ordenes, modo_traslados='voraz', distancias=None):
+        self._df_base = df_base
+        self.modo_traslados = modo_traslados
+        self.distancias = distancias
+        self._calcular(df_ordenes, version_ordenes)
+
+    def _sustituir(self, maestro, plan, indice, df_ordenes, version_ordenes):
+        self.maestro, self.plan, self.indice = maestro, plan, indice
+        self.df_ordenes, self.version_ordenes = df_ordenes, version_ordenes
+
+    def _calcular(self, df_ordenes, version_ordenes):
+        maestro, plan = calcular_estado_abastecimiento(
+            self._df_base, df_ordenes, self.modo_traslados, self.distancias)
+        self._sustituir(maestro, plan, IndiceFilas(maestro), df_ordenes, version_ordenes)
+
+    def actualizar(self, df_ordenes, version_ordenes):
+        """SKU replanificados para llegar a `version_ordenes` (vacío si ya estaba al día, None si se recalculó todo)."""
+        if version_ordenes == self.version_ordenes:
+            return set()
+        cambios = lineas_cambiadas(self.df_ordenes, df_ordenes)
+        resultado = None
+        if cambios is not None:
+            # La copia comparte los datos; _reemplazar_filas asigna columnas nuevas y no toca el original.
+            # El índice sigue valiendo: las columnas indexadas no están en COLUMNAS_INCREMENTALES
+            maestro = self.maestro.copy(deep=False)
+            resultado = actualizar_estado_abastecimiento(
+                maestro, self.plan, self.indice, *cambios, self.modo_traslados, self.distancias)
+        if resultado is None:
+            self._calcular(df_ordenes, version_ordenes)
+            return None
+        plan, skus = resultado
+        self._sustituir(maestro, plan, self.indice, df_ordenes, version_ordenes)
+        return skus
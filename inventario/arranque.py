@@ -0,0 +1,33 @@
+# inventario/arranque.py
+"""Ejecución concurrente de cargas independientes (Dropbox, Google Sheets) con fallos parciales."""
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+ResultadoCarga = namedtuple('ResultadoCarga', ['nombre', 'valor', 'segundos', 'error'])
+
+
+def _ejecutar(nombre, tarea):
+    inicio = time.perf_counter()
+    try:
+        return ResultadoCarga(nombre, tarea(), time.perf_counter() - inicio, None)
+    except Exception as e:
+        return ResultadoCarga(nombre, None, time.perf_counter() - inicio, e)
+
+
+def cargar_en_paralelo(tareas, max_hilos=None, prefijo_hilos='carga'):
+    """Ejecuta {nombre: función sin argumentos} a la vez y espera a que terminen todas.
+
+    Devuelve {nombre: ResultadoCarga} en el orden de `tareas`; el error de una fuente queda en su
+    resultado sin cancelar las demás, así el tiempo total es el de la carga más lenta.
+    """
+    if not tareas:
+        return {}
+    with ThreadPoolExecutor(max_workers=max_hilos or len(tareas), thread_name_prefix=prefijo_hilos) as pool:
+        futuros = {nombre: pool.submit(_ejecutar, nombre, tarea) for nombre, tarea in tareas.items()}
+        return {nombre: futuro.result() for nombre, futuro in futuros.items()}
+
+
+def resumir_tiempos(resultados):
+    """Texto 'fuente 1.23 s · ...' con el tiempo de cada carga."""
+    return " · ".join(f"{r.nombre} {r.segundos:.2f} s" for r in resultados.values())
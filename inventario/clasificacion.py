@@ -0,0 +1,93 @@
+# inventario/clasificacion.py
+"""Clasificación ABC (valor) y XYZ (variabilidad de la demanda) por alcance global, tienda o departamento."""
+import numpy as np
+import pandas as pd
+
+SEGMENTOS_ABC = ['A', 'B', 'C']
+SEGMENTOS_XYZ = ['X', 'Y', 'Z']
+# Participación acumulada del valor de venta hasta la que un SKU es A y B
+UMBRALES_ABC = (0.80, 0.95)
+# Coeficiente de variación de la demanda semanal hasta el que un SKU es X e Y
+UMBRALES_XYZ = (0.50, 1.00)
+SEMANAS_XYZ = 12
+# Alcance → columna que separa los rankings (None = un solo ranking para toda la compañía)
+ALCANCES = {'global': None, 'tienda': 'Almacen_Nombre', 'departamento': 'Departamento'}
+
+
+def _grupos_alcance(df, alcance):
+    """(grupo SKU-dentro-del-alcance de cada fila, alcance de cada grupo, número de grupos)."""
+    if alcance not in ALCANCES:
+        raise ValueError(f"Alcance de clasificación desconocido: {alcance!r} (opciones: {', '.join(ALCANCES)})")
+    columna = ALCANCES[alcance]
+    sku = df['SKU'].astype(str)
+    if columna is None:
+        grupos, unicos = pd.factorize(sku)
+        return grupos, np.zeros(len(unicos), dtype=np.int64), len(unicos)
+    codigos_alcance = pd.factorize(df[columna].astype(str))[0].astype(np.int64)
+    codigos_sku, skus = pd.factorize(sku)
+    # Clave entera (alcance, SKU): factorizar enteros evita construir un MultiIndex
+    grupos, unicos = pd.factorize(codigos_alcance * len(skus) + codigos_sku)
+    alcance_grupo = np.zeros(len(unicos), dtype=np.int64)
+    alcance_grupo[grupos] = codigos_alcance
+    return grupos, alcance_grupo, len(unicos)
+
+
+def _abc_por_grupo(valor_grupo, alcance_grupo, umbrales):
+    """Código ABC de cada grupo con una sola ordenación (alcance, valor desc.) y searchsorted."""
+    if len(valor_grupo) == 0:
+        return np.zeros(0, dtype=np.int8)
+    orden = np.lexsort((-valor_grupo, alcance_grupo))
+    acumulado = np.cumsum(valor_grupo[orden])
+    alcance_ordenado = alcance_grupo[orden]
+    # Acumulado antes del primer grupo de cada alcance, para reiniciar la suma por alcance
+    inicio = np.r_[True, alcance_ordenado[1:] != alcance_ordenado[:-1]]
+    previo = (acumulado - valor_grupo[orden])[np.flatnonzero(inicio)]
+    base = previo[np.cumsum(inicio) - 1]
+    total = np.bincount(alcance_grupo, weights=valor_grupo)[alcance_ordenado]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        participacion = np.where(total > 0, (acumulado - base) / total, np.inf)
+    codigos = np.empty(len(valor_grupo), dtype=np.int8)
+    codigos[orden] = np.searchsorted(np.asarray(umbrales), participacion, side='left')
+    return codigos
+
+
+def demanda_semanal(cubo_ventas, semanas=SEMANAS_XYZ):
+    """Matriz (filas del cubo × semanas) con las unidades de cada una de las últimas `semanas` semanas.
+
+    La columna k suma las ventas con antigüedad entre 7k y 7k + 6 días, en un solo bincount.
+    """
+    ventas = cubo_ventas.ventas
+    edad = cubo_ventas.hoy - ventas['dia'].to_numpy(dtype=np.int64)
+    en_rango = (edad >= 0) & (edad < 7 * semanas)
+    celdas = ventas['fila'].to_numpy(dtype=np.int64)[en_rango] * semanas + edad[en_rango] // 7
+    sumas = np.bincount(celdas, weights=ventas['unidades'].to_numpy(dtype=np.float64)[en_rango],
+                        minlength=cubo_ventas.n_filas * semanas)
+    return sumas.reshape(cubo_ventas.n_filas, semanas)
+
+
+def clasificar_abc_xyz(df, cubo_ventas=None, alcance='global', columna_valor='Valor_Venta_60_Dias',
+                       umbrales_abc=UMBRALES_ABC, umbrales_xyz=UMBRALES_XYZ, semanas=SEMANAS_XYZ):
+    """(Segmento_ABC, Segmento_XYZ) como categóricas alineadas con las filas de `df`.
+
+    ABC ordena el valor de cada SKU dentro de su alcance y corta la participación acumulada en
+    `umbrales_abc`. XYZ usa el coeficiente de variación de la demanda semanal del SKU en el mismo
+    alcance (sin demanda = Z); las filas de `df` deben corresponder a las del `cubo_ventas`.
+    """
+    grupos, alcance_grupo, n_grupos = _grupos_alcance(df, alcance)
+    valor = pd.to_numeric(df[columna_valor], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    valor_grupo = np.bincount(grupos, weights=valor, minlength=n_grupos)
+    codigos_abc = _abc_por_grupo(valor_grupo, alcance_grupo, umbrales_abc)[grupos]
+
+    codigos_xyz = np.full(len(df), len(SEGMENTOS_XYZ) - 1, dtype=np.int8)
+    if cubo_ventas is not None and cubo_ventas.n_filas == len(df) and semanas > 1:
+        matriz = demanda_semanal(cubo_ventas, semanas)
+        por_grupo = np.column_stack([np.bincount(grupos, weights=matriz[:, k], minlength=n_grupos) for k in range(semanas)])
+        media = por_grupo.mean(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variacion = np.where(media > 0, por_grupo.std(axis=1) / media, np.inf)
+        codigos_xyz = np.searchsorted(np.asarray(umbrales_xyz), variacion, side='left').astype(np.int8)[grupos]
+
+    return (
+        pd.Categorical.from_codes(codigos_abc, SEGMENTOS_ABC),
+        pd.Categorical.from_codes(codigos_xyz, SEGMENTOS_XYZ),
+    )
@@ -0,0 +1,59 @@
+# inventario/cubo.py
+"""Cubo de ventas diarias (fila SKU-tienda × día) en formato CSR con sumas acumuladas."""
+import numpy as np
+import pandas as pd
+
+from inventario.historial import tabla_ventas_vacia
+
+
+class CuboVentas:
+    """Ventas ordenadas por (fila, día) con punteros por fila y sumas acumuladas de unidades.
+
+    El total de cualquier ventana de días se obtiene para todo el catálogo con dos búsquedas
+    binarias vectorizadas y una resta de acumulados, sin volver a filtrar fechas.
+    """
+
+    def __init__(self, ventas, n_filas, hoy):
+        ventas = tabla_ventas_vacia() if ventas is None else ventas
+        filas = ventas['fila'].to_numpy(dtype=np.int64)
+        dias = ventas['dia'].to_numpy(dtype=np.int64)
+        self.n_filas = int(n_filas)
+        self.hoy = int(hoy)
+        self.dia_min = int(dias.min()) if len(dias) else self.hoy
+        self.ancho = (int(dias.max()) - self.dia_min + 1) if len(dias) else 1
+
+        claves = filas * self.ancho + (dias - self.dia_min)
+        orden = np.argsort(claves, kind='stable')
+        self._claves = claves[orden]
+        self.ventas = pd.DataFrame({
+            'fila': ventas['fila'].to_numpy()[orden],
+            'dia': ventas['dia'].to_numpy()[orden],
+            'unidades': ventas['unidades'].to_numpy()[orden],
+        })
+        self.indptr = np.searchsorted(self._claves, np.arange(self.n_filas + 1) * self.ancho)
+        self.acumulado = np.concatenate(([0.0], np.cumsum(self.ventas['unidades'].to_numpy(dtype=np.float64))))
+
+    def total_ventana(self, hasta, desde=None, hoy=None):
+        """Unidades por fila con antigüedad (hoy - día) entre `desde` y `hasta`, ambos incluidos.
+
+        Sin `desde` la ventana también incluye fechas posteriores a hoy.
+        """
+        hoy = self.hoy if hoy is None else int(hoy)
+        primero = max(hoy - hasta - self.dia_min, 0)
+        ultimo = self.ancho - 1 if desde is None else min(hoy - desde - self.dia_min, self.ancho - 1)
+        if primero > ultimo:
+            return np.zeros(self.n_filas)
+        base = np.arange(self.n_filas, dtype=np.int64) * self.ancho
+        inicio = np.searchsorted(self._claves, base + primero, side='left')
+        fin = np.searchsorted(self._claves, base + ultimo, side='right')
+        return self.acumulado[fin] - self.acumulado[inicio]
+
+    def ultima_venta(self):
+        """Día de la venta más reciente de cada fila (NaN si no tiene ventas)."""
+        ultimo = np.full(self.n_filas, np.nan)
+        con_ventas = self.indptr[1:] > self.indptr[:-1]
+        ultimo[con_ventas] = self.ventas['dia'].to_numpy()[self.indptr[1:][con_ventas] - 1]
+        return ultimo
+
+    def registros_por_fila(self):
+        return np.diff(self.indptr)
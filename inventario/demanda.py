@@ -0,0 +1,97 @@
+# inventario/demanda.py
+"""Estimaciones de demanda diaria por SKU-tienda: ventanas fijas, promedio exponencial y picos recortados."""
+import numpy as np
+
+VENTANAS_DEMANDA = (30, 60, 90)
+# Días de historia del promedio exponencial y del recortado
+HORIZONTE_DEMANDA = 90
+# Vida media del promedio exponencial: una venta de hace 14 días pesa la mitad que una de hoy
+VIDA_MEDIA_EWMA = 14
+# Un día con más unidades que media + 3 desviaciones (de la serie diaria de la fila) se recorta a ese tope
+SIGMAS_RECORTE = 3.0
+
+# Método → columna del cuadro con esa estimación
+METODOS_DEMANDA = {
+    'ventana_30': 'Demanda_30d',
+    'ventana_60': 'Demanda_60d',
+    'ventana_90': 'Demanda_90d',
+    'exponencial': 'Demanda_EWMA',
+    'recortada': 'Demanda_Winsorizada',
+}
+METODO_DEMANDA_DEFECTO = 'ventana_60'
+
+
+def calcular_demandas(cubo_ventas, ventas_respaldo=None, horizonte=HORIZONTE_DEMANDA,
+                      vida_media=VIDA_MEDIA_EWMA, sigmas=SIGMAS_RECORTE):
+    """{columna de METODOS_DEMANDA: demanda diaria por fila del cubo} en una pasada sobre las ventas.
+
+    Todas las estimaciones salen de un solo recorrido de las ventas recientes del cubo (ordenadas por
+    fila y día) con bincount. Como CuboVentas.total_ventana(hasta=d), la ventana de d días incluye las
+    antigüedades 0..d; las ventas con fecha posterior a hoy cuentan como de hoy. Las filas sin ventas en el historial
+    pero con `ventas_respaldo` (unidades de los últimos 60 días del extracto) usan ese dato / 60.
+    """
+    n_filas = cubo_ventas.n_filas
+    ventas = cubo_ventas.ventas
+    filas = ventas['fila'].to_numpy(dtype=np.int64)
+    unidades = ventas['unidades'].to_numpy(dtype=np.float64)
+    # Antigüedad en días; todo lo que queda fuera de las ventanas y del horizonte cae en el tope
+    tope_edad = max(VENTANAS_DEMANDA[-1] + 1, horizonte)
+    edad = np.clip(cubo_ventas.hoy - ventas['dia'].to_numpy(dtype=np.int64), 0, tope_edad)
+
+    # Ventanas: un bincount por (fila, tramo de antigüedad) y suma acumulada de los tramos
+    tramos = len(VENTANAS_DEMANDA) + 1
+    tramo = np.searchsorted(np.asarray(VENTANAS_DEMANDA), np.arange(tope_edad + 1), side='left')[edad]
+    por_tramo = np.bincount(filas * tramos + tramo, weights=unidades, minlength=n_filas * tramos)
+    acumulado = por_tramo.reshape(n_filas, tramos).cumsum(axis=1)
+    demandas = {f'Demanda_{dias}d': acumulado[:, k] / dias for k, dias in enumerate(VENTANAS_DEMANDA)}
+
+    # Exponencial: pesos 0.5^(edad / vida_media) dentro del horizonte, normalizados por su suma
+    pesos = np.zeros(tope_edad + 1)
+    pesos[:horizonte] = 0.5 ** (np.arange(horizonte) / vida_media)
+    demandas['Demanda_EWMA'] = np.bincount(filas, weights=unidades * pesos[edad], minlength=n_filas) / pesos.sum()
+
+    # Recortada: unidades por (fila, día) del horizonte (las de fuera valen 0). En el cubo las ventas van
+    # ordenadas por fila y día, así que la clave fila * (tope + 1) + (tope - edad) ya viene ordenada
+    # y los días se agrupan por cortes, sin ordenar.
+    unidades_horizonte = np.where(edad < horizonte, unidades, 0.0)
+    claves = filas * (tope_edad + 1) + (tope_edad - edad)
+    if len(claves):
+        inicios = np.flatnonzero(np.r_[True, claves[1:] != claves[:-1]])
+        diarias = np.add.reduceat(unidades_horizonte, inicios)
+        fila_dia = filas[inicios]
+    else:
+        diarias = fila_dia = np.zeros(0, dtype=np.int64)
+    media = np.bincount(fila_dia, weights=diarias, minlength=n_filas) / horizonte
+    media_cuadrados = np.bincount(fila_dia, weights=diarias ** 2, minlength=n_filas) / horizonte
+    tope = media + sigmas * np.sqrt(np.maximum(media_cuadrados - media ** 2, 0))
+    demandas['Demanda_Winsorizada'] = np.bincount(
+        fila_dia, weights=np.minimum(diarias, tope[fila_dia]), minlength=n_filas) / horizonte
+
+    if ventas_respaldo is not None:
+        respaldo = np.asarray(ventas_respaldo, dtype=np.float64) / 60
+        for columna, demanda in demandas.items():
+            sin_historial = (demanda == 0) & (respaldo > 0)
+            demandas[columna] = np.where(sin_historial, respaldo, demanda)
+    return demandas
+
+
+def validar_metodos_demanda(metodos):
+    """ValueError si algún método de `metodos` ({clase ABC: método}) no está en METODOS_DEMANDA."""
+    desconocidos = sorted({metodo for metodo in (metodos or {}).values() if metodo not in METODOS_DEMANDA})
+    if desconocidos:
+        raise ValueError(f"Métodos de demanda desconocidos: {', '.join(desconocidos)} (opciones: {', '.join(METODOS_DEMANDA)})")
+
+
+def demanda_por_clase(df, metodos=None):
+    """Demanda diaria de cada fila según el método de su Segmento_ABC (`metodos`: {'A': 'exponencial', ...}).
+
+    Las clases que no aparecen en `metodos` usan METODO_DEMANDA_DEFECTO.
+    """
+    validar_metodos_demanda(metodos)
+    demanda = df[METODOS_DEMANDA[METODO_DEMANDA_DEFECTO]].to_numpy(dtype=np.float64, copy=True)
+    for clase, metodo in (metodos or {}).items():
+        if metodo == METODO_DEMANDA_DEFECTO:
+            continue
+        mascara = (df['Segmento_ABC'] == clase).to_numpy(dtype=bool, na_value=False)
+        demanda[mascara] = df[METODOS_DEMANDA[metodo]].to_numpy(dtype=np.float64)[mascara]
+    return demanda
@@ -0,0 +1,50 @@
+# inventario/dropbox_cliente.py
+"""Cliente Dropbox compartido por el proceso y descargas concurrentes por archivo."""
+import threading
+from contextlib import contextmanager
+
+import dropbox
+
+from inventario.fuentes import FuenteDatos
+from inventario.snapshot import version_archivo
+
+
+class ClienteDropbox(FuenteDatos):
+    """Un solo dropbox.Dropbox con sesión HTTP reutilizable; el token se refresca solo cuando expira."""
+
+    def __init__(self, app_key, app_secret, refresh_token, max_conexiones=8):
+        self._dbx = dropbox.Dropbox(
+            app_key=app_key,
+            app_secret=app_secret,
+            oauth2_refresh_token=refresh_token,
+            session=dropbox.create_session(max_connections=max_conexiones),
+        )
+        self._bloqueo_token = threading.Lock()
+
+    def _asegurar_token(self):
+        # Un solo hilo refresca el token cuando falta o está por expirar; los demás reutilizan el vigente
+        with self._bloqueo_token:
+            self._dbx.check_and_refresh_access_token()
+
+    def version(self, ruta):
+        """Token de versión (content_hash/rev) del archivo, con una consulta de metadatos."""
+        self._asegurar_token()
+        return version_archivo(self._dbx.files_get_metadata(ruta))
+
+    @contextmanager
+    def abrir(self, ruta):
+        """Entrega (versión, flujo binario) de la descarga; la conexión se libera al salir del bloque."""
+        self._asegurar_token()
+        metadata, respuesta = self._dbx.files_download(path=ruta)
+        try:
+            respuesta.raw.decode_content = True
+            yield version_archivo(metadata), respuesta.raw
+        finally:
+            respuesta.close()
+
+    def descargar_varios(self, rutas, procesadores=None, max_hilos=None):
+        if not rutas:
+            return {}
+        # Un único refresco de token antes de repartir el trabajo entre hilos
+        self._asegurar_token()
+        return super().descargar_varios(rutas, procesadores, max_hilos)
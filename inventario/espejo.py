@@ -0,0 +1,144 @@
+# inventario/espejo.py
+"""Espejo local en Parquet de una hoja de Google Sheets que solo descarga las filas nuevas o editadas."""
+import hashlib
+import time
+
+import numpy as np
+import pandas as pd
+
+from inventario.snapshot import guardar_snapshot, leer_snapshot_con_metadatos
+
+# Columnas que se comparan en cada lectura para detectar filas editadas: las que cambia la app
+# (Estado, cantidades, destino y proveedor de una orden) y el ID que identifica cada fila
+COLUMNAS_CONTROL = ('ID_Orden', 'Estado', 'Cantidad_Solicitada', 'SKU', 'Tienda_Destino', 'Proveedor')
+# Cada cuánto se descarga la hoja completa aunque las columnas de control no cambien
+REFRESCO_COMPLETO_SEGUNDOS = 15 * 60
+# Con más tramos editados que estos se descarga de una vez desde el primero hasta el último
+MAX_TRAMOS_EDITADOS = 20
+# Cambia cuando cambia la forma del espejo, para no reutilizar espejos con otro esquema
+ESQUEMA_ESPEJO = 'v2'
+# Metadatos que acompañan a la tabla del espejo (en el esquema Parquet, ver snapshot.guardar_snapshot)
+METADATOS_ESPEJO = ('encabezados', 'refresco_completo')
+
+
+def _nombre_espejo(spreadsheet_key, sheet_name):
+    token = hashlib.sha1(f"{spreadsheet_key}|{sheet_name}".encode('utf-8')).hexdigest()[:12]
+    return f"hoja-{token}"
+
+
+def _letra_columna(numero):
+    """Letra A1 de la columna `numero` (1 = A)."""
+    letras = ''
+    while numero > 0:
+        numero, resto = divmod(numero - 1, 26)
+        letras = chr(ord('A') + resto) + letras
+    return letras
+
+
+def _tabla(filas, n_columnas):
+    """Filas de la API (listas de texto de largo variable) como tabla de texto de `n_columnas` columnas."""
+    filas = [list(fila[:n_columnas]) + [''] * (n_columnas - len(fila)) for fila in filas]
+    return pd.DataFrame(filas, columns=[f"c{i}" for i in range(n_columnas)], dtype=str)
+
+
+def _sin_filas_vacias_al_final(tabla):
+    """Como get_all_values: la hoja termina en la última fila con algún valor."""
+    if tabla.empty:
+        return tabla
+    con_valor = np.flatnonzero((tabla != '').any(axis=1).to_numpy())
+    return tabla.iloc[:con_valor[-1] + 1 if len(con_valor) else 0].reset_index(drop=True)
+
+
+def _sin_vacios_al_final(fila):
+    fila = list(fila)
+    while fila and fila[-1] == '':
+        fila.pop()
+    return fila
+
+
+def _tramos(posiciones):
+    """Posiciones ordenadas agrupadas en tramos contiguos [(inicio, fin), ...], fin incluido."""
+    cortes = np.flatnonzero(np.diff(posiciones) > 1)
+    inicios = np.concatenate([[posiciones[0]], posiciones[cortes + 1]])
+    finales = np.concatenate([posiciones[cortes], [posiciones[-1]]])
+    return list(zip(inicios.tolist(), finales.tolist()))
+
+
+def _guardar(nombre, encabezados, tabla, refresco_completo, directorio):
+    metadatos = {'encabezados': list(encabezados), 'refresco_completo': refresco_completo}
+    guardar_snapshot(tabla, nombre, ESQUEMA_ESPEJO, directorio, metadatos=metadatos)
+
+
+def _leer_espejo(nombre, directorio):
+    """(tabla, metadatos) del espejo, o (None, None) si no existe o le faltan metadatos (se descarga todo)."""
+    tabla, metadatos = leer_snapshot_con_metadatos(nombre, ESQUEMA_ESPEJO, directorio)
+    if tabla is None or not isinstance(metadatos, dict) or any(clave not in metadatos for clave in METADATOS_ESPEJO):
+        return None, None
+    return tabla, metadatos
+
+
+def _descarga_completa(worksheet, nombre, directorio, ahora):
+    valores = worksheet.get_all_values()
+    encabezados = list(valores[0]) if valores else []
+    tabla = _tabla(valores[1:], len(encabezados))
+    _guardar(nombre, encabezados, tabla, ahora, directorio)
+    return encabezados, tabla, {'filas_descargadas': len(tabla), 'completa': True}
+
+
+def valores_hoja(worksheet, spreadsheet_key, sheet_name, directorio=None, ahora=None):
+    """(encabezados, tabla de texto de las filas, métricas) de la hoja, al día a través del espejo local.
+
+    Sin espejo, con un espejo viejo (REFRESCO_COMPLETO_SEGUNDOS) o si cambian los encabezados, se
+    descarga todo. Si no, una consulta trae solo los encabezados y las COLUMNAS_CONTROL (unas pocas
+    columnas angostas) y, si algo cambió, otra pide en tramos las filas nuevas (más allá de las que
+    tiene el espejo) y aquellas cuyas columnas de control cambiaron. `worksheet` es una hoja de gspread.
+    """
+    ahora = time.time() if ahora is None else ahora
+    nombre = _nombre_espejo(spreadsheet_key, sheet_name)
+    espejo, metadatos = _leer_espejo(nombre, directorio)
+    if espejo is None or ahora - metadatos['refresco_completo'] > REFRESCO_COMPLETO_SEGUNDOS:
+        return _descarga_completa(worksheet, nombre, directorio, ahora)
+
+    encabezados = list(metadatos['encabezados'])
+    control = [i for i, encabezado in enumerate(encabezados) if encabezado in COLUMNAS_CONTROL]
+    if not control:
+        return _descarga_completa(worksheet, nombre, directorio, ahora)
+    n_filas, n_columnas = len(espejo), len(encabezados)
+    ultima = _letra_columna(n_columnas)
+    respuesta = worksheet.batch_get(['1:1'] + [f"{_letra_columna(i + 1)}2:{_letra_columna(i + 1)}" for i in control])
+    if not respuesta[0] or _sin_vacios_al_final(respuesta[0][0]) != _sin_vacios_al_final(encabezados):
+        return _descarga_completa(worksheet, nombre, directorio, ahora)
+
+    # Filas del espejo cuyas columnas de control ya no coinciden con la hoja (editadas o borradas)
+    # y filas nuevas: las que las columnas de control muestran más allá de las del espejo
+    columnas_control = [[fila[0] if fila else '' for fila in columna] for columna in respuesta[1:]]
+    n_filas_hoja = max(len(columna) for columna in columnas_control)
+    editadas = np.zeros(n_filas, dtype=bool)
+    for i, columna in zip(control, columnas_control):
+        valores = np.array(columna[:n_filas] + [''] * (n_filas - len(columna)), dtype=object)
+        editadas |= espejo[f"c{i}"].to_numpy(dtype=object) != valores
+    posiciones = np.flatnonzero(editadas)
+    tramos = _tramos(posiciones) if len(posiciones) else []
+    if len(tramos) > MAX_TRAMOS_EDITADOS:
+        tramos = [(tramos[0][0], tramos[-1][1])]
+    if n_filas_hoja > n_filas:
+        tramos.append((n_filas, n_filas_hoja - 1))
+    if not tramos:
+        return encabezados, espejo, {'filas_descargadas': 0, 'completa': False}
+
+    descargas = worksheet.batch_get([f"A{inicio + 2}:{ultima}{fin + 2}" for inicio, fin in tramos])
+    tabla = espejo.reindex(range(max(n_filas, n_filas_hoja)), fill_value='')
+    for (inicio, fin), filas in zip(tramos, descargas):
+        filas = list(filas) + [[]] * (fin - inicio + 1 - len(filas))
+        tabla.iloc[inicio:fin + 1] = _tabla(filas, n_columnas).to_numpy()
+    tabla = _sin_filas_vacias_al_final(tabla)
+    _guardar(nombre, encabezados, tabla, metadatos['refresco_completo'], directorio)
+    return encabezados, tabla, {'filas_descargadas': sum(fin - inicio + 1 for inicio, fin in tramos), 'completa': False}
+
+
+def descartar_espejo(spreadsheet_key, sheet_name, directorio=None):
+    """Marca el espejo como vencido: la próxima lectura descarga la hoja completa (tras reescribirla)."""
+    nombre = _nombre_espejo(spreadsheet_key, sheet_name)
+    espejo, metadatos = _leer_espejo(nombre, directorio)
+    if espejo is not None:
+        _guardar(nombre, metadatos['encabezados'], espejo, 0, directorio)
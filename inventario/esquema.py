@@ -0,0 +1,66 @@
+# inventario/esquema.py
+"""Esquema de tipos compacto del cuadro de análisis (categóricas, float32/int32 y texto Arrow)."""
+import numpy as np
+import pandas as pd
+
+# Texto repetido con pocas variantes: cada valor se guarda una vez y las filas llevan un código
+COLUMNAS_CATEGORICAS = [
+    'Almacen_Nombre', 'Departamento', 'Marca_Nombre', 'Proveedor',
+    'Segmento_ABC', 'Segmento_XYZ', 'Estado_Inventario',
+]
+# Unidades, días y ratios: float32 conserva ~7 cifras, suficiente para estas magnitudes.
+# Los valores en pesos (costos, valores de inventario y de venta) se quedan en float64.
+COLUMNAS_FLOAT32 = [
+    'Ventas_60_Dias', 'Stock', 'Peso_Articulo', 'Lead_Time_Proveedor', 'Demanda_Diaria_Promedio',
+    'Demanda_30d', 'Demanda_60d', 'Demanda_90d', 'Demanda_EWMA', 'Demanda_Winsorizada',
+    'Stock_Seguridad', 'Punto_Reorden', 'Stock_Objetivo', 'Cobertura_Dias', 'Rotacion_Inventario',
+    'Objetivo_Abastecimiento', 'Necesidad_Total', 'Excedente_Trasladable', 'Total_Excedente_SKU',
+    'Total_Traslados_Posibles_SKU',
+]
+# Cantidades enteras (ya redondeadas por el motor)
+COLUMNAS_INT32 = ['dias_objetivo_map', 'Unidades_Traslado_Sugeridas', 'Sugerencia_Compra']
+COLUMNAS_TEXTO_ARROW = ['Descripcion']
+
+
+def _dtype_texto_arrow():
+    """Texto respaldado por Arrow con NaN como faltante (como el texto object), según la versión de pandas."""
+    for crear in (lambda: pd.StringDtype('pyarrow', na_value=np.nan), lambda: pd.StringDtype('pyarrow_numpy')):
+        try:
+            return crear()
+        except (TypeError, ValueError, ImportError):
+            continue
+    return None
+
+
+def memoria_mb(df):
+    """Memoria del DataFrame en MB, contando el contenido de las columnas de texto."""
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+
+def _enteros_seguros(serie):
+    valores = serie.to_numpy(dtype=np.float64, na_value=np.nan)
+    if not np.isfinite(valores).all() or (np.abs(valores) > np.iinfo(np.int32).max).any():
+        return serie.astype('float32')
+    return serie.astype('int32')
+
+
+def aplicar_esquema_analisis(df):
+    """Aplica el esquema compacto a las columnas presentes; las que ya tienen su tipo no se tocan.
+
+    Devuelve un DataFrame nuevo (copia superficial): el original no se modifica.
+    """
+    df = df.copy(deep=False)
+    for col in COLUMNAS_CATEGORICAS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    for col in COLUMNAS_FLOAT32:
+        if col in df.columns and df[col].dtype != np.float32:
+            df[col] = df[col].astype('float32')
+    for col in COLUMNAS_INT32:
+        if col in df.columns and df[col].dtype != np.int32:
+            df[col] = _enteros_seguros(df[col])
+    dtype_texto = _dtype_texto_arrow()
+    for col in COLUMNAS_TEXTO_ARROW:
+        if dtype_texto is not None and col in df.columns and df[col].dtype != dtype_texto:
+            df[col] = df[col].astype(dtype_texto)
+    return df
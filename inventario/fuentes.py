@@ -0,0 +1,70 @@
+# inventario/fuentes.py
+"""Fuentes de datos intercambiables para los cargadores: Dropbox o un directorio local/compartido."""
+import os
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import partial
+
+from inventario.arranque import cargar_en_paralelo
+
+ResultadoDescarga = namedtuple('ResultadoDescarga', ['nombre', 'ruta', 'valor', 'segundos', 'error'])
+
+
+class FuenteDatos(ABC):
+    """Interfaz común de los cargadores: `version(ruta)` y `abrir(ruta)` → (versión, flujo binario).
+
+    Las rutas siguen el formato de Dropbox ('/Carpeta/archivo.txt') en todas las fuentes.
+    """
+
+    @abstractmethod
+    def version(self, ruta):
+        """Token de versión del archivo, sin descargar su contenido."""
+
+    @abstractmethod
+    def abrir(self, ruta):
+        """Contexto que entrega (versión, flujo binario) del archivo."""
+
+    def descargar(self, ruta):
+        """(versión, bytes) del archivo completo."""
+        with self.abrir(ruta) as (version, flujo):
+            return version, flujo.read()
+
+    def descargar_varios(self, rutas, procesadores=None, max_hilos=None):
+        """Procesa {nombre: ruta} en paralelo y devuelve {nombre: ResultadoDescarga} con el tiempo de cada archivo.
+
+        `procesadores[nombre](fuente, ruta)` reemplaza la descarga simple de ese archivo (por ejemplo,
+        para usar un snapshot o parsear el flujo en el mismo hilo). Un error solo afecta a su archivo.
+        """
+        procesadores = procesadores or {}
+        tareas = {
+            nombre: partial(procesadores[nombre], self, ruta) if nombre in procesadores else partial(self.descargar, ruta)
+            for nombre, ruta in rutas.items()
+        }
+        resultados = cargar_en_paralelo(tareas, max_hilos=max_hilos, prefijo_hilos=type(self).__name__)
+        return {
+            nombre: ResultadoDescarga(nombre, rutas[nombre], r.valor, r.segundos, r.error)
+            for nombre, r in resultados.items()
+        }
+
+
+class FuenteLocal(FuenteDatos):
+    """Directorio que replica la estructura de carpetas de Dropbox (disco local o recurso compartido)."""
+
+    def __init__(self, directorio):
+        self.directorio = os.path.abspath(os.path.expanduser(str(directorio)))
+
+    def resolver(self, ruta):
+        return os.path.join(self.directorio, *[parte for parte in str(ruta).replace('\\', '/').split('/') if parte])
+
+    def version(self, ruta):
+        """Versión a partir de fecha de modificación y tamaño, sin leer el contenido."""
+        estado = os.stat(self.resolver(ruta))
+        return f"{estado.st_mtime_ns}-{estado.st_size}"
+
+    @contextmanager
+    def abrir(self, ruta):
+        ruta_local = self.resolver(ruta)
+        with open(ruta_local, 'rb') as flujo:
+            estado = os.fstat(flujo.fileno())
+            yield f"{estado.st_mtime_ns}-{estado.st_size}", flujo
@@ -0,0 +1,169 @@
+# inventario/historial.py
+"""Parseo único de HISTORIAL_VENTAS a una tabla larga compacta (fila, día, unidades)."""
+import numpy as np
+import pandas as pd
+
+# Los días se guardan como int16 contados desde esta fecha (cubre hasta el año 2089)
+EPOCA = pd.Timestamp('2000-01-01')
+_DIA_EPOCA = EPOCA.to_datetime64().astype('datetime64[D]').astype(np.int64)
+DTYPES_VENTAS = {'fila': 'int32', 'dia': 'int16', 'unidades': 'float32'}
+
+# Separador de filas del buffer unido (no aparece en los historiales)
+SEPARADOR_FILAS = '\x1e'
+# Hasta 15 dígitos la mantisa es exacta en float64
+_MAX_DIGITOS = 15
+
+
+def dia_desde_epoca(fecha):
+    """Número de día de una fecha contado desde EPOCA."""
+    return int((pd.Timestamp(fecha).normalize() - EPOCA).days)
+
+
+def tabla_ventas_vacia():
+    return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in DTYPES_VENTAS.items()})
+
+
+def _extraer_bytes(datos, inicios, longitudes):
+    """Posiciones absolutas e índice de entrada de cada byte de los tramos [inicio, inicio + longitud)."""
+    total = int(longitudes.sum())
+    ids = np.repeat(np.arange(len(inicios)), longitudes)
+    desplazamiento = np.arange(total) - np.repeat(np.cumsum(longitudes) - longitudes, longitudes)
+    return np.repeat(inicios, longitudes) + desplazamiento, ids
+
+
+def _fechas_rapidas(datos, inicios):
+    """Días desde EPOCA para fechas AAAA-MM-DD de 10 bytes; NaN cuando el texto no es una fecha válida."""
+    bloque = datos[inicios[:, None] + np.arange(10)]
+    validas = (bloque[:, 4] == ord('-')) & (bloque[:, 7] == ord('-'))
+    digitos = bloque[:, [0, 1, 2, 3, 5, 6, 8, 9]].astype(np.int32) - ord('0')
+    validas &= ((digitos >= 0) & (digitos <= 9)).all(axis=1)
+
+    anio = digitos[:, 0] * 1000 + digitos[:, 1] * 100 + digitos[:, 2] * 10 + digitos[:, 3]
+    mes = digitos[:, 4] * 10 + digitos[:, 5]
+    dia = digitos[:, 6] * 10 + digitos[:, 7]
+    validas &= (mes >= 1) & (mes <= 12) & (dia >= 1)
+
+    meses = np.where(validas, (anio - 1970) * 12 + (mes - 1), 0)
+    inicio_mes = meses.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+    fin_mes = (meses + 1).astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+    dia_absoluto = inicio_mes + dia - 1
+    validas &= dia_absoluto < fin_mes
+    return np.where(validas, dia_absoluto - _DIA_EPOCA, np.nan)
+
+
+def _numeros_rapidos(datos, inicios, finales):
+    """Convierte tramos con dígitos, un punto opcional y signo '-' inicial; NaN en cualquier otro caso."""
+    longitudes = finales - inicios
+    resultado = np.full(len(inicios), np.nan)
+    candidatas = (longitudes >= 1) & (longitudes <= _MAX_DIGITOS)
+    if not candidatas.any():
+        return resultado
+    idx = np.flatnonzero(candidatas)
+    posiciones, ids = _extraer_bytes(datos, inicios[idx], longitudes[idx])
+    caracteres = datos[posiciones]
+
+    es_digito = (caracteres >= ord('0')) & (caracteres <= ord('9'))
+    es_punto = caracteres == ord('.')
+    es_signo = (caracteres == ord('-')) & (posiciones == inicios[idx][ids])
+    n = len(idx)
+    invalidos = np.bincount(ids, weights=~(es_digito | es_punto | es_signo), minlength=n)
+    puntos = np.bincount(ids, weights=es_punto, minlength=n)
+    n_digitos = np.bincount(ids, weights=es_digito, minlength=n)
+
+    # Exponente de cada dígito = dígitos que le siguen dentro de su entrada
+    acumulado = np.cumsum(es_digito)
+    fin_entrada = np.cumsum(np.bincount(ids, minlength=n)) - 1
+    exponente = acumulado[fin_entrada][ids] - acumulado
+    mantisa = np.bincount(ids, weights=np.where(es_digito, (caracteres - ord('0')) * 10.0 ** exponente, 0.0), minlength=n)
+
+    # Decimales = dígitos después del punto
+    posicion_punto = np.full(n, np.iinfo(np.int64).max)
+    np.minimum.at(posicion_punto, ids[es_punto], posiciones[es_punto])
+    decimales = np.bincount(ids, weights=es_digito & (posiciones > posicion_punto[ids]), minlength=n)
+    signo = np.where(np.bincount(ids, weights=es_signo, minlength=n) > 0, -1.0, 1.0)
+
+    validos = (invalidos == 0) & (puntos <= 1) & (n_digitos >= 1)
+    resultado[idx] = np.where(validos, signo * mantisa / 10.0 ** decimales, np.nan)
+    return resultado
+
+
+def parsear_historial(historiales):
+    """Convierte la serie 'fecha:unidades,...' en la tabla larga; `fila` es la posición en la serie.
+
+    Recorre la columna una sola vez: une los historiales en un buffer de bytes separado por
+    SEPARADOR_FILAS y ubica comas y ':' con NumPy. Fechas AAAA-MM-DD y cantidades simples se
+    convierten sin crear objetos Python; solo las entradas atípicas pasan por pandas.
+    """
+    texto = pd.Series(np.asarray(historiales, dtype=object)).fillna('').astype(str)
+    if texto.empty:
+        return tabla_ventas_vacia()
+    valores = texto.tolist()
+    buffer = SEPARADOR_FILAS.join(valores)
+    if buffer.count(SEPARADOR_FILAS) != len(valores) - 1:
+        buffer = SEPARADOR_FILAS.join(valor.replace(SEPARADOR_FILAS, '') for valor in valores)
+    buffer = buffer.encode('utf-8')
+    datos = np.frombuffer(buffer, dtype=np.uint8)
+
+    # Entradas: tramos entre comas o separadores de fila
+    es_fila = datos == ord(SEPARADOR_FILAS)
+    limites = np.flatnonzero(es_fila | (datos == ord(',')))
+    inicios = np.concatenate(([0], limites + 1))
+    finales = np.concatenate((limites, [len(datos)]))
+    filas = np.concatenate(([0], np.cumsum(es_fila[limites])))
+
+    # Fecha antes del primer ':' de la entrada, unidades después
+    dos_puntos = np.flatnonzero(datos == ord(':'))
+    if len(dos_puntos) == 0:
+        return tabla_ventas_vacia()
+    siguiente = np.searchsorted(dos_puntos, inicios)
+    separador = dos_puntos[np.minimum(siguiente, len(dos_puntos) - 1)]
+    con_dato = (siguiente < len(dos_puntos)) & (separador < finales)
+    inicios, finales, filas, separador = inicios[con_dato], finales[con_dato], filas[con_dato], separador[con_dato]
+
+    dias = np.full(len(inicios), np.nan)
+    fecha_estandar = separador - inicios == 10
+    dias[fecha_estandar] = _fechas_rapidas(datos, inicios[fecha_estandar])
+    unidades = _numeros_rapidos(datos, separador + 1, finales)
+
+    # Entradas atípicas (espacios, exponentes, más de un ':'...): conversión de pandas
+    atipicas = np.flatnonzero(~fecha_estandar | np.isnan(unidades))
+    if len(atipicas):
+        textos = [buffer[i:f].decode('utf-8', 'replace') for i, f in zip(inicios[atipicas], finales[atipicas])]
+        partes = pd.Series(textos, dtype=object).str.split(':', n=1, expand=True).reindex(columns=[0, 1])
+        fechas = pd.to_datetime(partes[0].str.strip(), format='%Y-%m-%d', errors='coerce')
+        dias[atipicas] = np.where(fechas.isna(), np.nan, (fechas - EPOCA).dt.days)
+        unidades[atipicas] = pd.to_numeric(partes[1], errors='coerce')
+
+    validas = (
+        ~np.isnan(dias) & ~np.isnan(unidades)
+        & (dias >= np.iinfo(np.int16).min) & (dias <= np.iinfo(np.int16).max)
+    )
+    return pd.DataFrame({
+        'fila': filas[validas].astype(np.int32),
+        'dia': dias[validas].astype(np.int16),
+        'unidades': unidades[validas].astype(np.float32),
+    })
+
+
+def pendiente_por_fila(ventas, n_filas):
+    """Pendiente de mínimos cuadrados de unidades vs. día para cada fila y número de registros usados."""
+    filas = ventas['fila'].to_numpy()
+    x = ventas['dia'].to_numpy(dtype=np.float64)
+    y = ventas['unidades'].to_numpy(dtype=np.float64)
+    tamano = max(n_filas, int(filas.max()) + 1 if len(filas) else 0)
+    # Centrar x en el día mínimo de cada fila no cambia la pendiente y evita cancelaciones numéricas
+    if len(x):
+        minimos = np.full(tamano, np.inf)
+        np.minimum.at(minimos, filas, x)
+        x = x - minimos[filas]
+
+    n = np.bincount(filas, minlength=tamano).astype(np.float64)
+    sx = np.bincount(filas, weights=x, minlength=tamano)
+    sy = np.bincount(filas, weights=y, minlength=tamano)
+    sxy = np.bincount(filas, weights=x * y, minlength=tamano)
+    sxx = np.bincount(filas, weights=x * x, minlength=tamano)
+
+    denominador = n * sxx - sx * sx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pendiente = np.where((n >= 2) & (denominador > 0), (n * sxy - sx * sy) / denominador, 0.0)
+    return pendiente[:n_filas], n[:n_filas].astype(np.int64)
@@ -0,0 +1,83 @@
+# inventario/indice.py
+"""Índice de filas por valor sobre el cuadro de análisis: los filtros se resuelven como intersecciones."""
+import numpy as np
+import pandas as pd
+
+# Columnas por las que filtran el tablero y sus páginas
+COLUMNAS_INDICE = [
+    'Almacen_Nombre', 'Almacen', 'Marca_Nombre', 'Departamento', 'Proveedor',
+    'Estado_Inventario', 'Segmento_ABC', 'SKU',
+]
+# Por encima de esta fracción de filas, unir posiciones con una máscara sale más barato que ordenarlas
+_FRACCION_MASCARA = 0.125
+
+
+def interseccion(a, b):
+    """Intersección de dos arreglos de posiciones ordenados y sin repetidos (búsqueda binaria del menor en el mayor)."""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(a) == 0:
+        return a
+    pos = np.searchsorted(b, a)
+    pos[pos == len(b)] = 0
+    return a[b[pos] == a]
+
+
+class IndiceFilas:
+    """Posiciones de fila (ordenadas) de cada valor de las columnas indexadas, construidas una sola vez.
+
+    Por columna se guarda la lista de valores distintos, las posiciones de todas las filas
+    agrupadas por valor y los límites de cada grupo; consultar un valor es un corte del arreglo.
+    """
+
+    def __init__(self, df, columnas=COLUMNAS_INDICE):
+        self.n_filas = len(df)
+        self._columnas = {}
+        for columna in columnas:
+            if columna not in df.columns:
+                continue
+            codigos, valores = pd.factorize(df[columna])  # faltantes = -1, quedan antes del primer grupo
+            orden = np.argsort(codigos, kind='stable')
+            limites = np.searchsorted(codigos[orden], np.arange(len(valores) + 1))
+            self._columnas[columna] = (pd.Index(valores), orden, limites)
+
+    @property
+    def columnas(self):
+        return list(self._columnas)
+
+    def cubre(self, columnas):
+        return all(columna in self._columnas for columna in columnas)
+
+    def filas(self, columna, valores):
+        """Posiciones ordenadas de las filas cuya `columna` es el valor dado o uno de la lista."""
+        indice_valores, orden, limites = self._columnas[columna]
+        if not isinstance(valores, (list, tuple, set, np.ndarray, pd.Index, pd.Series)):
+            valores = [valores]
+        codigos = indice_valores.get_indexer(pd.Index(list(valores)).unique())
+        codigos = np.sort(codigos[codigos >= 0])
+        if len(codigos) == 1:
+            return orden[limites[codigos[0]]:limites[codigos[0] + 1]]
+        total = int((limites[codigos + 1] - limites[codigos]).sum())
+        if total > self.n_filas * _FRACCION_MASCARA:
+            mascara = np.zeros(self.n_filas, dtype=bool)
+            for codigo in codigos:
+                mascara[orden[limites[codigo]:limites[codigo + 1]]] = True
+            return np.flatnonzero(mascara)
+        partes = [orden[limites[codigo]:limites[codigo + 1]] for codigo in codigos]
+        return np.sort(np.concatenate(partes)) if partes else np.empty(0, dtype=np.intp)
+
+    def filtrar(self, base=None, **criterios):
+        """Posiciones que cumplen todos los criterios (columna=valor o lista), dentro de `base` si se da.
+
+        Sin criterios ni base devuelve None (todas las filas).
+        """
+        conjuntos = [self.filas(columna, valores) for columna, valores in criterios.items()]
+        if base is not None:
+            conjuntos.append(np.asarray(base))
+        if not conjuntos:
+            return None
+        conjuntos.sort(key=len)
+        resultado = conjuntos[0]
+        for conjunto in conjuntos[1:]:
+            resultado = interseccion(resultado, conjunto)
+        return resultado
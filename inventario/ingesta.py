@@ -0,0 +1,145 @@
+# inventario/ingesta.py
+"""Ingesta por bloques y con tipos declarados del extracto de inventario."""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from inventario.snapshot import guardar_snapshot, leer_snapshot
+
+COLUMNAS_INVENTARIO = [
+    'DEPARTAMENTO', 'REFERENCIA', 'DESCRIPCION', 'MARCA', 'PESO_ARTICULO', 'UNIDADES_VENDIDAS',
+    'STOCK', 'COSTO_PROMEDIO_UND', 'CODALMACEN', 'LEAD_TIME_PROVEEDOR', 'HISTORIAL_VENTAS'
+]
+COLUMNAS_CATEGORICAS = ['CODALMACEN', 'MARCA', 'DEPARTAMENTO']
+COLUMNAS_TEXTO = ['REFERENCIA', 'DESCRIPCION', 'HISTORIAL_VENTAS']
+# float32 y no int32: los nulos deben sobrevivir hasta la agregación 'first' de la deduplicación.
+# El costo, en pesos, se lee en float64 como el resto de valores monetarios (inventario/esquema.py)
+DTYPES_NUMERICOS = {
+    'PESO_ARTICULO': 'float32',
+    'UNIDADES_VENDIDAS': 'float32',
+    'STOCK': 'float32',
+    'COSTO_PROMEDIO_UND': 'float64',
+    'LEAD_TIME_PROVEEDOR': 'float32',
+}
+DTYPES_LECTURA = {
+    **{col: 'category' for col in COLUMNAS_CATEGORICAS},
+    **{col: str for col in COLUMNAS_TEXTO},
+}
+# Cambia cuando cambian los tipos de la ingesta, para no reutilizar snapshots con otro esquema
+ESQUEMA_INVENTARIO = 'v3'
+FILAS_POR_BLOQUE = 200_000
+
+
+def rss_pico_mb():
+    """Memoria residente máxima del proceso en MB (None si la plataforma no la expone)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB y macOS bytes
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def _tipar_bloque(bloque):
+    for col, dtype in DTYPES_NUMERICOS.items():
+        bloque[col] = pd.to_numeric(bloque[col], errors='coerce').astype(dtype)
+    return bloque
+
+
+def _codigos_globales(serie, categorias):
+    """Códigos de `serie` (category) en el catálogo `categorias` (valor → código), que crece con los valores nuevos."""
+    for valor in serie.cat.categories:
+        categorias.setdefault(valor, len(categorias))
+    # La posición extra (-1) traduce los nulos del bloque a nulo
+    traduccion = np.array([categorias[valor] for valor in serie.cat.categories] + [-1], dtype=np.int32)
+    return traduccion[serie.cat.codes.to_numpy()]
+
+
+def _ensamblar_columnas(partes, categorias):
+    """DataFrame final a partir de las partes de cada columna, liberándolas columna por columna."""
+    if not partes[COLUMNAS_INVENTARIO[0]]:
+        return pd.DataFrame({col: pd.Series(dtype=DTYPES_NUMERICOS.get(col, DTYPES_LECTURA.get(col)))
+                             for col in COLUMNAS_INVENTARIO})
+    columnas = {}
+    for col in COLUMNAS_INVENTARIO:
+        partes_columna = partes.pop(col)
+        if col in COLUMNAS_CATEGORICAS:
+            columnas[col] = pd.Series(pd.Categorical.from_codes(np.concatenate(partes_columna), categories=list(categorias[col])))
+        else:
+            columnas[col] = pd.concat(partes_columna, ignore_index=True)
+        del partes_columna
+    return pd.DataFrame(columnas, copy=False)
+
+
+def leer_extracto_inventario(origen, filas_por_bloque=FILAS_POR_BLOQUE):
+    """Parsea el extracto ('|', latin1) en bloques tipados; devuelve (df, métricas de la carga).
+
+    Cada bloque se reduce enseguida a sus columnas finales (códigos para las categóricas, arreglos
+    tipados para el resto) y se descarta; al final se une cada columna por separado, de modo que el
+    pico de memoria es el cuadro final más un bloque y una columna, no el cuadro más una copia completa.
+    """
+    inicio = time.perf_counter()
+    partes = {col: [] for col in COLUMNAS_INVENTARIO}
+    categorias = {col: {} for col in COLUMNAS_CATEGORICAS}
+    metricas = {'bloques': 0, 'filas': 0, 'stock_total': 0.0, 'unidades_vendidas_total': 0.0}
+    filas_por_almacen = None
+
+    lector = pd.read_csv(
+        origen, encoding='latin1', sep='|', header=None, names=COLUMNAS_INVENTARIO,
+        dtype=DTYPES_LECTURA, chunksize=filas_por_bloque
+    )
+    with lector:
+        for bloque in lector:
+            bloque = _tipar_bloque(bloque)
+            # Agregados parciales: se acumulan por bloque sin volver a recorrer el extracto
+            metricas['bloques'] += 1
+            metricas['filas'] += len(bloque)
+            metricas['stock_total'] += float(bloque['STOCK'].sum())
+            metricas['unidades_vendidas_total'] += float(bloque['UNIDADES_VENDIDAS'].sum())
+            conteo = bloque['CODALMACEN'].astype(object).value_counts()
+            filas_por_almacen = conteo if filas_por_almacen is None else filas_por_almacen.add(conteo, fill_value=0)
+            for col in COLUMNAS_INVENTARIO:
+                if col in COLUMNAS_CATEGORICAS:
+                    partes[col].append(_codigos_globales(bloque[col], categorias[col]))
+                else:
+                    partes[col].append(bloque[col])
+            del bloque
+
+    df = _ensamblar_columnas(partes, categorias)
+    metricas['filas_por_almacen'] = {} if filas_por_almacen is None else filas_por_almacen.astype(int).to_dict()
+    metricas['segundos'] = time.perf_counter() - inicio
+    metricas['rss_pico_mb'] = rss_pico_mb()
+    return df, metricas
+
+
+def cargar_inventario(cliente, ruta):
+    """(df, métricas) del extracto en `ruta`; usa el snapshot local si la versión del archivo no cambió.
+
+    Las métricas incluyen la versión del archivo, que sirve como clave de caché de las etapas del análisis.
+    """
+    # Consulta barata de metadatos: si el archivo no cambió se usa el snapshot local
+    version = cliente.version(ruta)
+    inicio = time.perf_counter()
+    df = leer_snapshot('inventario', f"{version}|{ESQUEMA_INVENTARIO}")
+    if df is not None:
+        metricas = {'filas': len(df), 'segundos': time.perf_counter() - inicio, 'rss_pico_mb': rss_pico_mb()}
+        return df, {**metricas, 'desde_snapshot': True, 'version': version}
+    # La respuesta se parsea en bloques directamente desde el stream, sin copiarla a memoria
+    with cliente.abrir(ruta) as (version, flujo):
+        df, metricas = leer_extracto_inventario(flujo)
+    # Se usa la versión de la descarga por si el archivo cambió después de consultar los metadatos
+    guardar_snapshot(df, 'inventario', f"{version}|{ESQUEMA_INVENTARIO}")
+    return df, {**metricas, 'desde_snapshot': False, 'version': version}
+
+
+def describir_metricas(metricas):
+    """Texto corto con el tiempo de parseo y el pico de memoria de una carga."""
+    if not metricas:
+        return ""
+    texto = f"{metricas['filas']:,} filas en {metricas['segundos']:.2f} s"
+    if metricas.get('rss_pico_mb') is not None:
+        texto += f" · RSS pico {metricas['rss_pico_mb']:,.0f} MB"
+    return texto
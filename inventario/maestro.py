@@ -0,0 +1,71 @@
+# inventario/maestro.py
+"""Maestro de artículos (referencia → código) cacheado por versión y compartido por el proceso."""
+import csv
+import io
+import threading
+import time
+
+import pandas as pd
+
+# Segundos durante los que se confía en la versión cacheada sin volver a consultar metadatos
+TTL_VERSION_MAESTRO = 300
+
+_bloqueo = threading.Lock()
+# ruta -> (versión, mapeo, instante de la última verificación)
+_mapeos = {}
+
+
+def _leer_maestro_articulos(contenido, maestro_path):
+    """Lee el maestro (xlsx o texto delimitado) detectando el separador para usar el motor C de pandas."""
+    if maestro_path.endswith('.xlsx'):
+        return pd.read_excel(io.BytesIO(contenido))
+    try:
+        muestra = contenido[:65536].decode('utf-8', errors='ignore')
+        separador = csv.Sniffer().sniff(muestra, delimiters=',;|\t').delimiter
+    except csv.Error:
+        separador = None
+    if separador is None or separador not in muestra.split('\n', 1)[0]:
+        return pd.read_csv(io.BytesIO(contenido), sep=None, engine='python')
+    return pd.read_csv(io.BytesIO(contenido), sep=separador)
+
+
+def construir_mapeo_maestro(contenido, maestro_path):
+    """Diccionario {referencia normalizada: código de artículo}; ValueError si faltan columnas clave."""
+    df_base = _leer_maestro_articulos(contenido, maestro_path)
+
+    # Normalizar nombres de columnas (todo a minúsculas y sin espacios)
+    df_base.columns = [str(col).strip().lower() for col in df_base.columns]
+
+    # Detectar columnas clave
+    col_referencia = next((c for c in df_base.columns if 'referencia' in c), None)
+    col_codigo = next((c for c in df_base.columns if 'código' in c or 'codigo' in c), None)
+
+    if not col_referencia or not col_codigo:
+        # Se lanza la excepción para que un archivo incompleto no quede en caché
+        raise ValueError("Faltan columnas 'Referencia' o 'Código' en el archivo maestro.")
+
+    # Limpieza de datos (Quitar espacios, poner minúsculas y quitar '.0' de los códigos)
+    referencias = df_base[col_referencia].astype(str).str.strip().str.lower()
+    codigos = df_base[col_codigo].astype(str).str.replace(r'\.0$', '', regex=True).str.strip()
+    return dict(zip(referencias, codigos))
+
+
+def cargar_maestro_articulos(cliente, maestro_path, ttl=TTL_VERSION_MAESTRO):
+    """Mapeo del maestro desde `cliente`; solo se descarga de nuevo cuando cambia la versión del archivo.
+
+    El diccionario devuelto es compartido entre sesiones y debe tratarse como de solo lectura.
+    """
+    with _bloqueo:
+        cacheado = _mapeos.get(maestro_path)
+    if cacheado is not None and time.monotonic() - cacheado[2] < ttl:
+        return cacheado[1]
+
+    version = cliente.version(maestro_path)
+    if cacheado is not None and cacheado[0] == version:
+        mapeo = cacheado[1]
+    else:
+        version, contenido = cliente.descargar(maestro_path)
+        mapeo = construir_mapeo_maestro(contenido, maestro_path)
+    with _bloqueo:
+        _mapeos[maestro_path] = (version, mapeo, time.monotonic())
+    return mapeo
@@ -0,0 +1,241 @@
+# inventario/motor.py
+"""Motor de análisis de inventario sin Streamlit: del extracto crudo al cuadro de análisis por SKU-tienda."""
+import numpy as np
+import pandas as pd
+
+from inventario.clasificacion import clasificar_abc_xyz
+from inventario.cubo import CuboVentas
+from inventario.demanda import METODO_DEMANDA_DEFECTO, METODOS_DEMANDA, calcular_demandas, demanda_por_clase
+from inventario.esquema import aplicar_esquema_analisis, memoria_mb
+from inventario.historial import dia_desde_epoca, parsear_historial, tabla_ventas_vacia
+from inventario.ingesta import COLUMNAS_INVENTARIO
+from inventario.proveedores import asignar_proveedores
+
+DIAS_SEGURIDAD_DEFECTO = 7
+DIAS_OBJETIVO_DEFECTO = {'A': 30, 'B': 45, 'C': 60}
+ALMACENES = {'158':'Opalo', '155':'Cedi','156':'Armenia','157':'Manizales','189':'Olaya','238':'Laureles','439':'FerreBox','463':'Cerritos'}
+MARCAS = {'41':'TERINSA','50':'P8-ASC-MEGA','54':'MPY-International','55':'DPP-AN COLORANTS LATAM','56':'DPP-Pintuco Profesional','57':'ASC-Mega','58':'DPP-Pintuco','59':'DPP-Madetec','60':'POW-Interpon','61':'various','62':'DPP-ICO','63':'DPP-Terinsa','64':'MPY-Pintuco','65':'non-AN Third Party','66':'ICO-AN Packaging','67':'ASC-Automotive OEM','68':'POW-Resicoat'}
+
+
+def validar_extracto(df_crudo):
+    """ValueError si al extracto le faltan columnas de COLUMNAS_INVENTARIO."""
+    faltantes = [col for col in COLUMNAS_INVENTARIO if col not in df_crudo.columns]
+    if faltantes:
+        raise ValueError(f"Faltan las siguientes columnas requeridas en el inventario: {', '.join(faltantes)}")
+
+
+def limpiar_duplicados_sku_por_almacen(df):
+    """Una fila por (REFERENCIA, CODALMACEN) y la tabla larga de ventas con `fila` = posición en el resultado.
+
+    Las columnas escalares usan agregaciones 'first'/'sum' cythonizadas. Los historiales no se unen
+    como texto: se parsea una vez cada par (grupo, historial) distinto y sus ventas se asignan al
+    grupo, lo que equivale a unir los historiales únicos de cada SKU-tienda.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(), tabla_ventas_vacia()
+
+    # Agrupar por las columnas clave y sumar o tomar la primera aparición
+    agg_funcs = {
+        'DEPARTAMENTO': 'first',
+        'DESCRIPCION': 'first',
+        'MARCA': 'first',
+        'PESO_ARTICULO': 'first',
+        'UNIDADES_VENDIDAS': 'sum',
+        'STOCK': 'sum',
+        'COSTO_PROMEDIO_UND': 'first', # Asumimos que el costo promedio es el mismo
+        'LEAD_TIME_PROVEEDOR': 'first',
+    }
+    # observed=True: CODALMACEN llega como categoría y no se quieren combinaciones vacías
+    agrupado = df.groupby(['REFERENCIA', 'CODALMACEN'], observed=True)
+    df_agrupado = agrupado.agg(agg_funcs).reset_index()
+
+    # Grupo de cada línea del extracto (-1 si REFERENCIA o CODALMACEN son nulos y el grupo se descarta)
+    grupos = agrupado.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+    historiales = pd.DataFrame({'grupo': grupos, 'historial': df['HISTORIAL_VENTAS'].to_numpy(dtype=object)})
+    historiales = historiales[(historiales['grupo'] >= 0) & historiales['historial'].notna()]
+    historiales = historiales.assign(historial=historiales['historial'].astype(str)).drop_duplicates()
+    ventas = parsear_historial(historiales['historial'])
+    ventas['fila'] = historiales['grupo'].to_numpy()[ventas['fila'].to_numpy()].astype(np.int32)
+    return df_agrupado, ventas
+
+
+# Orden final de las columnas que agregan las etapas de clasificación y objetivos
+COLUMNAS_CALCULADAS = [
+    'Valor_Inventario', 'Stock_Seguridad', 'Punto_Reorden', 'Valor_Venta_60_Dias', 'Segmento_ABC', 'Segmento_XYZ',
+    'dias_objetivo_map', 'Stock_Objetivo', 'Estado_Inventario', 'Cobertura_Dias', 'Rotacion_Inventario',
+    'Venta_Perdida_Estimada_30d', 'Precio_Venta_Estimado', 'Objetivo_Abastecimiento', 'Necesidad_Total',
+    'Excedente_Trasladable', 'Total_Excedente_SKU', 'Total_Traslados_Posibles_SKU',
+    'Unidades_Traslado_Sugeridas', 'Sugerencia_Compra', 'Proveedor', 'SKU_Proveedor',
+]
+
+
+def preparar_demanda(df_crudo, hoy=None):
+    """Etapa 1 (ingesta → demanda): deduplicación, tipos, cubo de ventas y demanda diaria.
+
+    Agrega todas las estimaciones de inventario.demanda (columnas de METODOS_DEMANDA) y deja en
+    Demanda_Diaria_Promedio la del método por defecto (ventana de 60 días).
+    Devuelve (df, CuboVentas); la columna 'index' de `df` es la fila correspondiente en el cubo.
+    `hoy` fija la fecha de referencia de las ventanas de ventas (por defecto, el momento de la llamada).
+    """
+    hoy = pd.Timestamp.now() if hoy is None else pd.Timestamp(hoy)
+    if df_crudo is None or df_crudo.empty:
+        return pd.DataFrame(), CuboVentas(None, 0, dia_desde_epoca(hoy))
+    validar_extracto(df_crudo)
+
+    # Deduplicación y parseo único del historial: tabla larga (fila, dia, unidades) que reutilizan todas las páginas
+    df, df_ventas = limpiar_duplicados_sku_por_almacen(df_crudo)
+
+    # 1. Limpieza y Preparación
+    column_mapping = {
+        'CODALMACEN': 'Almacen', 'DEPARTAMENTO': 'Departamento', 'DESCRIPCION': 'Descripcion',
+        'UNIDADES_VENDIDAS': 'Ventas_60_Dias', 'STOCK': 'Stock', 'COSTO_PROMEDIO_UND': 'Costo_Promedio_UND',
+        'REFERENCIA': 'SKU', 'MARCA': 'Marca', 'PESO_ARTICULO': 'Peso_Articulo',
+        'LEAD_TIME_PROVEEDOR': 'Lead_Time_Proveedor'
+    }
+    df.rename(columns=column_mapping, inplace=True)
+    df['SKU'] = df['SKU'].astype(str)
+    # Las categorías de la ingesta vuelven a texto plano para el resto del análisis
+    for col in ['Almacen', 'Departamento', 'Marca']:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(df[col].cat.categories.dtype)
+    df['Almacen_Nombre'] = df['Almacen'].astype(str).map(ALMACENES).fillna(df['Almacen'])
+    df['Marca_Nombre'] = pd.to_numeric(df['Marca'], errors='coerce').fillna(0).astype(int).astype(str).map(MARCAS).fillna('Complementarios')
+    numeric_cols = ['Ventas_60_Dias', 'Costo_Promedio_UND', 'Stock', 'Peso_Articulo', 'Lead_Time_Proveedor']
+    for col in numeric_cols:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype('float64')
+    df['Stock'] = np.maximum(0, df['Stock'])
+    df.reset_index(inplace=True)
+    # Cubo de ventas diarias: cualquier ventana (30/60/90 días) se suma sin volver a filtrar fechas
+    cubo_ventas = CuboVentas(df_ventas, len(df), dia_desde_epoca(hoy))
+    # Ventanas, exponencial y recortada en una pasada; sin historial parseado se usa Ventas_60_Dias / 60
+    demandas = calcular_demandas(cubo_ventas, ventas_respaldo=df['Ventas_60_Dias'].to_numpy())
+    df['Demanda_Diaria_Promedio'] = demandas[METODOS_DEMANDA[METODO_DEMANDA_DEFECTO]]
+    for columna, demanda in demandas.items():
+        df[columna] = demanda
+    return df, cubo_ventas
+
+
+def clasificar_inventario(df_demanda, df_proveedores=None, cubo_ventas=None, alcance_abc='global', metodos_demanda=None):
+    """Etapa 2 (clasificación): ABC/XYZ, demanda por clase, métricas de rotación y proveedor.
+
+    `df_proveedores` puede ser el índice de preparar_indice_proveedores o el archivo sin procesar.
+    Sin `cubo_ventas` todas las filas quedan en XYZ = 'Z'. `alcance_abc` es una clave de ALCANCES.
+    `metodos_demanda` ({'A': 'exponencial', ...}, métodos de METODOS_DEMANDA) reemplaza la
+    Demanda_Diaria_Promedio de cada clase ABC; las clases omitidas conservan la ventana de 60 días.
+    """
+    if df_demanda is None or df_demanda.empty:
+        return pd.DataFrame()
+    df = df_demanda.copy(deep=False)
+    df['Valor_Inventario'] = df['Stock'] * df['Costo_Promedio_UND']
+    df['Valor_Venta_60_Dias'] = df['Ventas_60_Dias'] * df['Costo_Promedio_UND']
+    # ABC por valor y XYZ por variabilidad de la demanda semanal, como categóricas compactas
+    df['Segmento_ABC'], df['Segmento_XYZ'] = clasificar_abc_xyz(df, cubo_ventas, alcance=alcance_abc)
+    if metodos_demanda:
+        df['Demanda_Diaria_Promedio'] = demanda_por_clase(df, metodos_demanda)
+    # --- MÉTRICAS AVANZADAS DE ROTACIÓN ---
+    df['Cobertura_Dias'] = np.where(
+        df['Demanda_Diaria_Promedio'] > 0,
+        df['Stock'] / df['Demanda_Diaria_Promedio'],
+        9999  # Sin demanda = cobertura infinita
+    )
+    df['Rotacion_Inventario'] = np.where(
+        df['Valor_Inventario'] > 0,
+        (df['Valor_Venta_60_Dias'] / df['Valor_Inventario']) * 6,  # Anualizado (60d * 6 = 360d)
+        0
+    )
+    df['Venta_Perdida_Estimada_30d'] = np.where(
+        (df['Stock'] <= 0) & (df['Demanda_Diaria_Promedio'] > 0),
+        df['Demanda_Diaria_Promedio'] * 30 * df['Costo_Promedio_UND'] * 1.30,  # Margen estimado 30%
+        0
+    )
+    df['Precio_Venta_Estimado'] = df['Costo_Promedio_UND'] * 1.30
+
+    if df_proveedores is not None and not df_proveedores.empty:
+        # Búsqueda posicional sobre el índice SKU ya deduplicado (sin merge)
+        df['Proveedor'], df['SKU_Proveedor'] = asignar_proveedores(df['SKU'], df_proveedores)
+    else:
+        df['Proveedor'] = 'No Asignado'
+        df['SKU_Proveedor'] = 'N/A'
+    return df
+
+
+def calcular_objetivos(df_clasificado, dias_seguridad=DIAS_SEGURIDAD_DEFECTO, dias_objetivo=None):
+    """Etapa 3 (objetivos → traslados/compras): única etapa que depende de los parámetros del tablero.
+
+    Solo agrega columnas vectorizadas sobre el resultado de clasificar_inventario, que no se modifica.
+    Los cálculos se hacen en float64 y al final se aplica el esquema compacto de inventario.esquema;
+    la memoria antes y después queda en `attrs['memoria_mb']` = (antes, después).
+    """
+    if df_clasificado is None or df_clasificado.empty:
+        return pd.DataFrame()
+    if dias_objetivo is None:
+        dias_objetivo = DIAS_OBJETIVO_DEFECTO
+    df = df_clasificado.copy(deep=False)
+    df['Stock_Seguridad'] = df['Demanda_Diaria_Promedio'] * dias_seguridad
+    df['Punto_Reorden'] = (df['Demanda_Diaria_Promedio'] * df['Lead_Time_Proveedor']) + df['Stock_Seguridad']
+    df['dias_objetivo_map'] = df['Segmento_ABC'].astype(object).map(dias_objetivo)
+    df['Stock_Objetivo'] = df['Demanda_Diaria_Promedio'] * df['dias_objetivo_map']
+    conditions = [
+        (df['Stock'] <= 0) & (df['Demanda_Diaria_Promedio'] > 0),
+        (df['Stock'] > 0) & (df['Demanda_Diaria_Promedio'] <= 0),
+        (df['Stock'] > 0) & (df['Stock'] < df['Punto_Reorden']),
+        (df['Stock'] > df['Stock_Objetivo']),
+    ]
+    choices_estado = ['Quiebre de Stock', 'Baja Rotación / Obsoleto', 'Bajo Stock (Riesgo)', 'Excedente']
+    df['Estado_Inventario'] = np.select(conditions, choices_estado, default='Normal')
+
+    # Objetivo real: el mayor entre stock_objetivo y punto_reorden (cubre lead times largos)
+    df['Objetivo_Abastecimiento'] = np.maximum(df['Stock_Objetivo'], df['Punto_Reorden'])
+    # Necesidad proactiva: anticipa el consumo durante el lead time del proveedor
+    df['Necesidad_Total'] = np.maximum(0,
+        df['Objetivo_Abastecimiento'] - df['Stock']
+        + (df['Demanda_Diaria_Promedio'] * df['Lead_Time_Proveedor'])
+    )
+    # Excedente_Trasladable: stock que esta tienda puede ceder a otras
+    # - Excedente: todo lo que sobra por encima del Objetivo_Abastecimiento
+    # - Baja Rotación: TODO el stock (si no vende aquí, que venda en otra sede)
+    # - Normal/Bajo Stock/Quiebre: no ceden stock
+    df['Excedente_Trasladable'] = np.select(
+        [
+            df['Estado_Inventario'] == 'Excedente',
+            df['Estado_Inventario'] == 'Baja Rotación / Obsoleto',
+        ],
+        [
+            np.maximum(0, df['Stock'] - df['Objetivo_Abastecimiento']),
+            df['Stock'],  # Todo el stock sin rotación es trasladable
+        ],
+        default=0
+    )
+    # Totales por SKU con transform (mismo orden de filas, sin merge)
+    por_sku = df.groupby('SKU')
+    total_necesidad_sku = por_sku['Necesidad_Total'].transform('sum')
+    df['Total_Excedente_SKU'] = por_sku['Excedente_Trasladable'].transform('sum')
+    df['Total_Traslados_Posibles_SKU'] = np.minimum(total_necesidad_sku, df['Total_Excedente_SKU'])
+    df['Unidades_Traslado_Sugeridas'] = 0.0
+    mask_necesidad = (df['Necesidad_Total'] > 0) & (total_necesidad_sku > 0)
+    df.loc[mask_necesidad, 'Unidades_Traslado_Sugeridas'] = (df['Necesidad_Total'] / total_necesidad_sku) * df['Total_Traslados_Posibles_SKU']
+    df['Sugerencia_Compra'] = np.maximum(0, np.ceil(df['Necesidad_Total'] - df['Unidades_Traslado_Sugeridas'].fillna(0)))
+    df['Unidades_Traslado_Sugeridas'] = np.ceil(df['Unidades_Traslado_Sugeridas'].fillna(0))
+
+    columnas = [col for col in df.columns if col not in COLUMNAS_CALCULADAS] + COLUMNAS_CALCULADAS
+    df = df[columnas].set_index('index')
+    memoria_antes = memoria_mb(df)
+    df = aplicar_esquema_analisis(df)
+    df.attrs['memoria_mb'] = (memoria_antes, memoria_mb(df))
+    return df
+
+
+def analizar_inventario_con_cubo(df_crudo, df_proveedores=None, dias_seguridad=DIAS_SEGURIDAD_DEFECTO, dias_objetivo=None, hoy=None, alcance_abc='global', metodos_demanda=None):
+    """(análisis, CuboVentas) del extracto; las filas del cubo corresponden a la columna 'index' del análisis.
+
+    Encadena preparar_demanda → clasificar_inventario → calcular_objetivos. `df_crudo` trae las
+    columnas de COLUMNAS_INVENTARIO.
+    """
+    df_demanda, cubo_ventas = preparar_demanda(df_crudo, hoy)
+    df_clasificado = clasificar_inventario(df_demanda, df_proveedores, cubo_ventas, alcance_abc, metodos_demanda)
+    return calcular_objetivos(df_clasificado, dias_seguridad, dias_objetivo), cubo_ventas
+
+
+def analizar_inventario(df_crudo, df_proveedores=None, dias_seguridad=DIAS_SEGURIDAD_DEFECTO, dias_objetivo=None, hoy=None, alcance_abc='global', metodos_demanda=None):
+    """Cuadro de análisis por SKU-tienda (indexado por 'index'); ver analizar_inventario_con_cubo."""
+    return analizar_inventario_con_cubo(df_crudo, df_proveedores, dias_seguridad, dias_objetivo, hoy, alcance_abc, metodos_demanda)[0]
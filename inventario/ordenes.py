@@ -0,0 +1,166 @@
+# inventario/ordenes.py
+"""Lectura del registro de órdenes en Google Sheets y normalización de las órdenes abiertas, sin dependencias de Streamlit."""
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from inventario.espejo import valores_hoja
+
+HOJA_REGISTRO_ORDENES = 'Registro_Ordenes'
+# Segundos durante los que unas órdenes precargadas se consideran vigentes (mismo TTL que la página)
+TTL_ORDENES = 60
+
+
+def _numerizar(serie):
+    """Textos de la hoja como los deja get_all_records de gspread: enteros y decimales a número, el resto igual."""
+    texto = serie.str.strip()
+    es_entero = texto.str.fullmatch(r'[+-]?\d+').to_numpy(dtype=bool, na_value=False)
+    # Solo se intenta convertir a decimal lo que tiene cifras y no es entero (ni lleva '_')
+    candidatos = ~es_entero & texto.str.contains(r'\d').to_numpy(dtype=bool, na_value=False)
+    candidatos &= ~texto.str.contains('_', regex=False).to_numpy(dtype=bool, na_value=False)
+    posiciones = np.flatnonzero(candidatos)
+    decimal = pd.to_numeric(texto.iloc[posiciones], errors='coerce').to_numpy(dtype=np.float64)
+    es_decimal = ~np.isnan(decimal)
+    if not es_entero.any() and not es_decimal.any():
+        return serie
+    valores = serie.to_numpy(dtype=object, copy=True)
+    try:
+        valores[es_entero] = texto[es_entero].astype('int64').to_numpy()
+    except OverflowError:
+        valores[es_entero] = [int(valor) for valor in texto[es_entero]]
+    valores[posiciones[es_decimal]] = decimal[es_decimal]
+    return pd.Series(valores, index=serie.index, name=serie.name).infer_objects()
+
+
+def registros_hoja(encabezados, tabla):
+    """DataFrame de registros (un campo por encabezado) a partir de la tabla de texto del espejo."""
+    if tabla is None or tabla.empty:
+        return pd.DataFrame()
+    return pd.DataFrame({encabezado: _numerizar(tabla[f"c{i}"]) for i, encabezado in enumerate(encabezados)})
+
+
+def leer_hoja_ordenes(client, spreadsheet_key, sheet_name=HOJA_REGISTRO_ORDENES, directorio_espejo=None):
+    """DataFrame de la hoja con el SKU como texto y el ID_Grupo derivado de ID_Orden.
+
+    Las filas llegan por el espejo local (inventario.espejo.valores_hoja): en cada lectura solo se
+    descargan las filas nuevas o editadas. `attrs['lectura']` trae cuántas se descargaron.
+    """
+    worksheet = client.open_by_key(spreadsheet_key).worksheet(sheet_name)
+    encabezados, tabla, metricas = valores_hoja(worksheet, spreadsheet_key, sheet_name, directorio_espejo)
+    df = registros_hoja(encabezados, tabla)
+    if not df.empty and 'SKU' in df.columns:
+        df['SKU'] = df['SKU'].astype(str)
+    if 'ID_Orden' in df.columns and not df.empty:
+        # Todo lo anterior al último guion ('' si no hay guion)
+        df['ID_Grupo'] = df['ID_Orden'].astype(str).str.rpartition('-')[0]
+    df.attrs['lectura'] = metricas
+    return df
+
+
+def version_ordenes(df):
+    """Token de versión del registro (filas y hash del contenido), para usar como clave de caché.
+
+    Se calcula una vez al leer la hoja; las cachés comparan este texto en lugar de todo el DataFrame.
+    """
+    if df is None or df.empty:
+        return 'vacio'
+    huella = pd.util.hash_pandas_object(df, index=False).to_numpy().sum(dtype=np.uint64)
+    return f"{len(df)}:{int(huella):016x}"
+
+
+def _huellas_filas(df):
+    """(hash de la fila, número de aparición de ese hash): identifica cada fila aunque haya repetidas."""
+    huellas = pd.util.hash_pandas_object(df, index=False)
+    return pd.MultiIndex.from_arrays([huellas.to_numpy(), huellas.groupby(huellas).cumcount().to_numpy()])
+
+
+def lineas_cambiadas(df_anterior, df_nuevo):
+    """Líneas del registro que cambiaron entre dos lecturas: (agregadas, quitadas).
+
+    Una línea editada aparece en ambas (su versión nueva y la anterior). Las filas se comparan por el
+    hash de su contenido, sin recorrerlas en Python. Devuelve None si las columnas no coinciden, y
+    entonces no hay forma barata de comparar.
+    """
+    if df_anterior is None or df_anterior.empty:
+        return (df_nuevo if df_nuevo is not None else pd.DataFrame()), pd.DataFrame()
+    if df_nuevo is None or df_nuevo.empty:
+        return pd.DataFrame(), df_anterior
+    if list(df_anterior.columns) != list(df_nuevo.columns):
+        return None
+    huellas_anteriores, huellas_nuevas = _huellas_filas(df_anterior), _huellas_filas(df_nuevo)
+    return df_nuevo[~huellas_nuevas.isin(huellas_anteriores)], df_anterior[~huellas_anteriores.isin(huellas_nuevas)]
+
+
+def normalizar_texto_clave(valor):
+    if pd.isna(valor):
+        return ""
+    texto = str(valor).strip()
+    if not texto or texto.lower() == 'nan':
+        return ""
+    texto = unicodedata.normalize('NFKD', texto)
+    texto = ''.join(char for char in texto if not unicodedata.combining(char))
+    return texto.lower().strip()
+
+
+def normalizar_sku_clave(valor):
+    texto = normalizar_texto_clave(valor)
+    if texto.endswith('.0'):
+        texto = texto[:-2]
+    return texto
+
+
+def normalizar_estado_orden(valor):
+    estado = normalizar_texto_clave(valor)
+    equivalencias = {
+        'pendiente': 'Pendiente',
+        'pendientes': 'Pendiente',
+        'en transito': 'En Tránsito',
+        'entransito': 'En Tránsito',
+        'transito': 'En Tránsito',
+        'recibido': 'Recibido',
+        'recibida': 'Recibido',
+        'cancelado': 'Cancelado',
+        'cancelada': 'Cancelado'
+    }
+    return equivalencias.get(estado, str(valor).strip() if pd.notna(valor) else '')
+
+
+def construir_mapa_tiendas_canonicas(df_base):
+    tiendas = []
+    if df_base is not None and not df_base.empty and 'Almacen_Nombre' in df_base.columns:
+        tiendas = sorted({str(tienda).strip() for tienda in df_base['Almacen_Nombre'].dropna().unique() if str(tienda).strip()})
+    return {normalizar_texto_clave(tienda): tienda for tienda in tiendas}
+
+
+def normalizar_tienda_canonica(valor, mapa_tiendas):
+    clave = normalizar_texto_clave(valor)
+    if not clave:
+        return ""
+    return mapa_tiendas.get(clave, str(valor).strip())
+
+
+def preparar_ordenes_abiertas_para_calculo(df_ordenes, mapa_tiendas):
+    columnas_requeridas = {'SKU', 'Tienda_Destino', 'Cantidad_Solicitada', 'Estado'}
+    if df_ordenes is None or df_ordenes.empty or not columnas_requeridas.issubset(set(df_ordenes.columns)):
+        return pd.DataFrame(columns=['SKU', 'Tienda_Destino', 'Cantidad_Solicitada', 'Estado', 'Es_Traslado', 'Tienda_Origen'])
+
+    df_abiertas = df_ordenes.copy()
+    df_abiertas['SKU'] = df_abiertas['SKU'].apply(normalizar_sku_clave)
+    df_abiertas['Estado'] = df_abiertas['Estado'].apply(normalizar_estado_orden)
+    df_abiertas = df_abiertas[df_abiertas['Estado'].isin(['Pendiente', 'En Tránsito'])].copy()
+    if df_abiertas.empty:
+        return pd.DataFrame(columns=['SKU', 'Tienda_Destino', 'Cantidad_Solicitada', 'Estado', 'Es_Traslado', 'Tienda_Origen'])
+
+    df_abiertas['Cantidad_Solicitada'] = pd.to_numeric(df_abiertas['Cantidad_Solicitada'], errors='coerce').fillna(0)
+    df_abiertas = df_abiertas[df_abiertas['Cantidad_Solicitada'] > 0].copy()
+    if df_abiertas.empty:
+        return pd.DataFrame(columns=['SKU', 'Tienda_Destino', 'Cantidad_Solicitada', 'Estado', 'Es_Traslado', 'Tienda_Origen'])
+
+    df_abiertas['Tienda_Destino'] = df_abiertas['Tienda_Destino'].apply(lambda valor: normalizar_tienda_canonica(valor, mapa_tiendas))
+    proveedor_normalizado = df_abiertas.get('Proveedor', pd.Series('', index=df_abiertas.index)).astype(str)
+    df_abiertas['Es_Traslado'] = proveedor_normalizado.str.upper().str.startswith('TRASLADO INTERNO:')
+    df_abiertas['Tienda_Origen'] = proveedor_normalizado.str.extract(r'TRASLADO INTERNO:\s*(.*)', expand=False).fillna('')
+    df_abiertas['Tienda_Origen'] = df_abiertas['Tienda_Origen'].apply(lambda valor: normalizar_tienda_canonica(valor, mapa_tiendas))
+    df_abiertas = df_abiertas[(df_abiertas['SKU'] != '') & (df_abiertas['Tienda_Destino'] != '')].copy()
+    return df_abiertas
@@ -0,0 +1,61 @@
+# inventario/proveedores.py
+"""Índice SKU → (Proveedor, SKU_Proveedor) deduplicado para asignar proveedores por posición."""
+import io
+
+import numpy as np
+import pandas as pd
+
+from inventario.snapshot import guardar_snapshot, leer_snapshot
+
+COLUMNAS_PROVEEDORES = ['SKU', 'Proveedor', 'SKU_Proveedor']
+COLUMNAS_ARCHIVO_PROVEEDORES = {'REFERENCIA': 'SKU', 'PROVEEDOR': 'Proveedor', 'COD PROVEEDOR': 'SKU_Proveedor'}
+# Cambia cuando cambia la forma del índice, para no reutilizar snapshots con otro esquema
+ESQUEMA_PROVEEDORES = 'v1'
+
+
+def preparar_indice_proveedores(df_proveedores):
+    """Deja una fila por SKU (la primera del archivo) con el SKU como índice único."""
+    if df_proveedores is None or df_proveedores.empty:
+        return pd.DataFrame(columns=COLUMNAS_PROVEEDORES[1:], index=pd.Index([], name='SKU'))
+    if df_proveedores.index.name == 'SKU' and df_proveedores.index.is_unique:
+        return df_proveedores
+    # También se acepta el archivo sin procesar (REFERENCIA, PROVEEDOR, COD PROVEEDOR)
+    df_proveedores = df_proveedores.rename(columns=COLUMNAS_ARCHIVO_PROVEEDORES)
+    df = df_proveedores[COLUMNAS_PROVEEDORES].copy()
+    # Texto homogéneo para que el índice se pueda guardar en Parquet (y el SKU coincida con el del inventario)
+    for col in COLUMNAS_PROVEEDORES:
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df.drop_duplicates(subset=['SKU'], keep='first').set_index('SKU')
+
+
+def cargar_proveedores(cliente, ruta):
+    """(índice de proveedores, {'version', 'desde_snapshot'}) del Excel en `ruta`; solo se lee cuando cambia su versión."""
+    # El Excel (lento de leer) solo se procesa cuando cambia su versión
+    version = cliente.version(ruta)
+    df_proveedores = leer_snapshot('proveedores', f"{version}|{ESQUEMA_PROVEEDORES}")
+    if df_proveedores is not None:
+        return preparar_indice_proveedores(df_proveedores.set_index('SKU')), {'version': version, 'desde_snapshot': True}
+    version, contenido = cliente.descargar(ruta)
+    with io.BytesIO(contenido) as stream:
+        df_proveedores = pd.read_excel(stream, dtype={'REFERENCIA': str, 'COD PROVEEDOR': str})
+
+    df_proveedores.rename(columns=COLUMNAS_ARCHIVO_PROVEEDORES, inplace=True)
+    df_proveedores.dropna(subset=['SKU_Proveedor'], inplace=True)
+    df_proveedores = preparar_indice_proveedores(df_proveedores[COLUMNAS_PROVEEDORES])
+    guardar_snapshot(df_proveedores.reset_index(), 'proveedores', f"{version}|{ESQUEMA_PROVEEDORES}")
+    return df_proveedores, {'version': version, 'desde_snapshot': False}
+
+
+def asignar_proveedores(skus, indice_proveedores):
+    """Devuelve (Proveedor, SKU_Proveedor) alineados con `skus` mediante búsqueda posicional."""
+    indice_proveedores = preparar_indice_proveedores(indice_proveedores)
+    codigos, unicos = pd.factorize(pd.Series(skus).astype(str))
+    posiciones = indice_proveedores.index.get_indexer(unicos)[codigos]
+    encontrados = posiciones >= 0
+
+    columnas = []
+    for col, faltante in (('Proveedor', 'No Asignado'), ('SKU_Proveedor', 'N/A')):
+        valores = np.full(len(posiciones), faltante, dtype=object)
+        valores[encontrados] = indice_proveedores[col].to_numpy(dtype=object)[posiciones[encontrados]]
+        columnas.append(pd.Series(valores, dtype=object).fillna(faltante).to_numpy())
+    return columnas[0], columnas[1]
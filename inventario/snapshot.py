@@ -0,0 +1,95 @@
+# inventario/snapshot.py
+"""Snapshots locales en Parquet de los archivos que se descargan de Dropbox."""
+import hashlib
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+DIRECTORIO_SNAPSHOTS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'snapshots'
+)
+# Clave de los metadatos propios en el esquema Parquet: se escriben explícitamente y no dependen
+# de que DataFrame.attrs sobreviva al viaje por Parquet
+CLAVE_METADATOS = b'inventario.metadatos'
+
+
+def version_archivo(metadata):
+    """Devuelve el token de versión (content_hash o rev) de los metadatos de un archivo."""
+    return getattr(metadata, 'content_hash', None) or getattr(metadata, 'rev', None)
+
+
+def _ruta_snapshot(nombre, version, directorio):
+    token = hashlib.sha1(str(version).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(directorio, f"{nombre}-{token}.parquet")
+
+
+def leer_snapshot_con_metadatos(nombre, version, directorio=None):
+    """(df, metadatos) del snapshot de `nombre` para la versión indicada, o (None, None) si no existe.
+
+    `metadatos` es el diccionario que se pasó a guardar_snapshot, o None si se guardó sin metadatos.
+    """
+    if not version:
+        return None, None
+    ruta = _ruta_snapshot(nombre, version, directorio or DIRECTORIO_SNAPSHOTS)
+    if not os.path.exists(ruta):
+        return None, None
+    try:
+        import pyarrow.parquet as pq
+        # Solo el pie del archivo: los metadatos del esquema sin leer las columnas
+        crudos = (pq.read_schema(ruta).metadata or {}).get(CLAVE_METADATOS)
+        metadatos = json.loads(crudos) if crudos is not None else None
+        return pd.read_parquet(ruta), metadatos
+    except Exception:
+        # Snapshot ilegible (escritura interrumpida, pyarrow ausente...): se vuelve a descargar
+        return None, None
+
+
+def leer_snapshot(nombre, version, directorio=None):
+    """Carga el snapshot de `nombre` para la versión indicada, o None si no existe."""
+    return leer_snapshot_con_metadatos(nombre, version, directorio)[0]
+
+
+def _escribir_parquet(df, ruta, metadatos):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    if metadatos is not None:
+        tabla = tabla.replace_schema_metadata({
+            **(tabla.schema.metadata or {}), CLAVE_METADATOS: json.dumps(metadatos).encode('utf-8'),
+        })
+    pq.write_table(tabla, ruta)
+
+
+def guardar_snapshot(df, nombre, version, directorio=None, metadatos=None):
+    """Escribe el snapshot de forma atómica y elimina las versiones anteriores del mismo archivo.
+
+    `metadatos` (diccionario serializable en JSON) se guarda en el esquema Parquet junto a los datos.
+    """
+    if not version or df is None:
+        return None
+    directorio = directorio or DIRECTORIO_SNAPSHOTS
+    ruta = _ruta_snapshot(nombre, version, directorio)
+    ruta_tmp = None
+    try:
+        os.makedirs(directorio, exist_ok=True)
+        # Temporal único por escritura: las sesiones de Streamlit son hilos de un mismo proceso
+        descriptor, ruta_tmp = tempfile.mkstemp(dir=directorio, prefix=f"{os.path.basename(ruta)}.", suffix='.tmp')
+        os.close(descriptor)
+        _escribir_parquet(df, ruta_tmp, metadatos)
+        os.replace(ruta_tmp, ruta)
+    except Exception:
+        # Un snapshot fallido nunca debe romper la carga: solo se pierde el atajo
+        if ruta_tmp and os.path.exists(ruta_tmp):
+            os.remove(ruta_tmp)
+        return None
+
+    for archivo in os.listdir(directorio):
+        ruta_archivo = os.path.join(directorio, archivo)
+        if archivo.startswith(f"{nombre}-") and ruta_archivo != ruta and not archivo.endswith('.tmp'):
+            try:
+                os.remove(ruta_archivo)
+            except OSError:
+                pass
+    return ruta
@@ -0,0 +1,375 @@
+# inventario/traslados.py
+"""Plan de traslados entre tiendas: asignación voraz con arreglos ordenados u óptima por costo de flete."""
+import time
+
+import numpy as np
+import pandas as pd
+
+# Ciudad de cada tienda y distancias aproximadas por carretera (km) entre ciudades; ajustar con las
+# rutas reales. Dos tiendas de la misma ciudad están a DISTANCIA_MISMA_CIUDAD_KM y una tienda sin
+# ciudad conocida, a DISTANCIA_DESCONOCIDA_KM de cualquier otra.
+CIUDAD_TIENDA = {
+    'Opalo': 'Dosquebradas', 'Cedi': 'Pereira', 'Olaya': 'Pereira', 'FerreBox': 'Pereira',
+    'Laureles': 'Pereira', 'Cerritos': 'Pereira', 'Armenia': 'Armenia', 'Manizales': 'Manizales',
+}
+DISTANCIAS_CIUDADES_KM = {
+    ('Pereira', 'Dosquebradas'): 6, ('Pereira', 'Armenia'): 50, ('Pereira', 'Manizales'): 55,
+    ('Dosquebradas', 'Armenia'): 56, ('Dosquebradas', 'Manizales'): 50, ('Armenia', 'Manizales'): 100,
+}
+DISTANCIA_MISMA_CIUDAD_KM = 5
+DISTANCIA_DESCONOCIDA_KM = 100
+# Costo de mover una unidad un km: fijo por unidad más proporcional al peso (Peso_Articulo)
+TARIFA_KM_UNIDAD = 1.0
+TARIFA_KM_KG = 2.0
+# Tiempo máximo del optimizador; si no termina, el plan es el voraz
+LIMITE_SEGUNDOS_OPTIMIZADOR = 10.0
+MODOS_PLAN = ('voraz', 'optimo')
+# Pares (origen, destino) por problema del optimizador: bloques de SKU completos
+PARES_POR_BLOQUE = 5_000
+
+# Columnas del plan de traslados, en el orden en que las muestran las páginas
+COLUMNAS_PLAN = [
+    'SKU', 'Descripcion', 'Marca_Nombre', 'Proveedor', 'Segmento_ABC',
+    'Tienda Origen', 'Stock en Origen', 'Tienda Destino', 'Stock en Destino',
+    'Necesidad en Destino', 'Cobertura Proyectada Destino (días)', 'Uds a Enviar',
+    'Peso Individual (kg)', 'Costo_Promedio_UND', 'Peso Total (kg)', 'Valor del Traslado',
+]
+
+
+def _inicios_grupo(codigos_ordenados, n_grupos):
+    """Posición del primer elemento de cada grupo en un arreglo de códigos ya ordenado."""
+    conteo = np.bincount(codigos_ordenados, minlength=n_grupos)
+    return np.cumsum(conteo) - conteo
+
+
+def _acumulado_por_grupo(valores, codigos_ordenados, n_grupos):
+    """Suma acumulada de `valores` que vuelve a 0 al empezar cada grupo."""
+    acumulado = np.cumsum(valores)
+    previo = np.concatenate(([0], acumulado))[_inicios_grupo(codigos_ordenados, n_grupos)]
+    return acumulado - previo[codigos_ordenados]
+
+
+def asignar_voraz(sku_origen, tienda_origen, excedente, sku_destino, tienda_destino, necesidad):
+    """Asignación voraz de excedentes a necesidades del mismo SKU, sin enviar a la propia tienda.
+
+    Recibe códigos enteros de SKU y tienda y las cantidades, con los orígenes en su orden de prioridad
+    (mayor excedente primero) y los destinos en el suyo. El resultado es el del recorrido fila a fila:
+    cada destino toma de los orígenes en orden `floor(min(necesidad, excedente))` unidades mientras
+    ambos tengan al menos 1. Como floor(min(a, b)) = min(floor(a), floor(b)) y lo enviado es entero,
+    basta repartir las partes enteras.
+
+    Por SKU, los destinos y los orígenes ocupan tramos consecutivos de una recta (sumas acumuladas)
+    y cada traslado es el solape de un tramo de destino con uno de origen; todos los SKU se resuelven
+    a la vez con una sola unión de cortes y dos búsquedas binarias. Los SKU donde una misma tienda
+    cede y necesita (su origen se salta para esa necesidad) se recorren aparte, fila a fila.
+
+    Devuelve (posiciones de destino, posiciones de origen, unidades) en el orden del recorrido.
+    """
+    sku_origen = np.asarray(sku_origen, dtype=np.int64)
+    sku_destino = np.asarray(sku_destino, dtype=np.int64)
+    tienda_origen = np.asarray(tienda_origen, dtype=np.int64)
+    tienda_destino = np.asarray(tienda_destino, dtype=np.int64)
+    capacidad = np.floor(np.nan_to_num(np.asarray(excedente, dtype=np.float64))).clip(min=0).astype(np.int64)
+    pedido = np.floor(np.nan_to_num(np.asarray(necesidad, dtype=np.float64))).clip(min=0).astype(np.int64)
+    vacio = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0, dtype=np.int64))
+    if not len(capacidad) or not len(pedido):
+        return vacio
+    n_skus = int(max(sku_origen.max(), sku_destino.max())) + 1
+    n_tiendas = int(max(tienda_origen.max(), tienda_destino.max())) + 1
+
+    # SKU con una tienda que cede y necesita a la vez: la exclusión rompe los tramos consecutivos
+    claves_origen = sku_origen[capacidad > 0] * n_tiendas + tienda_origen[capacidad > 0]
+    claves_destino = sku_destino[pedido > 0] * n_tiendas + tienda_destino[pedido > 0]
+    cruzados = np.zeros(n_skus, dtype=bool)
+    cruzados[np.intersect1d(claves_origen, claves_destino) // n_tiendas] = True
+
+    # Agrupar por SKU conservando el orden de prioridad dentro de cada grupo
+    orden_o = np.argsort(sku_origen, kind='stable')
+    orden_d = np.argsort(sku_destino, kind='stable')
+    so, sd = sku_origen[orden_o], sku_destino[orden_d]
+    eo = np.where(cruzados[so], 0, capacidad[orden_o])
+    nd = np.where(cruzados[sd], 0, pedido[orden_d])
+
+    # Recta común: cada SKU ocupa [desplazamiento, desplazamiento + lo que se puede trasladar)
+    total = np.minimum(np.bincount(so, weights=eo, minlength=n_skus),
+                       np.bincount(sd, weights=nd, minlength=n_skus)).astype(np.int64)
+    desplazamiento = np.cumsum(total) - total
+    fin_o = desplazamiento[so] + np.minimum(_acumulado_por_grupo(eo, so, n_skus), total[so])
+    fin_d = desplazamiento[sd] + np.minimum(_acumulado_por_grupo(nd, sd, n_skus), total[sd])
+    # fin_o y fin_d ya vienen ordenados: se funden y se quitan los cortes repetidos
+    cortes = np.sort(np.concatenate(([0], fin_o, fin_d)), kind='stable')
+    cortes = cortes[np.concatenate(([True], cortes[1:] != cortes[:-1]))]
+    inicio_tramo = cortes[:-1]
+    filas_destino = [orden_d[np.searchsorted(fin_d, inicio_tramo, side='right')]]
+    filas_origen = [orden_o[np.searchsorted(fin_o, inicio_tramo, side='right')]]
+    unidades = [np.diff(cortes)]
+
+    # SKU cruzados: recorrido fila a fila sobre los arreglos ya agrupados
+    if cruzados.any():
+        inicios_o, inicios_d = _inicios_grupo(so, n_skus), _inicios_grupo(sd, n_skus)
+        fines_o = inicios_o + np.bincount(so, minlength=n_skus)
+        fines_d = inicios_d + np.bincount(sd, minlength=n_skus)
+        par_d, par_o, par_u = [], [], []
+        for sku in np.flatnonzero(cruzados):
+            grupo_o = orden_o[inicios_o[sku]:fines_o[sku]]
+            restante = capacidad[grupo_o].tolist()
+            tiendas_o = tienda_origen[grupo_o].tolist()
+            for fila_d in orden_d[inicios_d[sku]:fines_d[sku]].tolist():
+                falta, tienda = int(pedido[fila_d]), tienda_destino[fila_d]
+                for k, fila_o in enumerate(grupo_o.tolist()):
+                    if falta < 1:
+                        break
+                    if tiendas_o[k] == tienda or restante[k] < 1:
+                        continue
+                    enviar = min(falta, restante[k])
+                    par_d.append(fila_d)
+                    par_o.append(fila_o)
+                    par_u.append(enviar)
+                    falta -= enviar
+                    restante[k] -= enviar
+        filas_destino.append(np.asarray(par_d, dtype=np.intp))
+        filas_origen.append(np.asarray(par_o, dtype=np.intp))
+        unidades.append(np.asarray(par_u, dtype=np.int64))
+
+    filas_destino, filas_origen, unidades = (np.concatenate(partes) for partes in (filas_destino, filas_origen, unidades))
+    orden = np.lexsort((filas_origen, filas_destino))
+    return filas_destino[orden], filas_origen[orden], unidades[orden]
+
+
+def distancia_tiendas(origen, destino, distancias=None):
+    """Distancia en km entre dos tiendas; `distancias` ({(tienda, tienda): km}) tiene prioridad sobre las ciudades."""
+    if origen == destino:
+        return 0.0
+    for par in ((origen, destino), (destino, origen)):
+        if distancias and par in distancias:
+            return float(distancias[par])
+    ciudad_o, ciudad_d = CIUDAD_TIENDA.get(origen), CIUDAD_TIENDA.get(destino)
+    if ciudad_o is None or ciudad_d is None:
+        return float(DISTANCIA_DESCONOCIDA_KM)
+    if ciudad_o == ciudad_d:
+        return float(DISTANCIA_MISMA_CIUDAD_KM)
+    km = DISTANCIAS_CIUDADES_KM.get((ciudad_o, ciudad_d), DISTANCIAS_CIUDADES_KM.get((ciudad_d, ciudad_o)))
+    return float(DISTANCIA_DESCONOCIDA_KM if km is None else km)
+
+
+def matriz_distancias(tiendas, distancias=None):
+    """Matriz de km entre las tiendas (origen en filas, destino en columnas) en el orden de `tiendas`."""
+    return np.array([[distancia_tiendas(o, d, distancias) for d in tiendas] for o in tiendas], dtype=np.float64)
+
+
+def costo_flete(df_plan, distancias=None):
+    """Costo estimado del flete de un plan ya armado, con las mismas tarifas que plan_traslados."""
+    if df_plan is None or df_plan.empty:
+        return 0.0
+    codigos, tiendas = pd.factorize(pd.concat([df_plan['Tienda Origen'], df_plan['Tienda Destino']], ignore_index=True))
+    km = matriz_distancias(list(tiendas), distancias)[codigos[:len(df_plan)], codigos[len(df_plan):]]
+    peso = df_plan['Peso Individual (kg)'].to_numpy(dtype=np.float64).clip(min=0)
+    return float((km * (TARIFA_KM_UNIDAD + TARIFA_KM_KG * peso) * df_plan['Uds a Enviar'].to_numpy(dtype=np.float64)).sum())
+
+
+def asignar_costo_minimo(sku_origen, tienda_origen, excedente, sku_destino, tienda_destino, necesidad,
+                         km, peso, prioridad, limite_segundos=LIMITE_SEGUNDOS_OPTIMIZADOR):
+    """Traslados de costo mínimo para todos los SKU en un solo problema de transporte disperso.
+
+    Variables: unidades por par (origen, destino) del mismo SKU y distinta tienda. Restricciones:
+    cada origen cede a lo sumo su excedente y cada destino recibe a lo sumo su necesidad (partes
+    enteras). Cada unidad cuesta km × (TARIFA_KM_UNIDAD + TARIFA_KM_KG × peso del destino) y rinde
+    una recompensa mayor que cualquier costo, escalada por `prioridad` (0 a 1) del destino: se
+    traslada todo lo posible, primero a los destinos prioritarios y desde los orígenes más baratos.
+    La matriz es totalmente unimodular, así que la solución de vértice de HiGHS ya es entera.
+
+    `km` es la matriz de distancias indexada por los códigos de tienda. Devuelve
+    (posiciones de destino, posiciones de origen, unidades), o None si scipy no está instalado
+    o el optimizador no termina en `limite_segundos`.
+    """
+    try:
+        from scipy.optimize import linprog
+        from scipy.sparse import coo_matrix
+    except ImportError:
+        return None
+    sku_origen = np.asarray(sku_origen, dtype=np.int64)
+    sku_destino = np.asarray(sku_destino, dtype=np.int64)
+    tienda_origen = np.asarray(tienda_origen, dtype=np.int64)
+    tienda_destino = np.asarray(tienda_destino, dtype=np.int64)
+    capacidad = np.floor(np.nan_to_num(np.asarray(excedente, dtype=np.float64))).clip(min=0)
+    pedido = np.floor(np.nan_to_num(np.asarray(necesidad, dtype=np.float64))).clip(min=0)
+    vacio = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0, dtype=np.int64))
+    util_o, util_d = np.flatnonzero(capacidad >= 1), np.flatnonzero(pedido >= 1)
+    if not len(util_o) or not len(util_d):
+        return vacio
+
+    # Pares (origen, destino) del mismo SKU: cada origen se repite por los destinos de su SKU
+    n_skus = int(max(sku_origen.max(), sku_destino.max())) + 1
+    util_o = util_o[np.argsort(sku_origen[util_o], kind='stable')]
+    util_d = util_d[np.argsort(sku_destino[util_d], kind='stable')]
+    destinos_por_sku = np.bincount(sku_destino[util_d], minlength=n_skus)
+    repeticiones = destinos_por_sku[sku_origen[util_o]]
+    par_o = np.repeat(np.arange(len(util_o)), repeticiones)
+    desde = np.repeat(np.cumsum(repeticiones) - repeticiones, repeticiones)
+    inicio_d = (np.cumsum(destinos_por_sku) - destinos_por_sku)[sku_origen[util_o]]
+    par_d = np.repeat(inicio_d, repeticiones) + np.arange(len(par_o)) - desde
+    par_o, par_d = util_o[par_o], util_d[par_d]
+    distinta = tienda_origen[par_o] != tienda_destino[par_d]
+    par_o, par_d = par_o[distinta], par_d[distinta]
+    if not len(par_o):
+        return vacio
+
+    costo = km[tienda_origen[par_o], tienda_destino[par_d]] * (
+        TARIFA_KM_UNIDAD + TARIFA_KM_KG * np.nan_to_num(np.asarray(peso, dtype=np.float64))[par_d].clip(min=0))
+    recompensa = (costo.max() + 1) * (1 + np.asarray(prioridad, dtype=np.float64)[par_d])
+
+    neto = recompensa - costo
+    unidades = np.zeros(len(par_o), dtype=np.int64)
+
+    # SKU con un solo origen o un solo destino: el nodo único reparte su cantidad entre sus pares de
+    # mayor a menor valor neto, lo que ya es óptimo y sale con una suma acumulada por SKU
+    sku_par = sku_origen[par_o]
+    origenes_sku = np.bincount(sku_origen[np.unique(par_o)], minlength=n_skus)
+    destinos_sku = np.bincount(sku_destino[np.unique(par_d)], minlength=n_skus)
+    un_origen = origenes_sku[sku_par] == 1
+    directo = un_origen | (destinos_sku[sku_par] == 1)
+    pares = np.flatnonzero(directo)
+    pares = pares[np.lexsort((-neto[pares], sku_par[pares]))]
+    compartida = np.where(un_origen[pares], capacidad[par_o[pares]], pedido[par_d[pares]])
+    propia = np.where(un_origen[pares], pedido[par_d[pares]], capacidad[par_o[pares]])
+    previo = _acumulado_por_grupo(propia, sku_par[pares], n_skus) - propia
+    unidades[pares] = np.clip(compartida - previo, 0, propia).astype(np.int64)
+
+    # Resto: un problema de transporte por bloque de SKU completos, con el tiempo compartido
+    pares = np.flatnonzero(~directo)
+    if len(pares):
+        inicio_sku = np.searchsorted(sku_par[pares], sku_par[pares], side='left')
+        bloque = inicio_sku // PARES_POR_BLOQUE
+        limites = np.flatnonzero(np.concatenate(([True], bloque[1:] != bloque[:-1], [True])))
+        fin_plazo = time.perf_counter() + float(limite_segundos)
+        for desde, hasta in zip(limites[:-1], limites[1:]):
+            restante = fin_plazo - time.perf_counter()
+            if restante <= 0:
+                return None
+            en_bloque = pares[desde:hasta]
+            resultado = _resolver_transporte(
+                linprog, coo_matrix, par_o[en_bloque], par_d[en_bloque], neto[en_bloque], capacidad, pedido, restante)
+            if resultado is None:
+                return None
+            unidades[en_bloque] = resultado
+
+    enviados = unidades > 0
+    filas_destino, filas_origen, unidades = par_d[enviados], par_o[enviados], unidades[enviados]
+    orden = np.lexsort((filas_origen, filas_destino))
+    return filas_destino[orden], filas_origen[orden], unidades[orden]
+
+
+def _resolver_transporte(linprog, coo_matrix, par_o, par_d, neto, capacidad, pedido, limite_segundos):
+    """Unidades por par que maximizan el valor neto (HiGHS), o None si no termina a tiempo."""
+    # Una fila por origen y una por destino usados; una columna por par
+    origenes, fila_o = np.unique(par_o, return_inverse=True)
+    destinos, fila_d = np.unique(par_d, return_inverse=True)
+    columnas = np.arange(len(par_o))
+    a_ub = coo_matrix(
+        (np.ones(2 * len(par_o)), (np.concatenate((fila_o, len(origenes) + fila_d)), np.concatenate((columnas, columnas)))),
+        shape=(len(origenes) + len(destinos), len(par_o)),
+    ).tocsr()
+    b_ub = np.concatenate((capacidad[origenes], pedido[destinos]))
+    resultado = linprog(-neto, A_ub=a_ub, b_ub=b_ub, bounds=(0, None), method='highs',
+                        options={'time_limit': float(limite_segundos)})
+    if resultado.status != 0 or resultado.x is None:
+        return None
+    return np.rint(resultado.x).astype(np.int64)
+
+
+def _columna(df, columna, filas, defecto=0):
+    """Valores de `columna` en las posiciones `filas` (las categorías vuelven a su tipo de valores)."""
+    if columna not in df.columns:
+        return np.full(len(filas), defecto)
+    serie = df[columna]
+    valores = serie.array.take(filas)
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return valores.astype(serie.dtype.categories.dtype)
+    return valores
+
+
+def plan_traslados(df, columna_necesidad='Necesidad_Ajustada_Por_Transito',
+                   columna_excedente='Excedente_Trasladable', orden_destino=None, modo='voraz',
+                   distancias=None, limite_segundos=LIMITE_SEGUNDOS_OPTIMIZADOR):
+    """Plan de traslados de `df` (una fila por SKU-tienda) ordenado por valor del traslado.
+
+    Los orígenes son las filas con excedente (mayor primero) y los destinos las filas con necesidad,
+    en `orden_destino` ([(columna, ascendente), ...]); por defecto, menor Cobertura_Dias_Proyectada
+    y mayor necesidad si existe la cobertura, o solo mayor necesidad.
+
+    `modo='voraz'` reparte en ese orden (asignar_voraz); `modo='optimo'` resuelve el problema de
+    costo mínimo con las distancias entre tiendas y el peso (asignar_costo_minimo), usando el orden
+    como prioridad, y vuelve al voraz si no termina a tiempo. `attrs` del resultado guarda el modo
+    aplicado ('modo_plan') y el costo estimado del flete ('costo_flete'). Sin traslados devuelve un
+    DataFrame vacío.
+    """
+    if modo not in MODOS_PLAN:
+        raise ValueError(f"Modo de plan desconocido: {modo} (opciones: {', '.join(MODOS_PLAN)})")
+    if df is None or df.empty:
+        return pd.DataFrame()
+    if orden_destino is None:
+        orden_destino = [(columna_necesidad, False)]
+        if 'Cobertura_Dias_Proyectada' in df.columns:
+            orden_destino = [('Cobertura_Dias_Proyectada', True), (columna_necesidad, False)]
+    # Posiciones de orígenes y destinos en su orden de prioridad, sin copiar el cuadro
+    excedente = pd.to_numeric(df[columna_excedente], errors='coerce').to_numpy(dtype=np.float64, na_value=0)
+    necesidad = pd.to_numeric(df[columna_necesidad], errors='coerce').to_numpy(dtype=np.float64, na_value=0)
+    origen = np.flatnonzero(excedente > 0)
+    origen = origen[np.argsort(-excedente[origen], kind='stable')]
+    destino = np.flatnonzero(necesidad > 0)
+    claves = [df[columna].to_numpy(dtype=np.float64, na_value=np.nan)[destino] * (1 if asc else -1)
+              for columna, asc in orden_destino]
+    destino = destino[np.lexsort(claves[::-1])]
+    if not len(origen) or not len(destino):
+        return pd.DataFrame()
+
+    codigos_sku, _ = pd.factorize(df['SKU'])
+    codigos_tienda, tiendas = pd.factorize(df['Almacen_Nombre'])
+    km = matriz_distancias(list(tiendas), distancias)
+    peso = (pd.to_numeric(df['Peso_Articulo'], errors='coerce').to_numpy(dtype=np.float64, na_value=0)
+            if 'Peso_Articulo' in df.columns else np.zeros(len(df)))
+    asignacion, modo_aplicado = None, 'voraz'
+    if modo == 'optimo':
+        # Prioridad de 1 (primer destino del orden) a casi 0 (último)
+        prioridad = 1 - np.arange(len(destino)) / len(destino)
+        asignacion = asignar_costo_minimo(
+            codigos_sku[origen], codigos_tienda[origen], excedente[origen],
+            codigos_sku[destino], codigos_tienda[destino], necesidad[destino],
+            km, peso[destino], prioridad, limite_segundos,
+        )
+        modo_aplicado = 'optimo' if asignacion is not None else 'voraz (respaldo)'
+    if asignacion is None:
+        asignacion = asignar_voraz(
+            codigos_sku[origen], codigos_tienda[origen], excedente[origen],
+            codigos_sku[destino], codigos_tienda[destino], necesidad[destino],
+        )
+    filas_d, filas_o, unidades = asignacion
+    filas_d, filas_o = destino[filas_d], origen[filas_o]
+    if not len(unidades):
+        return pd.DataFrame()
+
+    df_resultado = pd.DataFrame({
+        'SKU': _columna(df, 'SKU', filas_d),
+        'Descripcion': _columna(df, 'Descripcion', filas_d, 'N/A'),
+        'Marca_Nombre': _columna(df, 'Marca_Nombre', filas_o, 'N/A'),
+        'Proveedor': _columna(df, 'Proveedor', filas_o, 'N/A'),
+        'Segmento_ABC': _columna(df, 'Segmento_ABC', filas_d, 'N/A'),
+        'Tienda Origen': _columna(df, 'Almacen_Nombre', filas_o),
+        'Stock en Origen': _columna(df, 'Stock', filas_o),
+        'Tienda Destino': _columna(df, 'Almacen_Nombre', filas_d),
+        'Stock en Destino': _columna(df, 'Stock', filas_d),
+        'Necesidad en Destino': _columna(df, columna_necesidad, filas_d),
+        'Cobertura Proyectada Destino (días)': _columna(df, 'Cobertura_Dias_Proyectada', filas_d),
+        'Uds a Enviar': unidades.astype(np.float64),
+        'Peso Individual (kg)': _columna(df, 'Peso_Articulo', filas_d),
+        'Costo_Promedio_UND': _columna(df, 'Costo_Promedio_UND', filas_d),
+    })
+    for columna in ('Peso Individual (kg)', 'Costo_Promedio_UND'):
+        df_resultado[columna] = pd.to_numeric(df_resultado[columna], errors='coerce').fillna(0)
+    df_resultado['Peso Total (kg)'] = df_resultado['Uds a Enviar'] * df_resultado['Peso Individual (kg)']
+    df_resultado['Valor del Traslado'] = df_resultado['Uds a Enviar'] * df_resultado['Costo_Promedio_UND']
+    df_resultado = df_resultado.sort_values(by=['Valor del Traslado'], ascending=False, kind='stable')
+    costo_unitario = km[codigos_tienda[filas_o], codigos_tienda[filas_d]] * (TARIFA_KM_UNIDAD + TARIFA_KM_KG * peso[filas_d].clip(min=0))
+    df_resultado.attrs['modo_plan'] = modo_aplicado
+    df_resultado.attrs['costo_flete'] = float((costo_unitario * unidades).sum())
+    return df_resultado
@@ -0,0 +1,113 @@
+# inventario/vistas.py
+"""Cuadro maestro de solo lectura y subconjuntos por posiciones, sin copias hasta que una página los modifica."""
+import numpy as np
+import pandas as pd
+
+from inventario.indice import interseccion
+
+# Claves de st.session_state: un único cuadro maestro, las filas visibles para el rol de la sesión,
+# el índice de filas (IndiceFilas) del maestro y los tokens de versión de ambos para las cachés
+CLAVE_MAESTRO = 'df_analisis_maestro'
+CLAVE_FILAS = 'filas_analisis'
+CLAVE_INDICE = 'indice_analisis'
+CLAVE_VERSION = 'version_analisis'
+CLAVE_VERSION_FILAS = 'version_filas_analisis'
+# Últimas órdenes leídas (DataFrame, versión) y modo del plan de traslados: el estado de abastecimiento
+# compartido (utils.estado_abastecimiento) se calcula con ellos en todas las páginas
+CLAVE_ORDENES = 'ordenes_sesion'
+CLAVE_MODO_TRASLADOS = 'modo_traslados'
+# Marca de "Forzar Recarga de Datos" (Gestión de Abastecimiento): la página principal vuelve a descargar
+# los archivos base en su próxima ejecución
+CLAVE_RECARGAR_DATOS = 'recargar_datos_iniciales'
+
+
+def activar_copia_al_escribir():
+    """Activa Copy-on-Write en pandas 2.x (en pandas 3 ya es el comportamiento fijo).
+
+    Con Copy-on-Write, las selecciones de columnas, reset_index y copy(deep=False) comparten memoria
+    con el maestro y una página solo copia la columna que modifica; el maestro nunca cambia.
+    """
+    if int(pd.__version__.split('.')[0]) < 3:
+        pd.set_option('mode.copy_on_write', True)
+
+
+def filas_donde(df, **criterios):
+    """Posiciones de las filas donde cada columna es igual al valor dado (o está en la lista de valores)."""
+    mascara = np.ones(len(df), dtype=bool)
+    for columna, valor in criterios.items():
+        serie = df[columna]
+        if isinstance(valor, (list, tuple, set)):
+            mascara &= serie.isin(list(valor)).to_numpy(dtype=bool, na_value=False)
+        else:
+            mascara &= (serie == valor).to_numpy(dtype=bool, na_value=False)
+    return np.flatnonzero(mascara)
+
+
+def vista_filas(df, filas=None):
+    """Filas `filas` (posiciones) de `df`; con None devuelve el mismo objeto, sin copia."""
+    if filas is None:
+        return df
+    return df.take(filas)
+
+
+def vista_filtrada(df, indice=None, base=None, **criterios):
+    """Filas de `df` que cumplen los criterios (columna=valor o lista), dentro de las posiciones `base`.
+
+    Con un IndiceFilas de `df` que cubra las columnas, el filtro es una intersección de posiciones;
+    si no, se recorre cada columna con una máscara.
+    """
+    if indice is not None and indice.cubre(criterios):
+        return vista_filas(df, indice.filtrar(base, **criterios))
+    if not criterios:
+        return vista_filas(df, base)
+    filas = filas_donde(df, **criterios)
+    return vista_filas(df, filas if base is None else interseccion(np.asarray(base), filas))
+
+
+def guardar_analisis_sesion(estado, df_maestro, filas=None, indice=None, version=None, clave_filas=None):
+    """Guarda el maestro (sin copiar), las posiciones visibles y su índice en `estado` (session_state).
+
+    `version` identifica el maestro (versión de los datos y parámetros) y `clave_filas` describe la
+    selección de `filas` (p. ej. 'Almacen_Nombre=Opalo'); con ellos las cachés no hashean DataFrames.
+    """
+    estado[CLAVE_MAESTRO] = df_maestro
+    estado[CLAVE_FILAS] = filas
+    estado[CLAVE_INDICE] = indice
+    estado[CLAVE_VERSION] = version
+    estado[CLAVE_VERSION_FILAS] = version if filas is None else f"{version}|{clave_filas}"
+
+
+def version_sesion(estado, solo_visibles=True):
+    """Token de versión del análisis de la sesión (de las filas visibles o, con solo_visibles=False, del maestro)."""
+    return estado.get(CLAVE_VERSION_FILAS if solo_visibles else CLAVE_VERSION)
+
+
+def analisis_sesion(estado, solo_visibles=True):
+    """Análisis de la sesión: las filas visibles para su rol o, con solo_visibles=False, el maestro completo.
+
+    El resultado es de solo lectura para el maestro: con Copy-on-Write, modificarlo no altera
+    el cuadro guardado. Sin análisis cargado devuelve un DataFrame vacío.
+    """
+    df_maestro = estado.get(CLAVE_MAESTRO)
+    if df_maestro is None:
+        return pd.DataFrame()
+    return vista_filas(df_maestro, estado.get(CLAVE_FILAS) if solo_visibles else None)
+
+
+def filtrar_sesion(estado, solo_visibles=True, **criterios):
+    """Filas del análisis de la sesión que cumplen los criterios, resueltas con el índice de la sesión."""
+    df_maestro = estado.get(CLAVE_MAESTRO)
+    if df_maestro is None:
+        return pd.DataFrame()
+    base = estado.get(CLAVE_FILAS) if solo_visibles else None
+    return vista_filtrada(df_maestro, estado.get(CLAVE_INDICE), base, **criterios)
+
+
+def guardar_ordenes_sesion(estado, df_ordenes, version):
+    """Guarda en `estado` las últimas órdenes leídas y su token de versión."""
+    estado[CLAVE_ORDENES] = (df_ordenes, version)
+
+
+def ordenes_sesion(estado):
+    """(órdenes, versión) guardadas en la sesión; sin órdenes, un DataFrame vacío y la versión 'vacio'."""
+    return estado.get(CLAVE_ORDENES) or (pd.DataFrame(), 'vacio')
@@ -18,7 +18,14 @@ from google.oauth2.service_account import Credentials
 import logging
 import os
 import time
-import unicodedata
+from inventario.espejo import descartar_espejo
+from inventario.ordenes import (
+    HOJA_REGISTRO_ORDENES, TTL_ORDENES, construir_mapa_tiendas_canonicas, leer_hoja_ordenes,
+    normalizar_sku_clave, preparar_ordenes_abiertas_para_calculo, version_ordenes,
+)
+from inventario.traslados import MODOS_PLAN
+from inventario.vistas import CLAVE_MODO_TRASLADOS, CLAVE_RECARGAR_DATOS, guardar_ordenes_sesion, vista_filtrada
+from utils import estado_abastecimiento_sesion
 
 # --- IMPORTACIÓN DE UTILS (Manejo de errores si falta el archivo) ---
 try:
@@ -229,7 +236,8 @@ def construir_firma_dataframe(df, columnas_clave):
     if not columnas_presentes:
         return f'rows:{len(df)}'
 
-    df_firma = df[columnas_presentes].copy().fillna('')
+    # object: las categóricas del análisis no aceptan '' como valor nuevo
+    df_firma = df[columnas_presentes].astype(object).fillna('')
     if {'SKU', 'Almacen_Nombre'}.issubset(df_firma.columns):
         df_firma = df_firma.sort_values(by=['SKU', 'Almacen_Nombre']).reset_index(drop=True)
     else:
@@ -369,24 +377,19 @@ def connect_to_gsheets():
 
 @st.cache_data(ttl=60)
 def load_data_from_sheets(_client, sheet_name):
-    """Carga datos de una hoja específica de Google Sheets en un DataFrame de Pandas."""
-    if _client is None: return pd.DataFrame()
+    """Carga una hoja de Google Sheets: (DataFrame, token de versión para las cachés que dependen de ella)."""
+    if _client is None: return pd.DataFrame(), version_ordenes(None)
     try:
-        spreadsheet = _client.open_by_key(st.secrets["gsheets"]["spreadsheet_key"])
-        worksheet = spreadsheet.worksheet(sheet_name)
-        df = pd.DataFrame(worksheet.get_all_records())
-        if not df.empty and 'SKU' in df.columns:
-            df['SKU'] = df['SKU'].astype(str)
-        if 'ID_Orden' in df.columns and not df.empty:
-            df['ID_Grupo'] = df['ID_Orden'].astype(str).apply(lambda x: '-'.join(x.split('-')[:-1]))
-        logging.info(f"Hoja '{sheet_name}' cargada correctamente with {len(df)} filas.")
-        return df
+        df = leer_hoja_ordenes(_client, st.secrets["gsheets"]["spreadsheet_key"], sheet_name)
+        lectura = df.attrs.get('lectura', {})
+        logging.info(f"Hoja '{sheet_name}' cargada correctamente with {len(df)} filas ({lectura.get('filas_descargadas', len(df))} descargadas).")
+        return df, version_ordenes(df)
     except gspread.exceptions.WorksheetNotFound:
         st.error(f"Error: La hoja de cálculo '{sheet_name}' no fue encontrada. Por favor, créala en tu Google Sheets.")
-        return pd.DataFrame()
+        return pd.DataFrame(), version_ordenes(None)
     except Exception as e:
         st.error(f"Ocurrió un error al cargar la hoja '{sheet_name}': {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), version_ordenes(None)
 
 def update_sheet(client, sheet_name, df_to_write):
     """Actualiza una hoja completa en Google Sheets, borrando el contenido anterior."""
@@ -396,6 +399,9 @@ def update_sheet(client, sheet_name, df_to_write):
         worksheet.clear()
         df_str = df_to_write.astype(str).replace(np.nan, '')
         worksheet.update([df_str.columns.values.tolist()] + df_str.values.tolist())
+        if sheet_name == HOJA_REGISTRO_ORDENES:
+            # Hoja reescrita completa: la próxima lectura no compara contra el espejo local
+            descartar_espejo(st.secrets["gsheets"]["spreadsheet_key"], sheet_name)
         logging.info(f"Hoja '{sheet_name}' actualizada con {len(df_to_write)} filas.")
         return True, f"Hoja '{sheet_name}' actualizada exitosamente."
     except Exception as e:
@@ -478,7 +484,11 @@ def registrar_ordenes_en_sheets(client, df_orden, tipo_orden, proveedor_nombre=N
     ]
     df_final_para_gsheets = df_registro.reindex(columns=columnas_finales).fillna('')
 
-    return append_to_sheet(client, "Registro_Ordenes", df_final_para_gsheets)
+    resultado = append_to_sheet(client, "Registro_Ordenes", df_final_para_gsheets)
+    if resultado[0]:
+        # Releer el registro en la próxima ejecución: el plan compartido replanifica solo los SKU de estas líneas
+        load_data_from_sheets.clear()
+    return resultado
 
 # --- 2. FUNCIONES AUXILIARES Y DE UI ---
 def enviar_correo_con_adjuntos(destinatarios, asunto, cuerpo_html, lista_de_adjuntos):
@@ -537,133 +547,6 @@ def whatsapp_button(label, url, key):
         </div>
     </a>""", unsafe_allow_html=True)
 
-def normalizar_texto_clave(valor):
-    if pd.isna(valor):
-        return ""
-    texto = str(valor).strip()
-    if not texto or texto.lower() == 'nan':
-        return ""
-    texto = unicodedata.normalize('NFKD', texto)
-    texto = ''.join(char for char in texto if not unicodedata.combining(char))
-    return texto.lower().strip()
-
-def normalizar_sku_clave(valor):
-    texto = normalizar_texto_clave(valor)
-    if texto.endswith('.0'):
-        texto = texto[:-2]
-    return texto
-
-def normalizar_estado_orden(valor):
-    estado = normalizar_texto_clave(valor)
-    equivalencias = {
-        'pendiente': 'Pendiente',
-        'pendientes': 'Pendiente',
-        'en transito': 'En Tránsito',
-        'entransito': 'En Tránsito',
-        'transito': 'En Tránsito',
-        'recibido': 'Recibido',
-        'recibida': 'Recibido',
-        'cancelado': 'Cancelado',
-        'cancelada': 'Cancelado'
-    }
-    return equivalencias.get(estado, str(valor).strip() if pd.notna(valor) else '')
-
-def construir_mapa_tiendas_canonicas(df_base):
-    tiendas = []
-    if df_base is not None and not df_base.empty and 'Almacen_Nombre' in df_base.columns:
-        tiendas = sorted({str(tienda).strip() for tienda in df_base['Almacen_Nombre'].dropna() if str(tienda).strip()})
-    return {normalizar_texto_clave(tienda): tienda for tienda in tiendas}
-
-def normalizar_tienda_canonica(valor, mapa_tiendas):
-    clave = normalizar_texto_clave(valor)
-    if not clave:
-        return ""
-    return mapa_tiendas.get(clave, str(valor).strip())
-
-def preparar_ordenes_abiertas_para_calculo(df_ordenes, mapa_tiendas):
-    columnas_requeridas = {'SKU', 'Tienda_Destino', 'Cantidad_Solicitada', 'Estado'}
-    if df_ordenes is None or df_ordenes.empty or not columnas_requeridas.issubset(set(df_ordenes.columns)):
-        return pd.DataFrame(columns=['SKU', 'Tienda_Destino', 'Cantidad_Solicitada', 'Estado', 'Es_Traslado', 'Tienda_Origen'])
-
-    df_abiertas = df_ordenes.copy()
-    df_abiertas['SKU'] = df_abiertas['SKU'].apply(normalizar_sku_clave)
-    df_abiertas['Estado'] = df_abiertas['Estado'].apply(normalizar_estado_orden)
-    df_abiertas = df_abiertas[df_abiertas['Estado'].isin(['Pendiente', 'En Tránsito'])].copy()
-    if df_abiertas.empty:
-        return pd.DataFrame(columns=['SKU', 'Tienda_Destino', 'Cantidad_Solicitada', 'Estado', 'Es_Traslado', 'Tienda_Origen'])
-
-    df_abiertas['Cantidad_Solicitada'] = pd.to_numeric(df_abiertas['Cantidad_Solicitada'], errors='coerce').fillna(0)
-    df_abiertas = df_abiertas[df_abiertas['Cantidad_Solicitada'] > 0].copy()
-    if df_abiertas.empty:
-        return pd.DataFrame(columns=['SKU', 'Tienda_Destino', 'Cantidad_Solicitada', 'Estado', 'Es_Traslado', 'Tienda_Origen'])
-
-    df_abiertas['Tienda_Destino'] = df_abiertas['Tienda_Destino'].apply(lambda valor: normalizar_tienda_canonica(valor, mapa_tiendas))
-    proveedor_normalizado = df_abiertas.get('Proveedor', pd.Series('', index=df_abiertas.index)).astype(str)
-    df_abiertas['Es_Traslado'] = proveedor_normalizado.str.upper().str.startswith('TRASLADO INTERNO:')
-    df_abiertas['Tienda_Origen'] = proveedor_normalizado.str.extract(r'TRASLADO INTERNO:\s*(.*)', expand=False).fillna('')
-    df_abiertas['Tienda_Origen'] = df_abiertas['Tienda_Origen'].apply(lambda valor: normalizar_tienda_canonica(valor, mapa_tiendas))
-    df_abiertas = df_abiertas[(df_abiertas['SKU'] != '') & (df_abiertas['Tienda_Destino'] != '')].copy()
-    return df_abiertas
-
-@st.cache_data
-def generar_plan_traslados_inteligente(_df_analisis):
-    """Algoritmo para generar un plan de traslados óptimo basado en excedentes y necesidades."""
-    if _df_analisis is None or _df_analisis.empty: return pd.DataFrame()
-
-    df_origen = _df_analisis[_df_analisis['Excedente_Trasladable'] > 0].sort_values(by='Excedente_Trasladable', ascending=False).copy()
-    sort_destino_cols = ['Necesidad_Ajustada_Por_Transito']
-    ascending_destino = [False]
-    if 'Cobertura_Dias_Proyectada' in _df_analisis.columns:
-        sort_destino_cols = ['Cobertura_Dias_Proyectada', 'Necesidad_Ajustada_Por_Transito']
-        ascending_destino = [True, False]
-    df_destino = _df_analisis[_df_analisis['Necesidad_Ajustada_Por_Transito'] > 0].sort_values(by=sort_destino_cols, ascending=ascending_destino).copy()
-
-    if df_origen.empty or df_destino.empty: return pd.DataFrame()
-
-    plan_final = []
-    excedentes_mutables = df_origen.set_index(['SKU', 'Almacen_Nombre'])['Excedente_Trasladable'].to_dict()
-
-    for _, necesidad_row in df_destino.iterrows():
-        sku, tienda_necesitada, necesidad_actual = necesidad_row['SKU'], necesidad_row['Almacen_Nombre'], necesidad_row['Necesidad_Ajustada_Por_Transito']
-        if necesidad_actual <= 0: continue
-
-        posibles_origenes = df_origen[(df_origen['SKU'] == sku) & (df_origen['Almacen_Nombre'] != tienda_necesitada)]
-
-        for _, origen_row in posibles_origenes.iterrows():
-            tienda_origen = origen_row['Almacen_Nombre']
-            excedente_disponible = excedentes_mutables.get((sku, tienda_origen), 0)
-
-            if excedente_disponible > 0 and necesidad_actual > 0:
-                unidades_a_enviar = np.floor(min(necesidad_actual, excedente_disponible))
-                if unidades_a_enviar < 1: continue
-
-                plan_final.append({
-                    'SKU': sku, 'Descripcion': necesidad_row['Descripcion'], 'Marca_Nombre': origen_row['Marca_Nombre'],
-                    'Proveedor': origen_row['Proveedor'], 'Segmento_ABC': necesidad_row['Segmento_ABC'],
-                    'Tienda Origen': tienda_origen, 'Stock en Origen': origen_row['Stock'],
-                    'Tienda Destino': tienda_necesitada, 'Stock en Destino': necesidad_row['Stock'],
-                    'Necesidad en Destino': necesidad_row['Necesidad_Ajustada_Por_Transito'],
-                    'Cobertura Proyectada Destino (días)': necesidad_row.get('Cobertura_Dias_Proyectada', 0),
-                    'Uds a Enviar': unidades_a_enviar,
-                    'Peso Individual (kg)': necesidad_row.get('Peso_Articulo', 0),
-                    'Costo_Promedio_UND': necesidad_row['Costo_Promedio_UND']
-                })
-
-                necesidad_actual -= unidades_a_enviar
-                excedentes_mutables[(sku, tienda_origen)] -= unidades_a_enviar
-
-    if not plan_final: return pd.DataFrame()
-
-    df_resultado = pd.DataFrame(plan_final)
-    df_resultado['Peso Individual (kg)'] = pd.to_numeric(df_resultado['Peso Individual (kg)'], errors='coerce').fillna(0)
-    df_resultado['Uds a Enviar'] = pd.to_numeric(df_resultado['Uds a Enviar'], errors='coerce').fillna(0)
-    df_resultado['Costo_Promedio_UND'] = pd.to_numeric(df_resultado['Costo_Promedio_UND'], errors='coerce').fillna(0)
-    
-    df_resultado['Peso Total (kg)'] = df_resultado['Uds a Enviar'] * df_resultado['Peso Individual (kg)']
-    df_resultado['Valor del Traslado'] = df_resultado['Uds a Enviar'] * df_resultado['Costo_Promedio_UND']
-
-    return df_resultado.sort_values(by=['Valor del Traslado'], ascending=False)
-
 class PDF(FPDF):
     """Clase personalizada para generar PDFs de Órdenes de Compra con cabecera y pie de página."""
     def __init__(self, *args, **kwargs):
@@ -907,114 +790,21 @@ if 'df_analisis_maestro' not in st.session_state or st.session_state.df_analisis
     st.warning("⚠️ Por favor, inicia sesión en la página principal para cargar los datos base de inventario.")
     st.stop()
 
-df_maestro_base = st.session_state.df_analisis_maestro.copy()
 client = connect_to_gsheets()
-df_ordenes_historico = load_data_from_sheets(client, "Registro_Ordenes")
-
-@st.cache_data
-def calcular_estado_inventario_completo(df_base, df_ordenes):
-    """Función central que calcula el estado completo del inventario."""
-    df_maestro = df_base.copy()
-    mapa_tiendas = construir_mapa_tiendas_canonicas(df_maestro)
-
-    if 'SKU' in df_maestro.columns:
-        df_maestro['SKU'] = df_maestro['SKU'].apply(normalizar_sku_clave)
-    if 'Almacen_Nombre' in df_maestro.columns:
-        df_maestro['Almacen_Nombre'] = df_maestro['Almacen_Nombre'].apply(lambda valor: normalizar_tienda_canonica(valor, mapa_tiendas))
-
-    df_ordenes_abiertas = preparar_ordenes_abiertas_para_calculo(df_ordenes, mapa_tiendas)
-    df_maestro['Stock_En_Transito'] = 0
-    df_maestro['Stock_Saliente_Reservado'] = 0
-
-    if not df_ordenes_abiertas.empty:
-        entradas_abiertas = df_ordenes_abiertas.groupby(['SKU', 'Tienda_Destino'])['Cantidad_Solicitada'].sum().reset_index()
-        entradas_abiertas.rename(columns={'Cantidad_Solicitada': 'Stock_En_Transito', 'Tienda_Destino': 'Almacen_Nombre'}, inplace=True)
-        df_maestro = pd.merge(df_maestro, entradas_abiertas, on=['SKU', 'Almacen_Nombre'], how='left', suffixes=('', '_Entrada'))
-        if 'Stock_En_Transito_Entrada' in df_maestro.columns:
-            df_maestro['Stock_En_Transito'] = df_maestro['Stock_En_Transito'].add(df_maestro['Stock_En_Transito_Entrada'].fillna(0))
-            df_maestro.drop(columns=['Stock_En_Transito_Entrada'], inplace=True)
-
-        salidas_abiertas = df_ordenes_abiertas[df_ordenes_abiertas['Es_Traslado'] & (df_ordenes_abiertas['Tienda_Origen'] != '')].copy()
-        if not salidas_abiertas.empty:
-            salidas_abiertas = salidas_abiertas.groupby(['SKU', 'Tienda_Origen'])['Cantidad_Solicitada'].sum().reset_index()
-            salidas_abiertas.rename(columns={'Cantidad_Solicitada': 'Stock_Saliente_Reservado', 'Tienda_Origen': 'Almacen_Nombre'}, inplace=True)
-            df_maestro = pd.merge(df_maestro, salidas_abiertas, on=['SKU', 'Almacen_Nombre'], how='left', suffixes=('', '_Salida'))
-            if 'Stock_Saliente_Reservado_Salida' in df_maestro.columns:
-                df_maestro['Stock_Saliente_Reservado'] = df_maestro['Stock_Saliente_Reservado'].add(df_maestro['Stock_Saliente_Reservado_Salida'].fillna(0))
-                df_maestro.drop(columns=['Stock_Saliente_Reservado_Salida'], inplace=True)
-
-    numeric_cols = ['Stock', 'Costo_Promedio_UND', 'Necesidad_Total', 'Excedente_Trasladable', 'Precio_Venta_Estimado', 'Demanda_Diaria_Promedio', 'Peso_Articulo', 'Stock_Objetivo', 'Punto_Reorden', 'Stock_En_Transito', 'Stock_Saliente_Reservado', 'Lead_Time_Proveedor']
-    for col in numeric_cols:
-        if col in df_maestro.columns:
-            df_maestro[col] = pd.to_numeric(df_maestro[col], errors='coerce').fillna(0)
-        else: 
-            df_maestro[col] = 0
-
-    df_maestro['Stock_Disponible_Actual'] = (df_maestro['Stock'] - df_maestro['Stock_Saliente_Reservado']).clip(lower=0)
-    df_maestro['Objetivo_Abastecimiento'] = np.maximum(
-        df_maestro.get('Stock_Objetivo', 0),
-        df_maestro.get('Punto_Reorden', 0)
-    )
-    # Para productos sin demanda, el objetivo es 0 (no necesitan stock aquí, que se traslade)
-    # Para productos con demanda cuyo objetivo base sea 0, usar fallback conservador
-    objetivo_fallback = np.where(
-        df_maestro['Demanda_Diaria_Promedio'] > 0,
-        (df_maestro['Stock'] + df_maestro['Necesidad_Total']).clip(lower=1),
-        0  # Sin demanda → objetivo 0 → todo su stock es excedente trasladable
-    )
-    df_maestro['Objetivo_Abastecimiento'] = np.where(
-        df_maestro['Objetivo_Abastecimiento'] > 0,
-        df_maestro['Objetivo_Abastecimiento'],
-        objetivo_fallback
-    )
-    df_maestro['Stock_Disponible_Proyectado'] = df_maestro['Stock_Disponible_Actual'] + df_maestro['Stock_En_Transito']
-    df_maestro['Necesidad_Ajustada_Por_Transito'] = (
-        df_maestro['Objetivo_Abastecimiento']
-        - df_maestro['Stock_Disponible_Proyectado']
-        + df_maestro['Demanda_Diaria_Promedio'] * df_maestro['Lead_Time_Proveedor']
-    ).clip(lower=0)
-    # Excedente_Trasladable recalculado con órdenes abiertas:
-    # - Con demanda: solo lo que sobra por encima del objetivo
-    # - Sin demanda (Baja Rotación): todo el stock disponible es trasladable
-    excedente_por_stock = (df_maestro['Stock_Disponible_Actual'] - df_maestro['Objetivo_Abastecimiento']).clip(lower=0)
-    df_maestro['Excedente_Trasladable'] = np.where(
-        df_maestro['Demanda_Diaria_Promedio'] <= 0,
-        df_maestro['Stock_Disponible_Actual'].clip(lower=0),
-        excedente_por_stock
-    )
-    df_maestro['Cobertura_Dias_Proyectada'] = np.where(
-        df_maestro['Demanda_Diaria_Promedio'] > 0,
-        df_maestro['Stock_Disponible_Proyectado'] / df_maestro['Demanda_Diaria_Promedio'],
-        9999
-    )
-    df_plan_maestro = generar_plan_traslados_inteligente(df_maestro)
-
-    if not df_plan_maestro.empty:
-        unidades_cubiertas_por_traslado = df_plan_maestro.groupby(['SKU', 'Tienda Destino'])['Uds a Enviar'].sum().reset_index()
-        unidades_cubiertas_por_traslado.rename(columns={'Tienda Destino': 'Almacen_Nombre', 'Uds a Enviar': 'Cubierto_Por_Traslado'}, inplace=True)
-        df_maestro = pd.merge(df_maestro, unidades_cubiertas_por_traslado, on=['SKU', 'Almacen_Nombre'], how='left')
-        df_maestro['Cubierto_Por_Traslado'].fillna(0, inplace=True)
-    else:
-        df_maestro['Cubierto_Por_Traslado'] = 0
-
-    sugerencia_compra = (df_maestro['Necesidad_Ajustada_Por_Transito'] - df_maestro['Cubierto_Por_Traslado']).clip(lower=0)
-    df_maestro['Sugerencia_Compra'] = convertir_serie_a_entero_seguro(sugerencia_compra)
-    df_maestro['Prioridad_Abastecimiento'] = np.select(
-        [
-            (df_maestro['Necesidad_Ajustada_Por_Transito'] > 0) & (df_maestro['Cobertura_Dias_Proyectada'] <= 7),
-            (df_maestro['Necesidad_Ajustada_Por_Transito'] > 0) & (df_maestro['Cobertura_Dias_Proyectada'] <= 15),
-            df_maestro['Necesidad_Ajustada_Por_Transito'] > 0
-        ],
-        ['Crítica', 'Alta', 'Media'],
-        default='Estable'
-    )
-
-    if 'Precio_Venta_Estimado' not in df_maestro.columns or df_maestro['Precio_Venta_Estimado'].sum() == 0:
-        df_maestro['Precio_Venta_Estimado'] = df_maestro['Costo_Promedio_UND'] * 1.30
-
-    return df_maestro, df_plan_maestro
-
-df_maestro, df_plan_maestro = calcular_estado_inventario_completo(df_maestro_base, df_ordenes_historico)
+# Las órdenes precargadas en paralelo al iniciar sesión se usan solo mientras sigan vigentes
+ordenes_precargadas = st.session_state.pop('ordenes_precargadas', None)
+if ordenes_precargadas is not None and time.time() - ordenes_precargadas[0] < TTL_ORDENES:
+    _, df_ordenes_historico, version_ordenes_historico = ordenes_precargadas
+else:
+    df_ordenes_historico, version_ordenes_historico = load_data_from_sheets(client, HOJA_REGISTRO_ORDENES)
+# Las demás páginas calculan el mismo plan con las últimas órdenes leídas aquí
+guardar_ordenes_sesion(st.session_state, df_ordenes_historico, version_ordenes_historico)
+
+# Estado y plan de traslados compartidos con las demás páginas (una vez por versión de datos y modo; los
+# cambios en las órdenes solo replanifican los SKU de las líneas que cambiaron).
+# El modo lo fija el selector de la barra lateral, que se dibuja después y lo guarda al cambiar.
+ETIQUETAS_MODO_TRASLADOS = {'voraz': 'Prioridad (rápido)', 'optimo': 'Menor costo de flete'}
+df_maestro, df_plan_maestro, indice_maestro = estado_abastecimiento_sesion(st.session_state)
 mapa_tiendas_debug = construir_mapa_tiendas_canonicas(df_maestro)
 df_ordenes_abiertas_debug = preparar_ordenes_abiertas_para_calculo(df_ordenes_historico, mapa_tiendas_debug)
 
@@ -1036,18 +826,19 @@ with st.sidebar:
     selected_almacen_nombre = st.selectbox("Selecciona la Vista de Tienda:", almacen_options, key="sb_almacen")
 
     if selected_almacen_nombre == opcion_consolidado:
-        df_vista = df_maestro.copy()
+        df_vista = df_maestro
     else:
-        df_vista = df_maestro[df_maestro['Almacen_Nombre'] == selected_almacen_nombre].copy()
+        df_vista = vista_filtrada(df_maestro, indice_maestro, Almacen_Nombre=selected_almacen_nombre)
 
     marcas_unicas = sorted(df_vista['Marca_Nombre'].unique().tolist())
     default_marcas = [m for m in marcas_unicas if m]
     selected_marcas = st.multiselect("Filtrar por Marca:", default_marcas, default=default_marcas)
 
     if selected_marcas:
-        df_filtered = df_vista[df_vista['Marca_Nombre'].isin(selected_marcas)].copy()
+        criterios_vista = {} if selected_almacen_nombre == opcion_consolidado else {'Almacen_Nombre': selected_almacen_nombre}
+        df_filtered = vista_filtrada(df_maestro, indice_maestro, Marca_Nombre=selected_marcas, **criterios_vista)
     else:
-        df_filtered = df_vista.copy()
+        df_filtered = df_vista
 
     total_skus_filtrados = df_filtered['SKU'].nunique() if 'SKU' in df_filtered.columns else 0
     total_registros_filtrados = len(df_filtered)
@@ -1080,6 +871,17 @@ with st.sidebar:
         unsafe_allow_html=True
     )
 
+    st.radio(
+        "Plan de traslados:", MODOS_PLAN, format_func=ETIQUETAS_MODO_TRASLADOS.get,
+        index=MODOS_PLAN.index(st.session_state.get(CLAVE_MODO_TRASLADOS, 'voraz')), key='selector_modo_traslados',
+        on_change=lambda: st.session_state.update({CLAVE_MODO_TRASLADOS: st.session_state['selector_modo_traslados']}),
+        help="Prioridad: reparte excedentes por urgencia. Menor costo de flete: optimiza distancias y peso entre tiendas."
+    )
+    if df_plan_maestro.attrs.get('modo_plan') == 'voraz (respaldo)':
+        st.warning("⏱️ El optimizador no terminó a tiempo; se muestra el plan por prioridad.")
+    elif 'costo_flete' in df_plan_maestro.attrs:
+        st.caption(f"Flete estimado del plan: ${df_plan_maestro.attrs['costo_flete']:,.0f}")
+
     st.markdown("---")
     st.header("Menú Principal")
     tab_titles = ["📊 Diagnóstico", "🔄 Traslados", "🛒 Compras", "✅ Seguimiento"]
@@ -1088,8 +890,11 @@ with st.sidebar:
     
     st.subheader("Sincronización de Datos")
     if st.button("🔄 Forzar Recarga de Datos"):
-        st.cache_data.clear()
-        st.cache_resource.clear()
+        # Solo las cachés de datos: el análisis, el estado de abastecimiento y los clientes (cache_resource)
+        # son de todas las sesiones y se recalculan solos cuando cambian las versiones de los datos
+        load_data_from_sheets.clear()
+        descartar_espejo(st.secrets["gsheets"]["spreadsheet_key"], HOJA_REGISTRO_ORDENES)
+        st.session_state[CLAVE_RECARGAR_DATOS] = True
         st.session_state.notificaciones_pendientes = [] # Limpiar notificaciones al recargar
         st.session_state.df_compras_editor = pd.DataFrame()
         st.session_state.df_traslados_editor = pd.DataFrame()
@@ -1110,7 +915,7 @@ with st.expander("🔎 Rastreo puntual de SKU", expanded=False):
     sku_rastreo_normalizado = normalizar_sku_clave(sku_rastreo)
 
     if sku_rastreo_normalizado:
-        df_sku = df_maestro[df_maestro['SKU'] == sku_rastreo_normalizado].copy()
+        df_sku = vista_filtrada(df_maestro, indice_maestro, SKU=sku_rastreo_normalizado)
 
         if df_sku.empty:
             st.warning(f"No se encontró el SKU {sku_rastreo_normalizado} en el análisis actual.")
@@ -1208,7 +1013,7 @@ if active_tab == tab_titles[0]:
             df_compras_prioridad = df_compra_diagnostico.copy()
             df_compras_prioridad['Valor_Compra'] = df_compras_prioridad['Valor_Compra_Base']
             if not df_compras_prioridad.empty:
-                top_categoria = df_compras_prioridad.groupby('Segmento_ABC')['Valor_Compra'].sum().idxmax()
+                top_categoria = df_compras_prioridad.groupby('Segmento_ABC', observed=True)['Valor_Compra'].sum().idxmax()
                 st.markdown(f"**🎯 Enfoque:** Tu principal necesidad de inversión se concentra en productos de **Clase '{top_categoria}'**.")
         if venta_perdida == 0 and oportunidad_ahorro == 0 and necesidad_compra_total == 0:
             st.success("✅ ¡Inventario Optimizado! No se detectan necesidades urgentes con los filtros actuales.")
@@ -1219,7 +1024,7 @@ if active_tab == tab_titles[0]:
     if not df_compras_chart.empty:
         df_compras_chart['Valor_Compra'] = df_compras_chart['Sugerencia_Compra'] * df_compras_chart['Costo_Promedio_UND']
         with col_g1:
-            data_chart = df_compras_chart.groupby('Almacen_Nombre')['Valor_Compra'].sum().sort_values(ascending=False).reset_index()
+            data_chart = df_compras_chart.groupby('Almacen_Nombre', observed=True)['Valor_Compra'].sum().sort_values(ascending=False).reset_index()
             fig = px.bar(data_chart, x='Almacen_Nombre', y='Valor_Compra', text_auto='.2s', title="Inversión Requerida por Tienda (Post-Traslados)")
             st.plotly_chart(fig, use_container_width=True)
         with col_g2:
@@ -1728,7 +1533,7 @@ if active_tab == tab_titles[2]:
                 st.subheader("🔬 Análisis de Stock Global para SKUs Seleccionados")
                 selected_skus = df_seleccionados['SKU'].unique()
                 
-                df_stock_global = df_maestro[df_maestro['SKU'].isin(selected_skus)].copy()
+                df_stock_global = vista_filtrada(df_maestro, indice_maestro, SKU=list(selected_skus))
                 
                 columnas_stock_global = ['SKU', 'Descripcion', 'Almacen_Nombre', 'Stock', 'Stock_Saliente_Reservado', 'Stock_En_Transito', 'Stock_Disponible_Proyectado', 'Estado_Inventario']
                 columnas_stock_global = [col for col in columnas_stock_global if col in df_stock_global.columns]
@@ -1769,7 +1574,7 @@ if active_tab == tab_titles[2]:
 
                 st.markdown("---")
                 st.subheader("Generar Órdenes de Compra por Proveedor/Tienda")
-                grouped = df_seleccionados.groupby(['Proveedor', 'Tienda'])
+                grouped = df_seleccionados.groupby(['Proveedor', 'Tienda'], observed=True)
 
                 for (proveedor, tienda), df_grupo in grouped:
                     with st.container(border=True):
@@ -1851,10 +1656,10 @@ if active_tab == tab_titles[2]:
             search_term_compra_esp = st.text_input("Buscar por SKU o Descripción:", key="search_compra_especial")
 
             if search_term_compra_esp:
-                df_maestro_tiendas = df_maestro[df_maestro['Almacen_Nombre'].isin(st.session_state.tiendas_compra_especial_seleccionadas)]
+                df_maestro_tiendas = vista_filtrada(df_maestro, indice_maestro, Almacen_Nombre=list(st.session_state.tiendas_compra_especial_seleccionadas))
                 
                 # Consolidar stock
-                df_consolidado = df_maestro_tiendas.groupby(['SKU', 'Descripcion', 'Proveedor', 'Costo_Promedio_UND', 'Peso_Articulo']).agg(
+                df_consolidado = df_maestro_tiendas.groupby(['SKU', 'Descripcion', 'Proveedor', 'Costo_Promedio_UND', 'Peso_Articulo'], observed=True).agg(
                     Stock=('Stock', 'sum'),
                     Stock_En_Transito=('Stock_En_Transito', 'sum'),
                     Tiendas_Consolidadas=('Almacen_Nombre', lambda x: ', '.join(x))
@@ -2145,8 +1950,8 @@ if active_tab == tab_titles[3]:
                                 
                                 if exito:
                                     st.success(f"✅ ¡Éxito! El estado del grupo de orden '{id_grupo_elegido}' ha sido cambiado a '{nuevo_estado}'. La página se recargará.")
+                                    # El estado de abastecimiento compartido se pone al día solo con las líneas cambiadas
                                     st.cache_data.clear()
-                                    st.cache_resource.clear()
                                     st.session_state.order_to_edit = None
                                     st.rerun()
                                 else:
@@ -6,6 +6,9 @@ from plotly.subplots import make_subplots
 import plotly.graph_objects as go
 import io
 from datetime import datetime
+from inventario.historial import dia_desde_epoca
+from inventario.vistas import analisis_sesion, version_sesion
+from utils import estado_abastecimiento_sesion
 
 # --- 0. CONFIGURACIÓN DE LA PÁGINA ---
 st.set_page_config(page_title="Ferreinox | Excedentes", layout="wide", page_icon="🔴")
@@ -23,8 +26,9 @@ st.markdown("Un tablero inteligente que te dice dónde está tu capital inmovili
 # --- 1. FUNCIONES AUXILIARES Y DE EXCEL ---
 
 @st.cache_data
-def generar_excel_analisis(df):
-    """Crea un archivo de Excel con el análisis completo y plan de acción."""
+def generar_excel_analisis(clave, _df):
+    """Crea un archivo de Excel con el análisis completo y plan de acción (caché por `clave`: versión y filtros)."""
+    df = _df
     output = io.BytesIO()
     with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
         # Preparar el dataframe para el reporte
@@ -57,29 +61,29 @@ def generar_excel_analisis(df):
     return output.getvalue()
 
 # --- 2. LÓGICA PRINCIPAL DE LA PÁGINA ---
-if 'df_analisis' in st.session_state and not st.session_state['df_analisis'].empty:
-    df_analisis_completo = st.session_state['df_analisis']
+df_analisis_completo = analisis_sesion(st.session_state)
+if not df_analisis_completo.empty:
 
     # --- ENRIQUECIMIENTO DE DATOS (CÁLCULOS CLAVE) ---
     # Calcular Días desde la última venta
     @st.cache_data
-    def calcular_antiguedad(df):
-        df_c = df.copy()
-        ultima_venta = df_c['Historial_Ventas'].str.extractall(r'(\d{4}-\d{2}-\d{2})').groupby(level=0)[0].max()
-        ultima_venta = pd.to_datetime(ultima_venta, errors='coerce')
-        df_c['Dias_Desde_Ultima_Venta'] = (datetime.now() - ultima_venta).dt.days.fillna(999) # Si no hay historial, es muy viejo
+    def calcular_antiguedad(version_analisis, dia, _df, _cubo_ventas):
+        df_c = _df.copy(deep=False)
+        # Las filas del cubo de ventas corresponden a la columna 'index' del análisis
+        ultimo_dia = _cubo_ventas.ultima_venta()[df_c['index'].to_numpy()]
+        df_c['Dias_Desde_Ultima_Venta'] = pd.Series(dia_desde_epoca(dia) - ultimo_dia, index=df_c.index).fillna(999) # Si no hay historial, es muy viejo
         return df_c
     
-    df_analisis_completo = calcular_antiguedad(df_analisis_completo)
-
-    # Calcular sugerencia de destino para traslados
-    df_necesidades = df_analisis_completo[df_analisis_completo['Necesidad_Total'] > 0]
-    if not df_necesidades.empty:
-        idx_max_necesidad = df_necesidades.groupby('SKU')['Necesidad_Total'].idxmax()
-        df_mejor_destino = df_necesidades.loc[idx_max_necesidad][['SKU', 'Almacen_Nombre']].rename(columns={'Almacen_Nombre': 'Tienda_Destino_Sugerida'})
-        df_analisis_completo = pd.merge(df_analisis_completo, df_mejor_destino, on='SKU', how='left')
-    else:
-        df_analisis_completo['Tienda_Destino_Sugerida'] = np.nan
+    # Caché por token de versión del análisis y día (sin hashear el DataFrame en cada interacción)
+    version_analisis = version_sesion(st.session_state)
+    dia_actual = pd.Timestamp(datetime.now()).normalize()
+    df_analisis_completo = calcular_antiguedad(version_analisis, dia_actual, df_analisis_completo, st.session_state['cubo_ventas'])
+
+    # Sugerencia de destino para traslados: la del plan compartido con Gestión de Abastecimiento
+    # (mismas órdenes abiertas y modo), alineada por etiqueta con las filas visibles
+    df_estado, _, _ = estado_abastecimiento_sesion(st.session_state)
+    destino_sugerido = df_estado['Tienda_Destino_Sugerida'].reindex(df_analisis_completo.index)
+    df_analisis_completo['Tienda_Destino_Sugerida'] = destino_sugerido.where(destino_sugerido != '')
 
     # --- FILTROS EN LA BARRA LATERAL ---
     opcion_consolidado = "-- Consolidado (Todas las Tiendas) --"
@@ -102,7 +106,7 @@ if 'df_analisis' in st.session_state and not st.session_state['df_analisis'].emp
 
     # Filtrar solo por productos críticos
     estados_filtrar = ['Excedente', 'Baja Rotación / Obsoleto']
-    df_excedentes = df_filtered[df_filtered['Estado_Inventario'].isin(estados_filtrar)].copy()
+    df_excedentes = df_filtered[df_filtered['Estado_Inventario'].isin(estados_filtrar)]
 
     # --- ASIGNAR ACCIÓN SUGERIDA ---
     def asignar_accion(row):
@@ -200,7 +204,7 @@ if 'df_analisis' in st.session_state and not st.session_state['df_analisis'].emp
             )
             
             # --- BOTÓN DE DESCARGA MEJORADO ---
-            excel_data = generar_excel_analisis(df_excedentes)
+            excel_data = generar_excel_analisis((version_analisis, dia_actual, selected_almacen_nombre, tuple(selected_marcas)), df_excedentes)
             st.download_button(
                 label="📥 Descargar Plan de Acción en Excel",
                 data=excel_data,
@@ -3,6 +3,7 @@ import pandas as pd
 import plotly.express as px
 import numpy as np
 import io
+from inventario.vistas import analisis_sesion, filtrar_sesion, version_sesion
 
 # --- 0. CONFIGURACIÓN DE LA PÁGINA ---
 st.set_page_config(page_title="Ferreinox | Marcas", layout="wide", page_icon="🔴")
@@ -19,8 +20,9 @@ st.markdown("Una herramienta poderosa para evaluar el rendimiento y tomar decisi
 
 # --- 1. FUNCIÓN PARA DESCARGAR EXCEL ---
 @st.cache_data
-def convert_df_to_excel(df):
-    """Convierte un DataFrame a un archivo Excel en memoria para descarga."""
+def convert_df_to_excel(clave, _df):
+    """Convierte un DataFrame a un archivo Excel en memoria para descarga (caché por `clave`: versión y filtros)."""
+    df = _df
     output = io.BytesIO()
     with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
         df.to_excel(writer, index=False, sheet_name='Analisis_Detallado')
@@ -30,11 +32,11 @@ def convert_df_to_excel(df):
     return output.getvalue()
 
 # --- 2. LÓGICA PRINCIPAL DE LA PÁGINA ---
-if 'df_analisis' not in st.session_state or st.session_state['df_analisis'].empty:
+df_analisis_completo = analisis_sesion(st.session_state)
+if df_analisis_completo.empty:
     st.error("Los datos no se han cargado. Por favor, ve a la página principal primero.")
     st.page_link("Tablero Rotacion.py", label="Ir a la Página Principal", icon="🏠")
 else:
-    df_analisis_completo = st.session_state['df_analisis']
     
     # --- FILTROS EN LA BARRA LATERAL ---
     st.sidebar.header("⚙️ Filtros de Análisis")
@@ -68,16 +70,16 @@ else:
 
     # --- Aplicación de Filtros ---
     # 1. Filtrar por Marca/Categoría seleccionada
-    df_item_filtrado = df_analisis_completo[df_analisis_completo[columna_filtro] == selected_item].copy()
+    df_item_filtrado = filtrar_sesion(st.session_state, **{columna_filtro: selected_item})
     
     # 2. Filtrar por tienda (si no es consolidado)
     if selected_almacen != opcion_consolidado:
-        df_vista = df_item_filtrado[df_item_filtrado['Almacen_Nombre'] == selected_almacen].copy()
+        df_vista = filtrar_sesion(st.session_state, **{columna_filtro: selected_item, 'Almacen_Nombre': selected_almacen})
     else:
-        df_vista = df_item_filtrado.copy()
+        df_vista = df_item_filtrado
 
     # 3. ENFOCARSE SOLO EN PRODUCTOS CON STOCK
-    df_con_stock = df_vista[df_vista['Stock'] > 0].copy()
+    df_con_stock = df_vista[df_vista['Stock'] > 0]
 
     if df_con_stock.empty:
         st.warning(f"No se encontró inventario activo para '{selected_item}' en '{selected_almacen}'.")
@@ -95,10 +97,9 @@ else:
             skus_activos = df_con_stock['SKU'].nunique()
             df_excedente_item = df_con_stock[df_con_stock['Estado_Inventario'].isin(['Excedente', 'Baja Rotación / Obsoleto'])]
             valor_excedente_item = df_excedente_item['Valor_Inventario'].sum()
-            skus_quiebre_item = df_analisis_completo[
-                (df_analisis_completo[columna_filtro] == selected_item) & 
-                (df_analisis_completo['Estado_Inventario'] == 'Quiebre de Stock')
-            ]['SKU'].nunique()
+            skus_quiebre_item = filtrar_sesion(
+                st.session_state, **{columna_filtro: selected_item, 'Estado_Inventario': 'Quiebre de Stock'}
+            )['SKU'].nunique()
 
             kpi_col1, kpi_col2, kpi_col3 = st.columns(3)
             kpi_col1.metric("💰 Valor Inventario Actual", f"${valor_inv_item:,.0f}")
@@ -117,6 +118,7 @@ else:
             with col_g1:
                 st.markdown("##### Distribución del Inventario por Estado")
                 estado_counts = df_con_stock['Estado_Inventario'].value_counts()
+                estado_counts = estado_counts[estado_counts > 0]
                 fig_donut = px.pie(
                     values=estado_counts.values, 
                     names=estado_counts.index, 
@@ -146,13 +148,13 @@ else:
             st.info("Analiza en qué tiendas la marca o categoría tiene mejor desempeño, mayor inversión o más problemas de quiebre.")
 
             # Agrupar datos a nivel de tienda para la marca/categoría seleccionada
-            df_tienda_summary = df_item_filtrado.groupby('Almacen_Nombre').agg(
+            df_tienda_summary = df_item_filtrado.groupby('Almacen_Nombre', observed=True).agg(
                 Valor_Inventario=('Valor_Inventario', 'sum'),
                 Unidades_Stock=('Stock', 'sum')
             ).reset_index()
 
             # Calcular quiebres por tienda para esta marca/categoría
-            quiebres_por_tienda = df_item_filtrado[df_item_filtrado['Estado_Inventario'] == 'Quiebre de Stock'].groupby('Almacen_Nombre')['SKU'].nunique().rename('SKUs_en_Quiebre')
+            quiebres_por_tienda = df_item_filtrado[df_item_filtrado['Estado_Inventario'] == 'Quiebre de Stock'].groupby('Almacen_Nombre', observed=True)['SKU'].nunique().rename('SKUs_en_Quiebre')
             df_tienda_summary = df_tienda_summary.merge(quiebres_por_tienda, on='Almacen_Nombre', how='left').fillna(0)
 
             st.dataframe(
@@ -189,7 +191,7 @@ else:
             st.dataframe(df_display, use_container_width=True, hide_index=True)
             
             # Botón de descarga
-            excel_data = convert_df_to_excel(df_display)
+            excel_data = convert_df_to_excel((version_sesion(st.session_state), columna_filtro, selected_item, selected_almacen), df_display)
             st.download_button(
                 label="📥 Descargar Detalle en Excel",
                 data=excel_data,
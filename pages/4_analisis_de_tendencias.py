@@ -2,8 +2,10 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
-from datetime import datetime, timedelta
+from datetime import datetime
 import io
+from inventario.historial import dia_desde_epoca, pendiente_por_fila
+from inventario.vistas import analisis_sesion, filtrar_sesion, version_sesion
 
 # --- 0. Configuración de la Página ---
 st.set_page_config(page_title="Ferreinox | Tendencias", layout="wide", page_icon="🔴")
@@ -21,8 +23,9 @@ st.markdown("De los datos a las decisiones. Identifica, clasifica y actúa sobre
 # --- 1. Funciones de Ayuda ---
 
 @st.cache_data
-def convert_df_to_excel(df):
-    """Convierte un DataFrame a un archivo Excel en memoria para descarga."""
+def convert_df_to_excel(clave, _df):
+    """Convierte un DataFrame a un archivo Excel en memoria para descarga (caché por `clave`: versión y filtros)."""
+    df = _df
     output = io.BytesIO()
     with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
         df.to_excel(writer, index=False, sheet_name='Analisis_Tendencias')
@@ -34,62 +37,20 @@ def convert_df_to_excel(df):
     processed_data = output.getvalue()
     return processed_data
 
-def parse_historial_ventas(historial_str):
-    """Parsea el string de historial de ventas y devuelve un DataFrame limpio y ordenado."""
-    if not isinstance(historial_str, str) or ':' not in historial_str:
-        return pd.DataFrame(columns=['Fecha', 'Unidades'])
-    
-    records = []
-    for venta in historial_str.split(','):
-        try:
-            fecha_str, cantidad_str = venta.split(':')
-            records.append({
-                'Fecha': datetime.strptime(fecha_str, '%Y-%m-%d'),
-                'Unidades': float(cantidad_str)
-            })
-        except (ValueError, IndexError):
-            continue
-    
-    if not records:
-        return pd.DataFrame(columns=['Fecha', 'Unidades'])
-        
-    df = pd.DataFrame(records)
-    return df.sort_values('Fecha').reset_index(drop=True)
-
-@st.cache_data
-def calcular_tendencia_y_volumen(historial_str):
-    """Calcula la pendiente (tendencia) y el volumen total de ventas en los últimos 90 días."""
-    df_ventas = parse_historial_ventas(historial_str)
-    if len(df_ventas) < 2:
-        return 0.0, 0.0
-
-    # Filtrar ventas de los últimos 90 días para el cálculo de volumen
-    fecha_limite = datetime.now() - timedelta(days=90)
-    ventas_recientes = df_ventas[df_ventas['Fecha'] >= fecha_limite]
-    volumen_90d = ventas_recientes['Unidades'].sum()
-
-    df_ventas['Dias'] = (df_ventas['Fecha'] - df_ventas['Fecha'].min()).dt.days
-    try:
-        pendiente, _ = np.polyfit(df_ventas['Dias'], df_ventas['Unidades'], 1)
-        return pendiente, volumen_90d
-    except Exception:
-        return 0.0, volumen_90d
-
-@st.cache_data
-def calcular_estacionalidad_reciente(historial_str):
-    """Compara ventas de últimos 30 días vs 30 días anteriores (31-60)."""
-    df_ventas = parse_historial_ventas(historial_str)
-    if df_ventas.empty:
-        return 0.0
-
-    hoy = datetime.now()
-    hace_30_dias = hoy - timedelta(days=30)
-    hace_60_dias = hoy - timedelta(days=60)
-
-    ventas_ultimos_30 = df_ventas[(df_ventas['Fecha'] > hace_30_dias) & (df_ventas['Fecha'] <= hoy)]['Unidades'].sum()
-    ventas_31_60 = df_ventas[(df_ventas['Fecha'] > hace_60_dias) & (df_ventas['Fecha'] <= hace_30_dias)]['Unidades'].sum()
-
-    return ventas_ultimos_30 - ventas_31_60
+def calcular_metricas_historial(df, cubo_ventas):
+    """Calcula tendencia (pendiente), volumen de 90 días y estacionalidad reciente (30d vs 31-60d) por fila."""
+    # Las filas del cubo de ventas corresponden a la columna 'index' del análisis
+    filas = df['index'].to_numpy()
+    hoy = dia_desde_epoca(datetime.now())
+
+    pendiente, registros = pendiente_por_fila(cubo_ventas.ventas, cubo_ventas.n_filas)
+    # Con menos de dos ventas registradas no hay tendencia y el volumen se reporta en cero
+    volumen_90d = np.where(registros >= 2, cubo_ventas.total_ventana(hasta=89, hoy=hoy), 0.0)
+    estacionalidad = (
+        cubo_ventas.total_ventana(hasta=29, desde=0, hoy=hoy)
+        - cubo_ventas.total_ventana(hasta=59, desde=30, hoy=hoy)
+    )
+    return pendiente[filas], volumen_90d[filas], estacionalidad[filas]
 
 def clasificar_producto(row):
     """Clasifica el producto en categorías estratégicas basadas en tendencia y volumen de ventas."""
@@ -120,11 +81,12 @@ def clasificar_producto(row):
 
 # --- 2. Lógica Principal de la Página ---
 
-if 'df_analisis' not in st.session_state or st.session_state['df_analisis'].empty:
+df_analisis_sesion = analisis_sesion(st.session_state)
+if df_analisis_sesion.empty:
     st.error("Los datos no se han cargado. Por favor, ve a la página principal primero.")
     st.page_link("Tablero Rotacion.py", label="Ir a la Página Principal", icon="🏠")
 else:
-    df_analisis_completo = st.session_state['df_analisis'].reset_index()
+    df_analisis_completo = df_analisis_sesion.reset_index()
 
     st.sidebar.header("Filtros de Vista")
     opcion_consolidado = "-- Consolidado (Todas las Tiendas) --"
@@ -134,28 +96,32 @@ else:
     lista_seleccion_nombres = [opcion_consolidado] + lista_nombres_unicos
     selected_almacen_nombre = st.sidebar.selectbox("Selecciona la Vista:", lista_seleccion_nombres, key="sb_tendencias")
     
+    criterios_vista = {}
     if selected_almacen_nombre == opcion_consolidado:
         df_vista = df_analisis_completo
     else:
         codigo_almacen_seleccionado = map_nombre_a_codigo.get(selected_almacen_nombre)
-        df_vista = df_analisis_completo[df_analisis_completo['Almacen'] == codigo_almacen_seleccionado] if codigo_almacen_seleccionado else pd.DataFrame()
+        criterios_vista['Almacen'] = codigo_almacen_seleccionado
+        df_vista = filtrar_sesion(st.session_state, **criterios_vista).reset_index() if codigo_almacen_seleccionado else pd.DataFrame()
 
     lista_marcas_unicas = sorted([str(m) for m in df_vista['Marca_Nombre'].unique() if pd.notna(m)])
     selected_marcas = st.sidebar.multiselect("Filtrar por Marca:", lista_marcas_unicas, default=lista_marcas_unicas, key="filtro_marca_tendencias")
     
-    df_filtered = df_vista[df_vista['Marca_Nombre'].isin(selected_marcas)].copy() if selected_marcas else pd.DataFrame()
+    df_filtered = filtrar_sesion(st.session_state, Marca_Nombre=selected_marcas, **criterios_vista).reset_index() if selected_marcas else pd.DataFrame()
 
     st.header(f"Análisis para: {selected_almacen_nombre}", divider='rainbow')
 
     if df_filtered.empty:
         st.warning("No hay datos para mostrar con los filtros seleccionados.")
     else:
+        # Clave de caché de las descargas: versión del análisis, día de las métricas y filtros de la vista
+        clave_vista = (version_sesion(st.session_state), datetime.now().date().isoformat(), selected_almacen_nombre, tuple(selected_marcas))
         with st.spinner("Realizando análisis estratégico de tendencias..."):
             # --- CÁLCULOS AVANZADOS ---
-            tendencias_volumenes = df_filtered['Historial_Ventas'].apply(calcular_tendencia_y_volumen)
-            df_filtered['Tendencia_Ventas'] = tendencias_volumenes.apply(lambda x: x[0])
-            df_filtered['Volumen_Ventas_90d'] = tendencias_volumenes.apply(lambda x: x[1])
-            df_filtered['Estacionalidad_Reciente'] = df_filtered['Historial_Ventas'].apply(calcular_estacionalidad_reciente)
+            tendencia, volumen_90d, estacionalidad = calcular_metricas_historial(df_filtered, st.session_state['cubo_ventas'])
+            df_filtered['Tendencia_Ventas'] = tendencia
+            df_filtered['Volumen_Ventas_90d'] = volumen_90d
+            df_filtered['Estacionalidad_Reciente'] = estacionalidad
             df_filtered['Impacto_Potencial'] = df_filtered['Tendencia_Ventas'] * df_filtered['Costo_Promedio_UND']
             
             # ✅ **CORRECCIÓN**: Crear columna para el tamaño del gráfico con valores absolutos (no negativos)
@@ -237,7 +203,7 @@ else:
                 )
                 st.download_button(
                     label="📥 Descargar Oportunidades en Excel",
-                    data=convert_df_to_excel(df_crecimiento),
+                    data=convert_df_to_excel(clave_vista + ('crecimiento',), df_crecimiento),
                     file_name=f"oportunidades_crecimiento_{selected_almacen_nombre.replace(' ', '_')}.xlsx",
                     mime="application/vnd.ms-excel"
                 )
@@ -267,7 +233,7 @@ else:
                 )
                 st.download_button(
                     label="📥 Descargar Riesgos en Excel",
-                    data=convert_df_to_excel(df_decremento),
+                    data=convert_df_to_excel(clave_vista + ('decremento',), df_decremento),
                     file_name=f"riesgos_decremento_{selected_almacen_nombre.replace(' ', '_')}.xlsx",
                     mime="application/vnd.ms-excel"
                 )
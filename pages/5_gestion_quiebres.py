@@ -2,7 +2,8 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import io
-import math
+from inventario.vistas import vista_filtrada
+from utils import estado_abastecimiento_sesion
 
 # --- Configuración de la Página ---
 st.set_page_config(page_title="Ferreinox | Quiebres", layout="wide", page_icon="🔴")
@@ -24,32 +25,25 @@ Prioriza traslados internos para ahorrar costos y utiliza una lógica de pedido
 
 # --- Funciones Auxiliares ---
 
-def determinar_uem_y_ajustar_cantidad(row):
+def determinar_uem_y_ajustar_cantidad(df):
     """
     Determina la Unidad de Empaque (UEM) basada en la descripción y ajusta la cantidad a solicitar.
     - Contiene '0.94' o hasta '3.0' en descripción -> UEM = 9
     - Contiene '3.7' en descripción -> UEM = 4
     - Contiene '9.4' o superior, o no aplica -> UEM = 1 (se pide la cantidad exacta)
+    Trabaja sobre todas las filas de `df` a la vez y devuelve las unidades a solicitar por fila.
     """
-    descripcion = row['Descripcion'].lower()
-    necesidad = row['Necesidad_Total']
-    uem = 1 # Unidad de empaque por defecto
-
-    # Lógica para determinar la UEM
-    if any(s in descripcion for s in ['0.94', ' 1.', ' 2.']): # Asumiendo formatos como "GALON 0.94L"
-        uem = 9
-    elif '3.7' in descripcion: # Asumiendo formatos como "GALON 3.7L"
-        uem = 4
+    descripcion = df['Descripcion'].astype(str).str.lower()
+    necesidad = df['Necesidad_Total'].astype('float64').to_numpy()
+
+    # Lógica para determinar la UEM (asumiendo formatos como "GALON 0.94L" o "GALON 3.7L")
+    es_uem_9 = np.logical_or.reduce([descripcion.str.contains(s, regex=False).to_numpy() for s in ['0.94', ' 1.', ' 2.']])
+    es_uem_4 = descripcion.str.contains('3.7', regex=False).to_numpy()
     # Para los demás casos, la UEM es 1 (se pide la cantidad exacta o ya viene en unidad)
+    uem = np.select([es_uem_9, es_uem_4], [9, 4], default=1)
 
-    if uem > 1:
-        # Si se necesita más que 0, calcular el siguiente múltiplo de la UEM
-        # math.ceil(necesidad / uem) calcula cuántos "paquetes" se necesitan
-        # Luego, se multiplica por la UEM para obtener la cantidad total de unidades
-        return math.ceil(necesidad / uem) * uem
-    else:
-        # Si la UEM es 1, simplemente se redondea hacia arriba la necesidad
-        return math.ceil(necesidad)
+    # np.ceil(necesidad / uem) calcula cuántos "paquetes" se necesitan; por la UEM da las unidades
+    return pd.Series((np.ceil(necesidad / uem) * uem).astype('int64'), index=df.index)
 
 def generar_excel_quiebres(df):
     """Crea un archivo Excel profesional y formateado para el plan de acción de quiebres."""
@@ -98,59 +92,48 @@ def generar_excel_quiebres(df):
     return output.getvalue()
 
 
-def preparar_plan_quiebres(df_maestro, almacen_seleccionado):
-    """Analiza los quiebres y genera un plan de acción con sugerencias inteligentes."""
+def preparar_plan_quiebres(df_maestro, almacen_seleccionado, indice=None, df_original=None):
+    """Analiza los quiebres y genera un plan de acción con sugerencias inteligentes.
+
+    `df_maestro` es el estado de abastecimiento compartido (utils.estado_abastecimiento), de modo que los
+    traslados sugeridos coinciden con los de Gestión de Abastecimiento; `indice` es su IndiceFilas, con el
+    que los filtros no recorren columnas completas. Sus SKU están normalizados para cruzarlos con las
+    órdenes, así que el SKU que se muestra sale de `df_original` (el maestro de la sesión, mismo índice).
+    El plan conserva las etiquetas de fila del maestro y lleva el costo unitario de cada fila.
+    """
     if df_maestro is None or df_maestro.empty:
         return pd.DataFrame()
 
     # 1. Filtrar los productos en quiebre para la tienda(s) seleccionada(s)
     if almacen_seleccionado != "Consolidado":
-        df_quiebres = df_maestro[(df_maestro['Almacen_Nombre'] == almacen_seleccionado) & (df_maestro['Estado_Inventario'] == 'Quiebre de Stock')].copy()
+        df_quiebres = vista_filtrada(df_maestro, indice, Almacen_Nombre=almacen_seleccionado, Estado_Inventario='Quiebre de Stock')
     else:
-        df_quiebres = df_maestro[df_maestro['Estado_Inventario'] == 'Quiebre de Stock'].copy()
+        df_quiebres = vista_filtrada(df_maestro, indice, Estado_Inventario='Quiebre de Stock')
 
     if df_quiebres.empty:
         return pd.DataFrame()
 
-    # 2. Encontrar todos los excedentes trasladables en TODAS las tiendas
-    df_excedentes = df_maestro[df_maestro['Excedente_Trasladable'] > 0].copy()
-    mejor_origen_map = df_excedentes.sort_values('Excedente_Trasladable', ascending=False).drop_duplicates('SKU').set_index('SKU')
-
-    # 3. Generar el plan de acción
-    plan_list = []
-    for _, row in df_quiebres.iterrows():
-        sku = row['SKU']
-        accion = "Generar Orden de Compra"
-        origen = "Proveedor"
-
-        # Aplicar la lógica de UEM para obtener la cantidad sugerida
-        uds_a_solicitar = determinar_uem_y_ajustar_cantidad(row)
-
-        if sku in mejor_origen_map.index:
-            excedente_info = mejor_origen_map.loc[sku]
-            # Solo sugerir traslado si la tienda de origen es DIFERENTE a la afectada
-            if excedente_info['Almacen_Nombre'] != row['Almacen_Nombre']:
-                accion = "Solicitar Traslado"
-                origen = excedente_info['Almacen_Nombre']
-        
-        plan_list.append({
-            "✔️ Seleccionar": True, # Columna para el checkbox, por defecto todo seleccionado
-            "Tienda Afectada": row['Almacen_Nombre'],
-            "SKU": sku,
-            "Descripción": row['Descripcion'],
-            "Acción Sugerida": accion,
-            "Tienda Origen / Proveedor": origen,
-            "Uds. a Solicitar": uds_a_solicitar,
-            "Valor Requerido": uds_a_solicitar * row['Costo_Promedio_UND'],
-            "Clase ABC": row['Segmento_ABC'],
-            "Marca": row['Marca_Nombre'],
-            "Proveedor": row.get('Proveedor', 'No Asignado')
-        })
-
-    if not plan_list:
-        return pd.DataFrame()
-
-    df_plan = pd.DataFrame(plan_list)
+    # 2. Origen del traslado: el que asigna el plan compartido (Tienda_Origen_Sugerida), si es otra tienda
+    origen = df_quiebres.get('Tienda_Origen_Sugerida', pd.Series('', index=df_quiebres.index)).fillna('')
+    es_traslado = (origen != '') & (origen != df_quiebres['Almacen_Nombre'])
+
+    # 3. Generar el plan de acción (la lógica de UEM da la cantidad sugerida)
+    uds_a_solicitar = determinar_uem_y_ajustar_cantidad(df_quiebres)
+    skus = (df_original if df_original is not None else df_quiebres).loc[df_quiebres.index, 'SKU']
+    df_plan = pd.DataFrame({
+        "✔️ Seleccionar": True, # Columna para el checkbox, por defecto todo seleccionado
+        "Tienda Afectada": df_quiebres['Almacen_Nombre'].to_numpy(),
+        "SKU": skus.to_numpy(),
+        "Descripción": df_quiebres['Descripcion'].to_numpy(),
+        "Acción Sugerida": np.where(es_traslado, "Solicitar Traslado", "Generar Orden de Compra"),
+        "Tienda Origen / Proveedor": np.where(es_traslado, origen, "Proveedor"),
+        "Uds. a Solicitar": uds_a_solicitar.to_numpy(),
+        "Costo Unitario": df_quiebres['Costo_Promedio_UND'].to_numpy(),
+        "Valor Requerido": (uds_a_solicitar * df_quiebres['Costo_Promedio_UND']).to_numpy(),
+        "Clase ABC": df_quiebres['Segmento_ABC'].to_numpy(),
+        "Marca": df_quiebres['Marca_Nombre'].to_numpy(),
+        "Proveedor": df_quiebres['Proveedor'].to_numpy() if 'Proveedor' in df_quiebres.columns else 'No Asignado',
+    }, index=df_quiebres.index)
     return df_plan.sort_values(by=['Valor Requerido', 'Clase ABC'], ascending=[False, True])
 
 
@@ -173,8 +156,9 @@ else:
     almacen_sel = st.session_state.get('almacen_nombre')
     st.sidebar.info(f"Mostrando quiebres para tu tienda: **{almacen_sel}**")
 
-# Generar el plan base
-df_plan = preparar_plan_quiebres(df_maestro, almacen_sel)
+# Generar el plan base sobre el estado de abastecimiento compartido (mismo plan de traslados en todas las páginas)
+df_estado, _, indice_estado = estado_abastecimiento_sesion(st.session_state)
+df_plan = preparar_plan_quiebres(df_estado, almacen_sel, indice_estado, df_maestro)
 
 # Filtrado adicional por Clase, Marca y Proveedor
 if not df_plan.empty:
@@ -203,8 +187,9 @@ else:
     # --- KPI DE VENTA PERDIDA ESTIMADA ---
     venta_perdida_total = 0
     if 'Venta_Perdida_Estimada_30d' in df_maestro.columns:
-        skus_en_plan = df_plan_filtrado['SKU'].unique()
-        venta_perdida_total = df_maestro[df_maestro['SKU'].isin(skus_en_plan)]['Venta_Perdida_Estimada_30d'].sum()
+        # El plan conserva las etiquetas de fila: de ellas salen los SKU normalizados del estado compartido
+        skus_en_plan = df_estado.loc[df_plan_filtrado.index, 'SKU'].unique()
+        venta_perdida_total = vista_filtrada(df_estado, indice_estado, SKU=list(skus_en_plan))['Venta_Perdida_Estimada_30d'].sum()
     
     if venta_perdida_total > 0:
         st.error(f"💸 **Venta perdida estimada por estos quiebres: ${venta_perdida_total:,.0f}/mes** — Prioriza los de Clase A para recuperar ingresos rápidamente.")
@@ -230,12 +215,13 @@ else:
             key="plan_editor",
             column_config={
                 "✔️ Seleccionar": st.column_config.CheckboxColumn(required=True),
+                "Costo Unitario": st.column_config.NumberColumn(format="$ {:,.0f}"),
                 "Valor Requerido": st.column_config.NumberColumn(format="$ {:,.0f}"),
                 "Uds. a Solicitar": st.column_config.NumberColumn(format="%d Uds.", min_value=0, step=1),
                 "Acción Sugerida": st.column_config.SelectboxColumn("Acción", options=["Generar Orden de Compra", "Solicitar Traslado"]),
             },
             # Deshabilitar la edición de columnas que no deben ser cambiadas
-            disabled=["SKU", "Descripción", "Tienda Afectada", "Clase ABC", "Marca", "Proveedor", "Valor Requerido"]
+            disabled=["SKU", "Descripción", "Tienda Afectada", "Clase ABC", "Marca", "Proveedor", "Costo Unitario", "Valor Requerido"]
         )
         
         # Filtrar el dataframe basado en las selecciones del usuario
@@ -248,9 +234,7 @@ else:
         if not df_seleccionado.empty:
             total_skus = df_seleccionado['SKU'].nunique()
             # Recalcular el valor requerido basado en las cantidades editadas
-            df_seleccionado['Valor Requerido'] = df_seleccionado['Uds. a Solicitar'] * df_seleccionado.apply(
-                lambda row: df_maestro.loc[df_maestro['SKU'] == row['SKU'], 'Costo_Promedio_UND'].iloc[0], axis=1
-            )
+            df_seleccionado['Valor Requerido'] = df_seleccionado['Uds. a Solicitar'] * df_seleccionado['Costo Unitario']
             valor_total_requerido = df_seleccionado['Valor Requerido'].sum()
             valor_compra = df_seleccionado[df_seleccionado['Acción Sugerida'] == 'Generar Orden de Compra']['Valor Requerido'].sum()
             valor_traslado = df_seleccionado[df_seleccionado['Acción Sugerida'] == 'Solicitar Traslado']['Valor Requerido'].sum()
@@ -277,15 +261,13 @@ else:
     df_resumen = edited_df[edited_df['✔️ Seleccionar'] == True]
     if not df_resumen.empty:
         # Recalcular valor por si hubo ediciones
-        df_resumen['Valor Requerido'] = df_resumen['Uds. a Solicitar'] * df_resumen.apply(
-            lambda row: df_maestro.loc[df_maestro['SKU'] == row['SKU'], 'Costo_Promedio_UND'].iloc[0], axis=1
-        )
+        df_resumen['Valor Requerido'] = df_resumen['Uds. a Solicitar'] * df_resumen['Costo Unitario']
         
         with tab2: # Resumen por Proveedor
             st.header("🚚 Resumen para Órdenes de Compra por Proveedor")
             df_compras = df_resumen[df_resumen['Acción Sugerida'] == 'Generar Orden de Compra']
             if not df_compras.empty:
-                resumen_proveedor = df_compras.groupby('Proveedor').agg(
+                resumen_proveedor = df_compras.groupby('Proveedor', observed=True).agg(
                     Valor_Total_Compra=('Valor Requerido', 'sum'),
                     SKUs_Distintos=('SKU', 'nunique')
                 ).reset_index().sort_values('Valor_Total_Compra', ascending=False)
@@ -0,0 +1,112 @@
+# tests/test_abastecimiento.py
+"""El estado de abastecimiento puesto al día por SKU coincide con recalcularlo todo."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from inventario.abastecimiento import COLUMNAS_INCREMENTALES, EstadoAbastecimiento, calcular_estado_abastecimiento
+from inventario.ordenes import version_ordenes
+
+TIENDAS = ['Armenia', 'Manizales', 'Opalo', 'Olaya', 'Pereira Centro']
+# En modo 'optimo' el plan de un subconjunto puede repartir distinto: se comparan las columnas previas al plan
+COLUMNAS_PREVIAS_AL_PLAN = COLUMNAS_INCREMENTALES[:8]
+
+
+def generar_base(n_skus=300, semilla=1):
+    rng = np.random.default_rng(semilla)
+    skus = np.repeat(np.arange(n_skus), len(TIENDAS)).astype(str)
+    n = len(skus)
+    df_base = pd.DataFrame({
+        'SKU': skus, 'Almacen_Nombre': np.tile(TIENDAS, n_skus),
+        'Descripcion': 'ARTICULO', 'Marca_Nombre': 'MARCA', 'Proveedor': 'PROVEEDOR', 'Segmento_ABC': 'A',
+        'Stock': rng.integers(0, 50, n),
+        'Costo_Promedio_UND': rng.random(n) * 1000,
+        'Necesidad_Total': np.where(rng.random(n) < 0.4, rng.random(n) * 20, 0.0),
+        'Excedente_Trasladable': rng.random(n) * 5,
+        'Demanda_Diaria_Promedio': np.where(rng.random(n) < 0.7, rng.random(n) * 3, 0.0),
+        'Peso_Articulo': rng.random(n),
+        'Stock_Objetivo': rng.integers(0, 60, n),
+        'Punto_Reorden': rng.integers(0, 30, n),
+        'Lead_Time_Proveedor': 7,
+    })
+    n_ordenes = n_skus // 5
+    df_ordenes = pd.DataFrame({
+        'ID_Orden': [f"TR-{i}-1" for i in range(n_ordenes)],
+        'SKU': rng.choice(skus, n_ordenes),
+        'Tienda_Destino': rng.choice(TIENDAS, n_ordenes),
+        'Cantidad_Solicitada': rng.integers(1, 20, n_ordenes),
+        'Estado': rng.choice(['Pendiente', 'En Tránsito', 'Recibido'], n_ordenes),
+        'Proveedor': rng.choice(['TRASLADO INTERNO: Opalo', 'PROVEEDOR'], n_ordenes),
+    })
+    return df_base, df_ordenes
+
+
+def comprobar_igual_a_recalcular(estado, df_base, df_ordenes, modo):
+    maestro, plan = calcular_estado_abastecimiento(df_base, df_ordenes, modo)
+    columnas = COLUMNAS_INCREMENTALES if modo == 'voraz' else COLUMNAS_PREVIAS_AL_PLAN
+    pd.testing.assert_frame_equal(maestro[columnas], estado.maestro[columnas], check_dtype=False)
+    claves = ['SKU', 'Tienda Origen', 'Tienda Destino']
+    esperado = plan.sort_values(claves).reset_index(drop=True)
+    obtenido = estado.plan.sort_values(claves).reset_index(drop=True)
+    if modo == 'voraz':
+        pd.testing.assert_frame_equal(esperado, obtenido)
+        assert obtenido.attrs['costo_flete'] == pytest.approx(esperado.attrs['costo_flete'])
+    else:
+        assert obtenido['Uds a Enviar'].sum() == pytest.approx(esperado['Uds a Enviar'].sum())
+
+    # El plan respeta los excedentes y necesidades del maestro y Cubierto_Por_Traslado sale de él
+    filas = estado.maestro.set_index(['SKU', 'Almacen_Nombre'])
+    enviado = estado.plan.groupby(['SKU', 'Tienda Origen'])['Uds a Enviar'].sum()
+    assert (enviado <= filas['Excedente_Trasladable'].reindex(enviado.index) + 1e-9).all()
+    recibido = estado.plan.groupby(['SKU', 'Tienda Destino'])['Uds a Enviar'].sum()
+    assert (recibido <= filas['Necesidad_Ajustada_Por_Transito'].reindex(recibido.index) + 1e-9).all()
+    cubierto = recibido.reindex(pd.MultiIndex.from_arrays([estado.maestro['SKU'], estado.maestro['Almacen_Nombre']]))
+    np.testing.assert_allclose(estado.maestro['Cubierto_Por_Traslado'].to_numpy(), cubierto.fillna(0).to_numpy())
+
+
+@pytest.mark.parametrize('modo', ['voraz', 'optimo'])
+def test_actualizar_coincide_con_recalcular(modo):
+    df_base, df_ordenes = generar_base()
+    estado = EstadoAbastecimiento(df_base, df_ordenes, version_ordenes(df_ordenes), modo)
+
+    nuevas = pd.DataFrame({
+        'ID_Orden': ['OC-9-1', 'OC-9-2', 'TR-9-1'], 'SKU': ['5', '17', '5'],
+        'Tienda_Destino': ['Opalo', 'Olaya', 'Armenia'], 'Cantidad_Solicitada': [30, 4, 7], 'Estado': 'Pendiente',
+        'Proveedor': ['PROVEEDOR', 'PROVEEDOR', 'TRASLADO INTERNO: Manizales'],
+    })
+    agregadas = pd.concat([df_ordenes, nuevas], ignore_index=True)
+    assert estado.actualizar(agregadas, version_ordenes(agregadas)) == {'5', '17'}
+    comprobar_igual_a_recalcular(estado, df_base, agregadas, modo)
+
+    editadas = agregadas.copy()
+    editadas.loc[editadas.index[:5], 'Estado'] = 'Recibido'
+    assert estado.actualizar(editadas, version_ordenes(editadas))
+    comprobar_igual_a_recalcular(estado, df_base, editadas, modo)
+
+    quitadas = editadas.iloc[10:].copy()
+    assert estado.actualizar(quitadas, version_ordenes(quitadas))
+    comprobar_igual_a_recalcular(estado, df_base, quitadas, modo)
+
+    # Sin cambios no replanifica nada; con otras columnas no se pueden comparar y se recalcula todo
+    assert estado.actualizar(quitadas, version_ordenes(quitadas)) == set()
+    otro_esquema = quitadas.assign(Extra=1)
+    assert estado.actualizar(otro_esquema, version_ordenes(otro_esquema)) is None
+    comprobar_igual_a_recalcular(estado, df_base, otro_esquema, modo)
+
+
+def test_actualizar_no_modifica_lo_ya_entregado():
+    df_base, df_ordenes = generar_base()
+    estado = EstadoAbastecimiento(df_base, df_ordenes, version_ordenes(df_ordenes))
+    maestro, plan = estado.maestro, estado.plan
+    maestro_antes, plan_antes = maestro.copy(), plan.copy()
+
+    nuevas = pd.DataFrame({
+        'ID_Orden': ['OC-9-1'], 'SKU': ['5'], 'Tienda_Destino': ['Opalo'], 'Cantidad_Solicitada': [30],
+        'Estado': 'Pendiente', 'Proveedor': ['PROVEEDOR'],
+    })
+    agregadas = pd.concat([df_ordenes, nuevas], ignore_index=True)
+    assert estado.actualizar(agregadas, version_ordenes(agregadas))
+
+    assert estado.maestro is not maestro
+    pd.testing.assert_frame_equal(maestro, maestro_antes)
+    pd.testing.assert_frame_equal(plan, plan_antes)
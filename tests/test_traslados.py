@@ -0,0 +1,69 @@
+# tests/test_traslados.py
+"""El plan voraz con arreglos ordenados (asignar_voraz) reparte igual que el recorrido anterior con iterrows."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from inventario.traslados import plan_traslados
+
+TIENDAS = ['Armenia', 'Manizales', 'Opalo', 'Olaya', 'Laureles', 'FerreBox', 'Cedi', 'Cerritos']
+
+
+def generar_analisis(n_skus, semilla=0, fraccion_cruzada=0.05):
+    """Cuadro SKU × tienda con necesidades, excedentes y algunas tiendas que tienen ambos."""
+    rng = np.random.default_rng(semilla)
+    n = n_skus * len(TIENDAS)
+    necesidad = np.where(rng.random(n) < 0.4, rng.random(n) * 20, 0.0)
+    excedente = np.where((necesidad == 0) & (rng.random(n) < 0.4), rng.random(n) * 30, 0.0)
+    excedente = np.where(rng.random(n) < fraccion_cruzada, rng.random(n) * 10, excedente)
+    return pd.DataFrame({
+        'SKU': np.repeat(np.arange(n_skus), len(TIENDAS)).astype(str),
+        'Almacen_Nombre': np.tile(TIENDAS, n_skus),
+        'Descripcion': 'ARTICULO', 'Marca_Nombre': 'MARCA', 'Proveedor': 'PROVEEDOR', 'Segmento_ABC': 'A',
+        'Stock': rng.integers(0, 50, n),
+        'Necesidad_Ajustada_Por_Transito': necesidad,
+        'Excedente_Trasladable': excedente,
+        'Cobertura_Dias_Proyectada': rng.random(n) * 30,
+        'Peso_Articulo': rng.random(n),
+        'Costo_Promedio_UND': rng.random(n) * 1000,
+    })
+
+
+def plan_recorrido_iterrows(df):
+    """Recorrido anterior de generar_plan_traslados_inteligente (necesidad por necesidad, origen por origen)."""
+    df_origen = df[df['Excedente_Trasladable'] > 0].sort_values(by='Excedente_Trasladable', ascending=False, kind='stable')
+    df_destino = df[df['Necesidad_Ajustada_Por_Transito'] > 0].sort_values(
+        by=['Cobertura_Dias_Proyectada', 'Necesidad_Ajustada_Por_Transito'], ascending=[True, False])
+    excedentes_mutables = df_origen.set_index(['SKU', 'Almacen_Nombre'])['Excedente_Trasladable'].to_dict()
+    plan = []
+    for _, necesidad_row in df_destino.iterrows():
+        sku, tienda_necesitada, necesidad_actual = necesidad_row['SKU'], necesidad_row['Almacen_Nombre'], necesidad_row['Necesidad_Ajustada_Por_Transito']
+        posibles_origenes = df_origen[(df_origen['SKU'] == sku) & (df_origen['Almacen_Nombre'] != tienda_necesitada)]
+        for _, origen_row in posibles_origenes.iterrows():
+            tienda_origen = origen_row['Almacen_Nombre']
+            excedente_disponible = excedentes_mutables.get((sku, tienda_origen), 0)
+            if excedente_disponible > 0 and necesidad_actual > 0:
+                unidades_a_enviar = np.floor(min(necesidad_actual, excedente_disponible))
+                if unidades_a_enviar < 1: continue
+                plan.append((sku, tienda_origen, tienda_necesitada, unidades_a_enviar))
+                necesidad_actual -= unidades_a_enviar
+                excedentes_mutables[(sku, tienda_origen)] -= unidades_a_enviar
+    return pd.DataFrame(plan, columns=['SKU', 'Tienda Origen', 'Tienda Destino', 'Uds a Enviar'])
+
+
+def normalizar(plan):
+    columnas = ['SKU', 'Tienda Origen', 'Tienda Destino']
+    return plan[columnas + ['Uds a Enviar']].sort_values(columnas).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('semilla, fraccion_cruzada', [(0, 0.05), (1, 0.0), (2, 0.3)])
+def test_plan_voraz_igual_al_recorrido_iterrows(semilla, fraccion_cruzada):
+    df = generar_analisis(300, semilla, fraccion_cruzada)
+    plan = plan_traslados(df)
+    assert len(plan) > 0
+    pd.testing.assert_frame_equal(normalizar(plan), normalizar(plan_recorrido_iterrows(df)), check_dtype=False)
+
+
+def test_plan_voraz_sin_excedentes_queda_vacio():
+    df = generar_analisis(20).assign(Excedente_Trasladable=0.0)
+    assert plan_traslados(df).empty
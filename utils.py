@@ -7,6 +7,7 @@ import io
 import os
 import gspread
 import smtplib
+import threading
 import urllib.parse
 from datetime import datetime
 from fpdf import FPDF
@@ -15,7 +16,11 @@ from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
 from google.oauth2.service_account import Credentials
-import dropbox
+from inventario.dropbox_cliente import ClienteDropbox
+from inventario.fuentes import FuenteLocal
+from inventario.maestro import cargar_maestro_articulos
+from inventario.abastecimiento import EstadoAbastecimiento
+from inventario.vistas import CLAVE_MODO_TRASLADOS, analisis_sesion, ordenes_sesion, version_sesion
 
 # --- IDENTIDAD VISUAL FERREINOX ---
 FERREINOX_CSS = """
@@ -64,14 +69,6 @@ def convertir_serie_a_entero_seguro(serie):
     return np.ceil(serie_limpia).astype(int)
 
 # --- CONSTANTES Y CONFIGURACIONES (AJUSTADAS A TUS NECESIDADES) ---
-EXPECTED_INVENTORY_COLS = [
-    'DEPARTAMENTO', 'REFERENCIA', 'DESCRIPCION', 'MARCA', 'PESO_ARTICULO',
-    'UNIDADES_VENDIDAS', 'STOCK', 'COSTO_PROMEDIO_UND', 'CODALMACEN',
-    'LEAD_TIME_PROVEEDOR', 'HISTORIAL_VENTAS'
-]
-# Columnas exactas que se esperan en el archivo de proveedores
-EXPECTED_PROVIDERS_COLS = ['COD PROVEEDOR', 'REFERENCIA', 'PROVEEDOR']
-
 # Se añade 'SKU_Proveedor' a las columnas que se registran en Google Sheets
 GSHEETS_FINAL_COLS = [
     'ID_Orden', 'Fecha_Emision', 'Proveedor', 'SKU', 'SKU_Proveedor', 'Descripcion',
@@ -123,132 +120,6 @@ def validate_dataframe(df, required_columns, df_name="DataFrame"):
         return False
     return True
 
-# --- LÓGICA DE ANÁLISIS CENTRAL ---
-@st.cache_data
-def analizar_inventario_completo(_df_crudo, _df_proveedores, dias_seguridad=7, dias_objetivo=None):
-    if not validate_dataframe(_df_crudo, EXPECTED_INVENTORY_COLS, "archivo de inventario"):
-        return pd.DataFrame()
-    
-    df = _df_crudo.copy()
-    
-    column_mapping = {
-        'CODALMACEN': 'Almacen', 'DEPARTAMENTO': 'Departamento', 'DESCRIPCION': 'Descripcion',
-        'UNIDADES_VENDIDAS': 'Ventas_60_Dias', 'STOCK': 'Stock', 'COSTO_PROMEDIO_UND': 'Costo_Promedio_UND',
-        'REFERENCIA': 'SKU', 'MARCA': 'Marca', 'PESO_ARTICULO': 'Peso_Articulo', 
-        'HISTORIAL_VENTAS': 'Historial_Ventas', 'LEAD_TIME_PROVEEDOR': 'Lead_Time_Proveedor'
-    }
-    df.rename(columns=column_mapping, inplace=True)
-    
-    df['SKU'] = df['SKU'].astype(str)
-    almacen_map = {'158':'Opalo', '155':'Cedi','156':'Armenia','157':'Manizales','189':'Olaya','238':'Laureles','439':'FerreBox','463':'Cerritos'}
-    df['Almacen_Nombre'] = df['Almacen'].astype(str).map(almacen_map).fillna(df['Almacen'])
-    
-    numeric_cols = ['Ventas_60_Dias', 'Costo_Promedio_UND', 'Stock', 'Peso_Articulo', 'Lead_Time_Proveedor']
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-    
-    df['Stock'] = np.maximum(0, df['Stock'])
-    df.reset_index(inplace=True)
-
-    # --- LÓGICA DE DEMANDA DIARIA Y MÉTRICAS (COMPLETA) ---
-    df['Historial_Ventas'] = df['Historial_Ventas'].fillna('').astype(str)
-    df_ventas = df[df['Historial_Ventas'].str.contains(':')].copy()
-    if not df_ventas.empty:
-        try:
-            df_ventas = df_ventas.assign(Historial_Ventas=df_ventas['Historial_Ventas'].str.split(',')).explode('Historial_Ventas')
-            df_ventas[['Fecha_Venta', 'Unidades']] = df_ventas['Historial_Ventas'].str.split(':', expand=True)
-            df_ventas['Fecha_Venta'] = pd.to_datetime(df_ventas['Fecha_Venta'], errors='coerce')
-            df_ventas['Unidades'] = pd.to_numeric(df_ventas['Unidades'], errors='coerce')
-            df_ventas.dropna(subset=['Fecha_Venta', 'Unidades'], inplace=True)
-            df_ventas = df_ventas[(pd.Timestamp.now() - df_ventas['Fecha_Venta']).dt.days <= 60]
-            if not df_ventas.empty:
-                demanda_diaria = df_ventas.groupby('index')['Unidades'].sum() / 60
-                df = df.merge(demanda_diaria.rename('Demanda_Diaria_Promedio'), on='index', how='left')
-            else:
-                df['Demanda_Diaria_Promedio'] = 0
-        except Exception as e:
-            st.warning(f"Se encontró un problema al procesar el historial de ventas. Algunas demandas podrían ser 0. Error: {e}")
-            df['Demanda_Diaria_Promedio'] = 0
-    else:
-        df['Demanda_Diaria_Promedio'] = 0
-    df['Demanda_Diaria_Promedio'].fillna(0, inplace=True)
-    # FALLBACK: Si Historial_Ventas no parsó pero hay ventas reportadas, usar ese dato
-    mask_fallback = (df['Demanda_Diaria_Promedio'] == 0) & (df['Ventas_60_Dias'] > 0)
-    df.loc[mask_fallback, 'Demanda_Diaria_Promedio'] = df.loc[mask_fallback, 'Ventas_60_Dias'] / 60
-    df['Valor_Inventario'] = df['Stock'] * df['Costo_Promedio_UND']
-    df['Stock_Seguridad'] = df['Demanda_Diaria_Promedio'] * dias_seguridad
-    df['Punto_Reorden'] = (df['Demanda_Diaria_Promedio'] * df['Lead_Time_Proveedor']) + df['Stock_Seguridad']
-    df['Valor_Venta_60_Dias'] = df['Ventas_60_Dias'] * df['Costo_Promedio_UND']
-    total_ventas_valor = df['Valor_Venta_60_Dias'].sum()
-    if total_ventas_valor > 0:
-        ventas_sku_valor = df.groupby('SKU')['Valor_Venta_60_Dias'].sum()
-        sku_to_percent = ventas_sku_valor.sort_values(ascending=False).cumsum() / total_ventas_valor
-        df['Segmento_ABC'] = df['SKU'].map(sku_to_percent).apply(lambda p: 'A' if p <= 0.8 else ('B' if p <= 0.95 else 'C')).fillna('C')
-    else:
-        df['Segmento_ABC'] = 'C'
-    if dias_objetivo is None: dias_objetivo = {'A': 30, 'B': 45, 'C': 60}
-    df['dias_objetivo_map'] = df['Segmento_ABC'].map(dias_objetivo)
-    df['Stock_Objetivo'] = df['Demanda_Diaria_Promedio'] * df['dias_objetivo_map']
-    conditions = [(df['Stock'] <= 0) & (df['Demanda_Diaria_Promedio'] > 0), (df['Stock'] > 0) & (df['Demanda_Diaria_Promedio'] <= 0), (df['Stock'] > 0) & (df['Stock'] < df['Punto_Reorden']), (df['Stock'] > df['Stock_Objetivo']),]
-    choices_estado = ['Quiebre de Stock', 'Baja Rotación / Obsoleto', 'Bajo Stock (Riesgo)', 'Excedente']
-    df['Estado_Inventario'] = np.select(conditions, choices_estado, default='Normal')
-    # --- MÉTRICAS AVANZADAS DE ROTACIÓN ---
-    df['Cobertura_Dias'] = np.where(
-        df['Demanda_Diaria_Promedio'] > 0,
-        df['Stock'] / df['Demanda_Diaria_Promedio'],
-        9999
-    )
-    df['Rotacion_Inventario'] = np.where(
-        df['Valor_Inventario'] > 0,
-        (df['Valor_Venta_60_Dias'] / df['Valor_Inventario']) * 6,
-        0
-    )
-    df['Venta_Perdida_Estimada_30d'] = np.where(
-        (df['Stock'] <= 0) & (df['Demanda_Diaria_Promedio'] > 0),
-        df['Demanda_Diaria_Promedio'] * 30 * df['Costo_Promedio_UND'] * 1.30,
-        0
-    )
-    df['Precio_Venta_Estimado'] = df['Costo_Promedio_UND'] * 1.30
-
-    # Objetivo real: el mayor entre stock_objetivo y punto_reorden (cubre lead times largos)
-    df['Objetivo_Abastecimiento'] = np.maximum(df['Stock_Objetivo'], df['Punto_Reorden'])
-    # Necesidad proactiva: anticipa el consumo durante el lead time del proveedor
-    df['Necesidad_Total'] = np.maximum(0,
-        df['Objetivo_Abastecimiento'] - df['Stock']
-        + (df['Demanda_Diaria_Promedio'] * df['Lead_Time_Proveedor'])
-    )
-    # Excedente_Trasladable: stock que esta tienda puede ceder a otras
-    # - Excedente: todo lo que sobra por encima del Objetivo_Abastecimiento
-    # - Baja Rotación: TODO el stock (si no vende aquí, que venda en otra sede)
-    # - Normal/Bajo Stock/Quiebre: no ceden stock
-    df['Excedente_Trasladable'] = np.select(
-        [
-            df['Estado_Inventario'] == 'Excedente',
-            df['Estado_Inventario'] == 'Baja Rotación / Obsoleto',
-        ],
-        [
-            np.maximum(0, df['Stock'] - df['Objetivo_Abastecimiento']),
-            df['Stock'],  # Todo el stock sin rotación es trasladable
-        ],
-        default=0
-    )
-    
-    # --- MANEJO ROBUSTO DE PROVEEDORES ---
-    if validate_dataframe(_df_proveedores, EXPECTED_PROVIDERS_COLS, "archivo de proveedores"):
-        df_proveedores_limpio = _df_proveedores[EXPECTED_PROVIDERS_COLS].copy()
-        df_proveedores_limpio.rename(columns={'REFERENCIA': 'SKU', 'PROVEEDOR': 'Proveedor', 'COD PROVEEDOR': 'SKU_Proveedor'}, inplace=True)
-        df_proveedores_limpio['SKU'] = df_proveedores_limpio['SKU'].astype(str)
-        df_proveedores_limpio = df_proveedores_limpio.drop_duplicates(subset=['SKU'], keep='first')
-        df = pd.merge(df, df_proveedores_limpio, on='SKU', how='left')
-    
-    if 'Proveedor' not in df.columns: df['Proveedor'] = 'No Asignado'
-    if 'SKU_Proveedor' not in df.columns: df['SKU_Proveedor'] = 'N/A'
-    
-    df['Proveedor'] = df['Proveedor'].fillna('No Asignado').str.upper()
-    df['SKU_Proveedor'] = df['SKU_Proveedor'].fillna('N/A')
-
-    return df.set_index('index')
-
 # --- CONEXIÓN A GOOGLE SHEETS ---
 @st.cache_resource(ttl=3600)
 def connect_to_gsheets():
@@ -313,61 +184,37 @@ def append_to_sheet(sheet_name, df_to_append):
     except Exception as e:
         return False, f"Error al añadir registros a '{sheet_name}': {e}", pd.DataFrame()
 
-# --- LÓGICA DE CÁLCULO DE SUGERENCIAS (COMPLETA) ---
-@st.cache_data
-def calcular_sugerencias_finales(_df_base, _df_ordenes):
-    df_maestro = _df_base.copy()
-    df_maestro['Stock_En_Transito'] = 0
-    if not _df_ordenes.empty and 'Estado' in _df_ordenes.columns:
-        df_pendientes = _df_ordenes[_df_ordenes['Estado'].isin(['Pendiente', 'En Tránsito'])].copy()
-        if not df_pendientes.empty and 'Cantidad_Solicitada' in df_pendientes.columns:
-            df_pendientes['Cantidad_Solicitada'] = pd.to_numeric(df_pendientes['Cantidad_Solicitada'], errors='coerce').fillna(0)
-            stock_en_transito_agg = df_pendientes.groupby(['SKU', 'Tienda_Destino'])['Cantidad_Solicitada'].sum().reset_index()
-            stock_en_transito_agg = stock_en_transito_agg.rename(columns={'Cantidad_Solicitada': 'Stock_En_Transito_Nuevas', 'Tienda_Destino': 'Almacen_Nombre'})
-            df_maestro = pd.merge(df_maestro, stock_en_transito_agg, on=['SKU', 'Almacen_Nombre'], how='left')
-            df_maestro['Stock_En_Transito'] = df_maestro['Stock_En_Transito'].add(df_maestro['Stock_En_Transito_Nuevas'].fillna(0))
-            df_maestro.drop(columns=['Stock_En_Transito_Nuevas'], inplace=True)
-    df_maestro['Necesidad_Ajustada_Por_Transito'] = (df_maestro['Necesidad_Total'] - df_maestro['Stock_En_Transito']).clip(lower=0)
-    df_plan_maestro = generar_plan_traslados_inteligente(df_maestro)
-    df_maestro['Cubierto_Por_Traslado'] = 0
-    if not df_plan_maestro.empty:
-        unidades_cubiertas = df_plan_maestro.groupby(['SKU', 'Tienda Destino'])['Uds a Enviar'].sum().reset_index()
-        unidades_cubiertas = unidades_cubiertas.rename(columns={'Tienda Destino': 'Almacen_Nombre', 'Uds a Enviar': 'Cubierto_Por_Traslado_Nuevas'})
-        df_maestro = pd.merge(df_maestro, unidades_cubiertas, on=['SKU', 'Almacen_Nombre'], how='left')
-        df_maestro['Cubierto_Por_Traslado'] = df_maestro['Cubierto_Por_Traslado'].add(df_maestro['Cubierto_Por_Traslado_Nuevas'].fillna(0))
-        df_maestro.drop(columns=['Cubierto_Por_Traslado_Nuevas'], inplace=True)
-    sugerencia_compra = (df_maestro['Necesidad_Ajustada_Por_Transito'] - df_maestro['Cubierto_Por_Traslado']).clip(lower=0)
-    df_maestro['Sugerencia_Compra'] = convertir_serie_a_entero_seguro(sugerencia_compra)
-    return df_maestro, df_plan_maestro
-
-@st.cache_data
-def generar_plan_traslados_inteligente(_df_analisis):
-    required_cols = ['Excedente_Trasladable', 'Necesidad_Ajustada_Por_Transito', 'SKU', 'Almacen_Nombre']
-    if not validate_dataframe(_df_analisis, required_cols, "análisis para traslados"): return pd.DataFrame()
-    df_origen = _df_analisis[_df_analisis['Excedente_Trasladable'] > 0].sort_values(by='Excedente_Trasladable', ascending=False).copy()
-    df_destino = _df_analisis[_df_analisis['Necesidad_Ajustada_Por_Transito'] > 0].sort_values(by='Necesidad_Ajustada_Por_Transito', ascending=False).copy()
-    if df_origen.empty or df_destino.empty: return pd.DataFrame()
-    plan_final = []
-    excedentes_mutables = df_origen.set_index(['SKU', 'Almacen_Nombre'])['Excedente_Trasladable'].to_dict()
-    for _, need_row in df_destino.iterrows():
-        sku, tienda_necesitada, necesidad = need_row['SKU'], need_row['Almacen_Nombre'], need_row['Necesidad_Ajustada_Por_Transito']
-        if necesidad <= 0: continue
-        posibles_origenes = df_origen[(df_origen['SKU'] == sku) & (df_origen['Almacen_Nombre'] != tienda_necesitada)]
-        for _, origin_row in posibles_origenes.iterrows():
-            tienda_origen = origin_row['Almacen_Nombre']
-            excedente_disp = excedentes_mutables.get((sku, tienda_origen), 0)
-            if excedente_disp > 0:
-                unidades_a_enviar = min(necesidad, excedente_disp)
-                if unidades_a_enviar < 1: continue
-                plan_final.append({'SKU': sku, 'Descripcion': need_row.get('Descripcion', 'N/A'), 'Proveedor': origin_row.get('Proveedor', 'N/A'), 'Tienda Origen': tienda_origen, 'Stock en Origen': origin_row.get('Stock', 0), 'Tienda Destino': tienda_necesitada, 'Stock en Destino': need_row.get('Stock', 0), 'Uds a Enviar': np.floor(unidades_a_enviar), 'Costo_Promedio_UND': need_row.get('Costo_Promedio_UND', 0)})
-                necesidad -= unidades_a_enviar
-                excedentes_mutables[(sku, tienda_origen)] -= unidades_a_enviar
-                if necesidad <= 0: break
-    if not plan_final: return pd.DataFrame()
-    df_resultado = pd.DataFrame(plan_final)
-    df_resultado['Uds a Enviar'] = convertir_serie_a_entero_seguro(df_resultado['Uds a Enviar'])
-    df_resultado['Valor del Traslado'] = pd.to_numeric(df_resultado['Uds a Enviar']) * pd.to_numeric(df_resultado['Costo_Promedio_UND'])
-    return df_resultado[df_resultado['Uds a Enviar'] > 0].sort_values(by=['Valor del Traslado'], ascending=False).reset_index(drop=True)
+# --- ESTADO DE ABASTECIMIENTO Y PLAN DE TRASLADOS COMPARTIDOS ---
+@st.cache_resource(max_entries=8, show_spinner="Calculando estado de abastecimiento y plan de traslados...")
+def _estado_abastecimiento(version_base, modo_traslados, _df_base, _df_ordenes, _version_ordenes):
+    """EstadoAbastecimiento de una versión del análisis y un modo, con el candado que ordena sus actualizaciones."""
+    return EstadoAbastecimiento(_df_base, _df_ordenes, _version_ordenes, modo_traslados), threading.Lock()
+
+
+def estado_abastecimiento(version_base, version_ordenes, modo_traslados, df_base, df_ordenes):
+    """(maestro, plan de traslados, IndiceFilas del maestro) compartidos por todas las páginas y sesiones.
+
+    Se calcula una vez por versión del análisis y modo del plan; la versión de las órdenes no es parte
+    de la clave. Con otra versión del registro de órdenes se pone al día bajo el candado, replanificando
+    solo los SKU de las líneas que cambiaron (EstadoAbastecimiento.actualizar), y gana la lectura más
+    reciente: si dos sesiones traen versiones distintas, el estado sigue a la última que llegó. Lo ya
+    entregado no cambia (se sustituye, no se modifica) y es de solo lectura para las páginas.
+    """
+    estado, candado = _estado_abastecimiento(version_base, modo_traslados, df_base, df_ordenes, version_ordenes)
+    with candado:
+        if estado.version_ordenes != version_ordenes:
+            with st.spinner("Actualizando el plan de traslados con los cambios en las órdenes..."):
+                estado.actualizar(df_ordenes, version_ordenes)
+        return estado.maestro, estado.plan, estado.indice
+
+
+def estado_abastecimiento_sesion(estado):
+    """estado_abastecimiento para el maestro, las órdenes y el modo guardados en la sesión."""
+    df_ordenes, version_ordenes = ordenes_sesion(estado)
+    return estado_abastecimiento(
+        version_sesion(estado, solo_visibles=False), version_ordenes, estado.get(CLAVE_MODO_TRASLADOS, 'voraz'),
+        analisis_sesion(estado, solo_visibles=False), df_ordenes,
+    )
 
 # --- REGISTRO Y NOTIFICACIONES (COMPLETO) ---
 def registrar_ordenes_en_sheets(sheet_name, df_orden, tipo_orden, proveedor_nombre=None, tienda_destino=None):
@@ -529,47 +376,48 @@ def generar_excel_dinamico(df, nombre_hoja):
         # Aquí se puede añadir formato al excel si se desea
     return output.getvalue()
 
+@st.cache_resource(show_spinner=False)
+def obtener_cliente_dropbox():
+    """Cliente Dropbox único del proceso: reutiliza el token de acceso y la sesión HTTP entre cargas y sesiones."""
+    dbx_creds = st.secrets["dropbox"]
+    return ClienteDropbox(dbx_creds["app_key"], dbx_creds["app_secret"], dbx_creds["refresh_token"])
+
+def obtener_fuente_datos():
+    """
+    Fuente de los archivos base. Por defecto Dropbox; con `tipo = "local"` en la sección [fuente_datos]
+    de los secrets se leen desde `directorio`, que replica la estructura de carpetas de Dropbox.
+    """
+    config = st.secrets.get("fuente_datos", {})
+    if config.get("tipo", "dropbox") == "local":
+        return FuenteLocal(config["directorio"])
+    return obtener_cliente_dropbox()
+
+def ruta_archivo(clave, opcional=False):
+    """Ruta configurada para `clave` ('file_path', 'proveedores_file_path', ...): [fuente_datos] y luego [dropbox]."""
+    for seccion in ("fuente_datos", "dropbox"):
+        config = st.secrets.get(seccion, {})
+        if clave in config:
+            return config[clave]
+    if opcional:
+        return None
+    raise KeyError(f"Falta '{clave}' en los secrets ([fuente_datos] o [dropbox]).")
+
 def cargar_maestro_articulos_dropbox():
     """
-    Carga el archivo maestro de artículos desde Dropbox y retorna un diccionario {referencia: codigo_articulo}.
+    Carga el archivo maestro de artículos desde la fuente de datos y retorna un diccionario {referencia: codigo_articulo}.
     El archivo debe tener columnas 'referencia' y 'codigo' o 'código'.
+    El mapeo se cachea por versión (rev) del archivo: solo se vuelve a descargar cuando cambia.
     """
-    dbx_creds = st.secrets["dropbox"]
-    maestro_path = dbx_creds["maestro_articulos_file_path"]  # Define esto en tus secrets
-
-    df_base = None
     try:
-        with dropbox.Dropbox(app_key=dbx_creds["app_key"], app_secret=dbx_creds["app_secret"], oauth2_refresh_token=dbx_creds["refresh_token"]) as dbx:
-            metadata, res = dbx.files_download(path=maestro_path)
-            with io.BytesIO(res.content) as stream:
-                if maestro_path.endswith('.xlsx'):
-                    df_base = pd.read_excel(stream)
-                else:
-                    df_base = pd.read_csv(stream, sep=None, engine='python')
-    except Exception as e:
-        st.error(f"Error leyendo archivo maestro desde Dropbox: {e}")
+        maestro_path = ruta_archivo("maestro_articulos_file_path")  # Define esto en tus secrets
+        return cargar_maestro_articulos(obtener_fuente_datos(), maestro_path)
+    except ValueError as e:
+        st.error(f"❌ {e}")
         return {}
-
-    # 2. Normalizar nombres de columnas (todo a minúsculas y sin espacios)
-    df_base.columns = [str(col).strip().lower() for col in df_base.columns]
-
-    # 3. Detectar columnas clave
-    col_referencia = next((c for c in df_base.columns if 'referencia' in c), None)
-    col_codigo = next((c for c in df_base.columns if 'código' in c or 'codigo' in c), None)
-
-    if not col_referencia or not col_codigo:
-        st.error("❌ Faltan columnas 'Referencia' o 'Código' en el archivo maestro.")
+    except Exception as e:
+        st.error(f"Error leyendo archivo maestro: {e}")
         return {}
 
-    # 4. Limpieza de datos (Quitar espacios, poner minúsculas y quitar '.0' de los códigos)
-    df_base[col_referencia] = df_base[col_referencia].astype(str).str.strip().str.lower()
-    df_base[col_codigo] = df_base[col_codigo].astype(str).str.replace(r'\.0$', '', regex=True).str.strip()
-
-    # 5. Crear Diccionario { 'referencia': 'codigo_articulo' }
-    mapping_dict = dict(zip(df_base[col_referencia], df_base[col_codigo]))
-    
-    return mapping_dict
-
 def _normalizar_nombre_columna(nombre_columna):
     return str(nombre_columna).strip().lower().replace('_', '').replace(' ', '')
 